@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify, Response
 from services.gemini_service import stream_content
-from services.transcript_service import get_video_transcript
+from services import chat_memory_service
 import json
 
 bp = Blueprint('ai_assistant', __name__, url_prefix='/api/ai')
@@ -14,59 +14,123 @@ def chat():
         {
             "message": "Explain this concept",
             "course_context": "Course title and description",
-            "video_id": "xxx" (optional, for RAG)
+            "video_id": "xxx" (optional, for RAG),
+            "session_id": "uuid" (optional, continue a conversation; needs its user_id),
+            "user_id": "uuid" (optional, start a conversation kept server-side)
         }
     
     Returns:
         {
-            "response": "AI generated response"
+            "response": "AI generated response",
+            "context_used": true,
+            "sources": [{"chunk_index": 3, "start": 412.5, "score": 0.82}],
+            "session_id": "uuid" (when a session is used)
         }
     """
     try:
         data = request.get_json()
-        user_message = data.get('message', '')
-        course_context = data.get('course_context', '')
-        video_id = data.get('video_id')
-        
-        # Build context
-        context = f"You are a learning assistant for this course.\n\nCOURSE: {course_context}\n\n"
-        
-        # RAG: Retrieve transcript if video_id provided
-        if video_id:
-            transcript = get_video_transcript(video_id)
-            if transcript:
-                context += f"RELEVANT CONTENT:\n{transcript[:3000]}\n\n"
-        
-        context += "Answer the user's question using the provided context. Be concise and helpful."
+        session = _get_session(data)
+        prompt, chunks = _build_prompt(data, session)
         
         # Generate response
         from services.gemini_service import generate_content
-        prompt = f"{context}\n\nUSER QUESTION: {user_message}\n\nASSISTANT:"
         response = generate_content(prompt)
         
-        return jsonify({
-            'response': response,
-            'context_used': bool(video_id and transcript)
-        }), 200
+        sources = [
+            {'chunk_index': c['chunk_index'], 'start': c['start'], 'score': round(c.get('score', 0.0), 4)}
+            for c in chunks
+        ]
+        result = {'response': response, 'context_used': bool(chunks), 'sources': sources}
+        if session is not None:
+            chat_memory_service.record_turn(
+                session, data.get('message', ''), response,
+                {'video_id': data.get('video_id'), 'sources': sources}
+            )
+            result['session_id'] = session.id
+        return jsonify(result), 200
         
+    except chat_memory_service.SessionNotFound:
+        return jsonify({'error': 'Chat session not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _get_session(data: dict):
+    # Sessions are opt-in: requests with neither field stay stateless
+    if not data.get('session_id') and not data.get('user_id'):
+        return None
+    if not data.get('user_id'):
+        raise chat_memory_service.SessionNotFound(data['session_id'])
+    return chat_memory_service.get_session(data.get('session_id'), data.get('user_id'))
+
+def _build_prompt(data: dict, session) -> tuple:
+    user_message = data.get('message', '')
+    video_id = data.get('video_id')
+    
+    # Build context
+    context = f"You are a learning assistant for this course.\n\nCOURSE: {data.get('course_context', '')}\n\n"
+    
+    # RAG: the transcript chunks most relevant to the question
+    chunks = _retrieve_chunks(video_id, user_message) if video_id else []
+    if chunks:
+        context += f"RELEVANT CONTENT:\n{_format_chunks(chunks)}\n\n"
+    
+    # Earlier turns: rolling summary + recent turns, bounded by the session's token budget
+    history = chat_memory_service.history_prompt(session) if session is not None else ''
+    if history:
+        context += f"{history}\n\n"
+    
+    context += "Answer the user's question using the provided context. Be concise and helpful."
+    return f"{context}\n\nUSER QUESTION: {user_message}\n\nASSISTANT:", chunks
+
+def _retrieve_chunks(video_id: str, question: str) -> list:
+    # Imported here: NumPy and the index stay off the startup path until chat is used
+    from services import retrieval_service
+    try:
+        return retrieval_service.retrieve(video_id, question)
+    except Exception as e:
+        # Embedding/search failure: answer from the start of the transcript, as before RAG
+        print(f"DEBUG: Retrieval failed for {video_id}, using leading chunks: {e}")
+        try:
+            return (retrieval_service.transcript_chunks(video_id) or [])[:retrieval_service.RAG_TOP_K]
+        except Exception:
+            return []
+
+def _format_chunks(chunks: list) -> str:
+    # In transcript order, labelled with their time so answers can point to it
+    parts = []
+    for chunk in sorted(chunks, key=lambda c: c['chunk_index']):
+        label = f"[{int(chunk['start'])}s] " if chunk.get('start') is not None else ''
+        parts.append(f"{label}{chunk['text']}")
+    return '\n\n'.join(parts)
+
 @bp.route('/chat/stream', methods=['POST'])
 def chat_stream():
-    """Streaming chat endpoint for real-time responses"""
+    """
+    Streaming chat endpoint for real-time responses
+    
+    Takes the same body as /chat. With a session, the first event is
+    {"session_id": "uuid"} and the turn is recorded once the answer is complete.
+    """
     try:
         data = request.get_json()
-        user_message = data.get('message', '')
-        course_context = data.get('course_context', '')
-        
-        context = f"You are a learning assistant for: {course_context}\n\nUSER: {user_message}\n\nASSISTANT:"
+        session = _get_session(data)
+        prompt, _ = _build_prompt(data, session)
         
         def generate():
-            for chunk in stream_content(context):
+            if session is not None:
+                yield f"data: {json.dumps({'session_id': session.id})}\n\n"
+            parts = []
+            for chunk in stream_content(prompt):
+                parts.append(chunk)
                 yield f"data: {json.dumps({'text': chunk})}\n\n"
+            if session is not None:
+                chat_memory_service.record_turn(
+                    session, data.get('message', ''), ''.join(parts), {'video_id': data.get('video_id')}
+                )
         
         return Response(generate(), mimetype='text/event-stream')
         
+    except chat_memory_service.SessionNotFound:
+        return jsonify({'error': 'Chat session not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 from services.ai_content_analyzer import generate_course_summary, analyze_difficulty
 from services.ai_quiz_generator import generate_quiz
-from services.transcript_service import get_video_transcript
+from services.transcript_service import get_video_transcript, transcript_flight
+from services.gemini_service import generation_flight
+from services.response_cache import response_cache
+from services import transcript_cache, artifact_store, chat_memory_service
 
 bp = Blueprint('ai_content', __name__, url_prefix='/api/ai')
 
@@ -87,3 +90,34 @@ def generate_quiz_endpoint():
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """
+    Report AI response, transcript and artifact cache and request coalescing counters
+    
+    Returns:
+        {
+            "responses": {"hits": int, "misses": int, "estimated_seconds_saved": float, ...},
+            "transcripts": {"hits": int, "misses": int, ...},
+            "artifacts": {"hits": int, "misses": int, ...},
+            "singleflight": {
+                "generations": {"executed": int, "coalesced": int, ...},
+                "transcripts": {"executed": int, "coalesced": int, ...}
+            },
+            "retrieval": {"backend": str, "provider": str, "indexes": {...}, "embedding": {...}},
+            "chat_sessions": {"sessions": {...}, "folds": int, "folded_turns": int, ...}
+        }
+    """
+    from services import retrieval_service  # Keeps NumPy off the startup path
+    return jsonify({
+        'responses': response_cache.stats(),
+        'transcripts': transcript_cache.stats(),
+        'artifacts': artifact_store.stats(),
+        'singleflight': {
+            'generations': generation_flight.stats(),
+            'transcripts': transcript_flight.stats()
+        },
+        'retrieval': retrieval_service.stats(),
+        'chat_sessions': chat_memory_service.stats()
+    }), 200
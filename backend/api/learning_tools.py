@@ -1,18 +1,65 @@
 from flask import Blueprint, request, jsonify
 from services.ai_learning_tools import (
-    generate_quiz_from_transcript,
-    generate_flashcards,
-    generate_video_summary,
-    generate_chapter_recommendations,
     generate_personalized_notes,
     adapt_learning_style,
     generate_spaced_repetition_schedule
 )
 from services.transcript_service import get_video_transcript
+from services.study_pack_service import get_artifact, get_study_pack
 import json
 
 bp = Blueprint('learning_tools', __name__, url_prefix='/api/learning-tools')
 
+@bp.route('/study-pack', methods=['POST'])
+def study_pack():
+    """
+    Summary, quiz, flashcards and chapter markers for a video in one call
+    
+    One transcript fetch and one Gemini generation; each artifact is stored
+    separately, so the individual endpoints below serve it afterwards.
+    
+    Request body:
+        {
+            "video_id": "xxx",
+            "title": "Video title",
+            "duration": 600,
+            "difficulty": "medium",
+            "num_questions": 5,
+            "num_cards": 10
+        }
+    
+    Returns:
+        {
+            "success": true,
+            "summary": {...}, "quiz": [...], "flashcards": [...], "chapters": [...],
+            "cached": ["quiz", ...]  // artifacts served from the store
+        }
+    """
+    try:
+        data = request.json
+        video_id = data.get('video_id')
+        
+        if not video_id:
+            return jsonify({'error': 'video_id is required'}), 400
+        
+        result = get_study_pack(
+            video_id,
+            title=data.get('title', 'Educational Video'),
+            duration_seconds=data.get('duration', 0),
+            difficulty=data.get('difficulty', 'medium'),
+            num_questions=data.get('num_questions', 5),
+            num_cards=data.get('num_cards', 10)
+        )
+        
+        if result is None:
+            return jsonify({'error': 'Could not fetch transcript'}), 404
+        
+        pack, cached = result
+        return jsonify(dict(pack, success=True, cached=cached))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/generate-quiz', methods=['POST'])
 def generate_quiz():
     """Generate quiz from video content"""
@@ -25,19 +72,12 @@ def generate_quiz():
         if not video_id:
             return jsonify({'error': 'video_id is required'}), 400
         
-        # Get video transcript
-        transcript = get_video_transcript(video_id)
+        # Stored quiz (e.g. from the study pack), else fetch transcript and generate
+        questions = get_artifact(video_id, 'quiz', difficulty=difficulty, num_questions=num_questions)
         
-        if not transcript:
+        if questions is None:
             return jsonify({'error': 'Could not fetch transcript'}), 404
         
-        # Generate quiz
-        questions = generate_quiz_from_transcript(
-            transcript,
-            difficulty=difficulty,
-            num_questions=num_questions
-        )
-        
         # TODO: Save quiz to database
         # supabase.table('ai_quiz_questions').insert({
         #     'video_id': video_id,
@@ -65,15 +105,12 @@ def generate_flashcards_endpoint():
         if not video_id:
             return jsonify({'error': 'video_id is required'}), 400
         
-        # Get transcript
-        transcript = get_video_transcript(video_id)
+        # Stored flashcards, else fetch transcript and generate
+        flashcards = get_artifact(video_id, 'flashcards', num_cards=num_cards)
         
-        if not transcript:
+        if flashcards is None:
             return jsonify({'error': 'Could not fetch transcript'}), 404
         
-        # Generate flashcards
-        flashcards = generate_flashcards(transcript, num_cards=num_cards)
-        
         return jsonify({
             'success': True,
             'flashcards': flashcards,
@@ -94,15 +131,12 @@ def get_video_summary():
         if not video_id:
             return jsonify({'error': 'video_id is required'}), 400
         
-        # Get transcript
-        transcript = get_video_transcript(video_id)
+        # Stored summary, else fetch transcript and generate
+        summary = get_artifact(video_id, 'summary', title=title)
         
-        if not transcript:
+        if summary is None:
             return jsonify({'error': 'Could not fetch transcript'}), 404
         
-        # Generate summary
-        summary = generate_video_summary(transcript, title)
-        
         return jsonify({
             'success': True,
             'summary': summary
@@ -122,15 +156,12 @@ def get_chapter_markers():
         if not video_id:
             return jsonify({'error': 'video_id is required'}), 400
         
-        # Get transcript
-        transcript = get_video_transcript(video_id)
+        # Stored chapters, else fetch transcript and generate
+        chapters = get_artifact(video_id, 'chapters', duration_seconds=duration)
         
-        if not transcript:
+        if chapters is None:
             return jsonify({'error': 'Could not fetch transcript'}), 404
         
-        # Generate chapters
-        chapters = generate_chapter_recommendations(transcript, duration)
-        
         return jsonify({
             'success': True,
             'chapters': chapters,
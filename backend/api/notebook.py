@@ -2,7 +2,6 @@ from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
 import os
 import io
-from pypdf import PdfReader
 from services.gemini_service import get_gemini_response, generate_json_content
 import json
 import re
@@ -35,6 +34,7 @@ def analyze_notebook():
         # Extract Text
         if filename.lower().endswith('.pdf'):
             try:
+                from pypdf import PdfReader  # Imported on first PDF, not at startup
                 reader = PdfReader(file) # file acts as stream
                 for page in reader.pages:
                     text = page.extract_text()
@@ -1,8 +1,11 @@
 from flask import Blueprint, request, jsonify
 from services.youtube_service import fetch_playlist_items, get_video_durations
-from services.transcript_service import get_video_transcript
+from services.transcript_service import get_video_transcript, get_timed_transcript
 from services.ai_content_analyzer import generate_course_summary
+from services.prefetch_service import start_prefetch, get_prefetch_status
+from services.playlist_cache import get_playlist_videos
 import json
+import time
 
 bp = Blueprint('playlist', __name__, url_prefix='/api/playlist')
 
@@ -13,7 +16,8 @@ def analyze_playlist():
     
     Request body:
         {
-            "playlist_id": "PLxxx" or "https://youtube.com/playlist?list=PLxxx"
+            "playlist_id": "PLxxx" or "https://youtube.com/playlist?list=PLxxx",
+            "prefetch_transcripts": true (optional, default true)
         }
     
     Returns:
@@ -23,7 +27,8 @@ def analyze_playlist():
             "total_duration_minutes": int,
             "video_count": int,
             "videos": [...],
-            "ai_summary": {...} (if available)
+            "ai_summary": {...} (if available),
+            "prefetch": {...} (transcript prefetch status)
         }
     """
     try:
@@ -58,6 +63,11 @@ def analyze_playlist():
             'total_videos': len(videos_with_durations)
         }
         
+        # Warm transcripts for every video in the background
+        if data.get('prefetch_transcripts', True):
+            job = start_prefetch(playlist_id, videos_with_durations)
+            result['prefetch'] = job.to_dict()
+        
         # Optionally generate AI summary (can be done async client-side)
         if data.get('generate_summary', False):
             try:
@@ -66,7 +76,7 @@ def analyze_playlist():
                 transcript = get_video_transcript(first_video_id)
                 
                 if transcript:
-                    summary = generate_course_summary(transcript[:5000])  # First 5000 chars
+                    summary = generate_course_summary(transcript)
                     result['ai_summary'] = summary
             except Exception as e:
                 print(f"Could not generate summary: {e}")
@@ -79,16 +89,120 @@ def analyze_playlist():
 
 @bp.route('/video/<video_id>/transcript', methods=['GET'])
 def get_transcript(video_id):
-    """Get transcript for a specific video"""
+    """
+    Get transcript for a specific video
+    
+    Query params:
+        segments: 'true' to include segment timings as columns
+                  {starts, durations, offsets}; offsets index into transcript
+        at: Playback time in seconds; adds the segment playing at that time
+            (e.g. to resume from a saved position)
+    """
     try:
-        transcript = get_video_transcript(video_id)
+        want_segments = request.args.get('segments') == 'true'
+        at = request.args.get('at', type=float)
+        
+        if not want_segments and at is None:
+            transcript = get_video_transcript(video_id)
+            if not transcript:
+                return jsonify({'error': 'Transcript not available'}), 404
+            return jsonify({
+                'video_id': video_id,
+                'transcript': transcript
+            }), 200
         
-        if not transcript:
+        timed = get_timed_transcript(video_id)
+        if timed is None or not timed.text:
             return jsonify({'error': 'Transcript not available'}), 404
         
-        return jsonify({
+        result = {
             'video_id': video_id,
-            'transcript': transcript
+            'transcript': timed.text
+        }
+        if want_segments:
+            result['segments'] = timed.to_dict()
+        if at is not None:
+            result['position'] = timed.segment(timed.index_at_time(at)) if timed else None
+        return jsonify(result), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<playlist_id>/prefetch', methods=['GET', 'POST'])
+def playlist_prefetch(playlist_id):
+    """
+    Poll (GET) or start (POST) the transcript prefetch for a playlist
+    
+    A poll served by the worker that runs the job gets its live counters
+    ("source": "job"); any other worker answers from the transcript cache
+    ("source": "cache", status "completed" or "partial").
+    
+    Returns:
+        {
+            "playlist_id": str,
+            "source": "job" | "cache",
+            "status": "running" | "completed" | "partial",
+            "total": int,
+            "done": int,
+            "progress_percent": float,
+            ...
+        }
+    """
+    try:
+        if request.method == 'POST':
+            videos = fetch_playlist_items(playlist_id)
+            if not videos:
+                return jsonify({'error': 'Playlist not found or is empty'}), 404
+            return jsonify(start_prefetch(playlist_id, videos).to_dict()), 202
+        
+        status = get_prefetch_status(playlist_id)
+        if status is None:
+            videos = get_playlist_videos(playlist_id)
+            if not videos:
+                return jsonify({'error': 'Playlist not found or is empty'}), 404
+            status = get_prefetch_status(playlist_id, [v['video_id'] for v in videos])
+        return jsonify(status), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<playlist_id>/search', methods=['GET'])
+def playlist_search(playlist_id):
+    """
+    Find which videos in a playlist cover a topic (BM25 over cached transcripts)
+    
+    Query params:
+        q: Search text (required)
+        limit: Maximum number of videos (default 10, max 50)
+    
+    Returns:
+        {
+            "playlist_id": str,
+            "query": str,
+            "results": [{"video_id": str, "title": str, "score": float,
+                         "offsets": {"term": first_char_offset_in_transcript}}],
+            "indexed": int,   # Videos searched
+            "pending": int,   # Videos whose transcript is not cached yet (see /prefetch)
+            "took_ms": float
+        }
+    """
+    try:
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            return jsonify({'error': 'Missing query parameter q'}), 400
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+        
+        # Imported here: NumPy and the BM25 index stay off the startup path until search is used
+        from services.search_service import search_playlist
+        
+        started = time.perf_counter()
+        result = search_playlist(playlist_id, query, limit)
+        
+        return jsonify({
+            'playlist_id': playlist_id,
+            'query': query,
+            **result,
+            'took_ms': round((time.perf_counter() - started) * 1000, 2)
         }), 200
         
     except Exception as e:
@@ -6,17 +6,23 @@ import json
 
 bp = Blueprint('progress', __name__, url_prefix='/api/progress')
 
-# Initialize Supabase
-from supabase import create_client, Client
-from services.scheduler_service import distribute_videos_to_schedule
+from services.supabase_client import require_supabase
+from services.scheduler_service import iter_video_schedule
+from services.stats_service import get_user_stats as load_user_stats, record_activity, rebuild_user_stats, present_stats
+from services.sync_service import fetch_changes, InvalidCursor, DEFAULT_PAGE_SIZE
+from services.progress_writer import progress_buffer
 from datetime import datetime, date, timedelta
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(url, key)
+
+MAX_BATCH_ITEMS = 200
 
 @bp.route('/save-timestamp', methods=['POST'])
 def save_timestamp():
-    """Save video timestamp for resume functionality"""
+    """
+    Save video timestamp for resume functionality
+    
+    Heartbeats are coalesced per (user, video) in a write-behind buffer and
+    flushed to video_progress in bulk, so this never waits on the database.
+    """
     try:
         data = request.json
         user_id = data.get('user_id')
@@ -30,18 +36,25 @@ def save_timestamp():
         # Calculate progress percentage
         progress_percent = (timestamp / duration * 100) if duration else 0
         
-        # TODO: Save to Supabase video_progress table
-        # supabase.table('video_progress').upsert({
-        #     'user_id': user_id,
-        #     'video_id': video_id,
-        #     'current_timestamp': timestamp,
-        #     'duration': duration,
-        #     'progress_percent': progress_percent,
-        #     'last_watched': datetime.now().isoformat()
-        # }).execute()
+        row = {
+            'user_id': user_id,
+            'youtube_video_id': video_id,
+            'current_position': int(timestamp),
+            'last_watched': datetime.now().isoformat()
+        }
+        if duration:
+            row['duration_seconds'] = int(duration)
+        # Needed only when the heartbeat creates the row; an existing row keeps its values
+        if data.get('playlist_id'):
+            row['playlist_id'] = data['playlist_id']
+        if data.get('video_title'):
+            row['video_title'] = data['video_title']
+        
+        queued = progress_buffer.submit(row)
         
         return jsonify({
             'success': True,
+            'queued': queued,
             'timestamp': timestamp,
             'progress_percent': round(progress_percent, 2)
         })
@@ -49,10 +62,16 @@ def save_timestamp():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/save-timestamp/stats', methods=['GET'])
+def save_timestamp_stats():
+    """Report write-behind buffer counters (pending, coalesced, dropped, written)"""
+    return jsonify(progress_buffer.stats())
+
 @bp.route('/mark-complete', methods=['POST'])
 def mark_video_complete():
     """Mark a video as completed"""
     try:
+        supabase = require_supabase()
         data = request.json
         user_id = data.get('user_id')
         video_id = data.get('video_id')
@@ -66,63 +85,140 @@ def mark_video_complete():
         
         print(f"Marking video {video_id} as completed={completed} for user {user_id}")
         
-        # Upsert Video Progress
-        progress_data = {
-            'user_id': user_id,
-            'youtube_video_id': video_id,
-            'playlist_id': playlist_id,
-            'video_title': video_title,
-            'duration_seconds': duration_seconds,
+        # Progress upsert, idempotent consistency log and stats update in one transaction
+        result = supabase.rpc('mark_video_complete', {
+            'p_user_id': user_id,
+            'p_video_id': video_id,
+            'p_playlist_id': playlist_id,
+            'p_video_title': video_title,
+            'p_duration_seconds': int(duration_seconds or 0),
+            'p_completed': bool(completed),
+            'p_activity_date': datetime.now().date().isoformat()
+        }).execute().data
+        print(f"mark_video_complete result: {result}")
+        
+        _ensure_stats_row(user_id, result['stats'], [result])
+        
+        return jsonify({
+            'success': True,
             'completed': completed,
-            'last_watched': datetime.now().isoformat()
+            'message': 'Progress saved! 🎯' if completed else 'Progress updated!'
+        })
+    
+    except Exception as e:
+        print(f"Error marking complete: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/mark-complete/batch', methods=['POST'])
+def mark_videos_complete():
+    """
+    Mark several videos at once (e.g. a whole scheduled day)
+    
+    Request body:
+        {
+            "user_id": str,
+            "playlist_id": str,        // default for items that omit it
+            "items": [
+                {"video_id": str, "completed": bool, "duration_seconds": int,
+                 "video_title": str, "playlist_id": str},
+                ...
+            ]
         }
+    
+    All video_progress rows are written in one bulk upsert and all
+    consistency_logs rows in one insert, inside a single database function.
+    
+    Returns:
+        {
+            "success": true,
+            "results": [{"video_id", "completed", "was_completed", "logged"} | {"error"}, ...]
+        }
+        One result per item, in request order. If a video appears more than
+        once, its last entry wins.
+    """
+    try:
+        supabase = require_supabase()
+        data = request.json
+        user_id = data.get('user_id')
+        playlist_id = data.get('playlist_id')
+        items = data.get('items')
         
-        if completed:
-            progress_data['current_position'] = duration_seconds
-        else:
-            progress_data['current_position'] = 0
-            
-        # Upsert with on_conflict
-        progress_result = supabase.table('video_progress').upsert(progress_data, on_conflict='user_id,youtube_video_id').execute()
-        print(f"Video progress upsert result: {progress_result}")
+        if not user_id or not isinstance(items, list) or not items:
+            return jsonify({'error': 'Missing required fields'}), 400
+        if len(items) > MAX_BATCH_ITEMS:
+            return jsonify({'error': f'At most {MAX_BATCH_ITEMS} items per batch'}), 400
+        
+        rows = {}
+        for item in items:
+            video_id = _batch_video_id(item)
+            if video_id is None:
+                continue
+            rows.pop(video_id, None)  # Keep request order of the winning entry
+            rows[video_id] = {
+                'video_id': video_id,
+                'playlist_id': item.get('playlist_id', playlist_id),
+                'video_title': item.get('video_title', 'Untitled Video'),
+                'duration_seconds': int(item.get('duration_seconds') or 0),
+                'completed': bool(item.get('completed', True))
+            }
         
-        # Log consistency - only when marking as completed
-        if completed:
-            today = datetime.now().date().isoformat()
+        by_video = {}
+        if rows:
+            print(f"Marking {len(rows)} videos for user {user_id}")
+            batch = supabase.rpc('mark_videos_complete', {
+                'p_user_id': user_id,
+                'p_items': list(rows.values()),
+                'p_activity_date': datetime.now().date().isoformat()
+            }).execute().data
             
-            # Check if already logged today for this video
-            existing_log = supabase.table('consistency_logs').select('id').eq('user_id', user_id).eq('video_id', video_id).eq('date', today).execute()
-            
-            if not existing_log.data:
-                log_data = {
-                    'user_id': user_id,
-                    'activity_type': 'video_completed',
-                    'video_id': video_id,
-                    'playlist_id': playlist_id,
-                    'date': today,
-                    'duration_minutes': int(duration_seconds / 60) if duration_seconds else 0
-                }
-                log_result = supabase.table('consistency_logs').insert(log_data).execute()
-                print(f"Consistency log inserted: {log_result}")
+            by_video = {result['video_id']: result for result in batch['results']}
+            _ensure_stats_row(user_id, batch['stats'], batch['results'])
+        
+        results = []
+        for item in items:
+            video_id = _batch_video_id(item)
+            if video_id is None:
+                results.append({'video_id': None, 'error': 'video_id must be a non-empty string'})
             else:
-                print(f"Activity already logged today for video {video_id}")
+                results.append(by_video.get(video_id, {'video_id': video_id, 'error': 'Not updated'}))
         
         return jsonify({
             'success': True,
-            'completed': completed,
-            'message': 'Progress saved! 🎯' if completed else 'Progress updated!'
+            'results': results,
+            'message': f'{len(by_video)} videos updated! 🎯'
         })
     
     except Exception as e:
-        print(f"Error marking complete: {e}")
+        print(f"Error marking batch complete: {e}")
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+def _batch_video_id(item):
+    """The item's video_id if it is a non-empty string, else None"""
+    video_id = item.get('video_id') if isinstance(item, dict) else None
+    if not isinstance(video_id, str) or not video_id.strip():
+        return None
+    return video_id
+
+def _ensure_stats_row(user_id, stats, results):
+    """Build the user_stats row from the source tables if the database function found none"""
+    if stats is not None:
+        return
+    if not any(r['logged'] or r['completed'] != r['was_completed'] for r in results):
+        return
+    try:
+        rebuild_user_stats(user_id)
+    except Exception as e:
+        print(f"Error updating user stats: {e}")
+
 @bp.route('/log-session', methods=['POST'])
 def log_study_session():
     """Log a study session for consistency tracking"""
     try:
+        supabase = require_supabase()
         data = request.json
         user_id = data.get('user_id')
         duration_minutes = data.get('duration_minutes')
@@ -142,6 +238,11 @@ def log_study_session():
             'date': datetime.now().date().isoformat()
         }).execute()
         
+        try:
+            record_activity(user_id, sessions_delta=1)
+        except Exception as e:
+            print(f"Error updating user stats: {e}")
+        
         return jsonify({
             'success': True,
             'message': f'Study session logged! {duration_minutes} minutes added to your streak! 🔥'
@@ -152,24 +253,32 @@ def log_study_session():
 
 @bp.route('/sync-progress/<user_id>', methods=['GET'])
 def sync_progress(user_id):
-    """Sync progress across sessions"""
-    try:
-        # TODO: Fetch from Supabase
-        # progress = supabase.table('video_progress').select('*').eq('user_id', user_id).execute()
-        # consistency = supabase.table('consistency_logs').select('*').eq('user_id', user_id).execute()
-        
-        # Mock data for now
-        mock_data = {
-            'videos_completed': 15,
-            'current_streak': 7,
-            'longest_streak': 12,
-            'total_minutes': 450,
-            'last_activity': datetime.now().isoformat(),
-            'progress': []
+    """
+    Delta sync: return progress rows changed or deleted since the client's cursor
+    
+    Query params:
+        cursor: Opaque cursor from the previous response (omit for a full sync)
+        limit: Max rows per table per page (default 500, max 1000)
+    
+    Returns:
+        {
+            "video_progress": [...],
+            "consistency_logs": [...],
+            "deleted": {"video_progress": [ids], "consistency_logs": [ids]},
+            "cursor": str,
+            "has_more": bool  // call again with the new cursor if true
         }
+    """
+    try:
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        
+        changes = fetch_changes(user_id, cursor, limit)
         
-        return jsonify(mock_data)
+        return jsonify(dict(changes, success=True))
     
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -283,6 +392,7 @@ def predict_completion():
 def get_user_courses():
     """Fetch all active courses for a user"""
     try:
+        supabase = require_supabase()
         user_id = request.args.get('user_id')
         if not user_id:
             return jsonify({'error': 'Missing user_id'}), 400
@@ -302,8 +412,18 @@ def get_user_courses():
 
 @bp.route('/course/<goal_id>', methods=['GET'])
 def get_course_details(goal_id):
-    """Get full course details including videos and progress"""
+    """
+    Get full course details including videos and progress
+    
+    Query params (optional):
+        schedule_format=compact  Schedule days reference the flat 'videos' list by
+                                 video_start/video_end offsets instead of embedding
+                                 each video dict again
+    """
     try:
+        supabase = require_supabase()
+        compact = request.args.get('schedule_format') == 'compact'
+        
         # 1. Get Goal & Playlist info from DB
         res = supabase.table('goals').select('*, playlists(*)').eq('id', goal_id).execute()
         
@@ -316,12 +436,10 @@ def get_course_details(goal_id):
         # Determine playlist ID to use for API
         playlist_api_id = playlist['youtube_playlist_id']
         
-        # 2. Get Videos from YouTube Service
-        from services.youtube_service import fetch_playlist_items, get_video_durations
+        # 2. Get Videos (with durations) from the playlist snapshot cache
+        from services.playlist_cache import get_playlist_videos
         
-        raw_videos = fetch_playlist_items(playlist_api_id)
-        # Process in chunks if needed
-        videos = get_video_durations(raw_videos)
+        videos = get_playlist_videos(playlist_api_id)
             
         # 3. Get User Progress
         user_id = goal['user_id']
@@ -352,18 +470,23 @@ def get_course_details(goal_id):
         # Calculate daily minutes from hours
         daily_minutes = int(goal.get('hours_per_day', 1) * 60)
         
-        schedule_list = distribute_videos_to_schedule(
+        schedule_list = list(iter_video_schedule(
             videos=processed_videos,
             study_days=goal['study_days'],
             daily_minutes=daily_minutes,
-            start_date=start_date
-        )
+            start_date=start_date,
+            compact=compact
+        ))
         
         schedule = {
             'study_sessions': schedule_list,
             'total_days': len(schedule_list),
             'completion_date': schedule_list[-1]['date'] if schedule_list else goal['target_completion_date']
         }
+        if compact:
+            schedule['format'] = 'compact'
+            schedule['total_videos'] = len(processed_videos)
+            schedule['total_minutes'] = sum(day['total_minutes'] for day in schedule_list)
 
         return jsonify({
             'success': True,
@@ -379,71 +502,17 @@ def get_course_details(goal_id):
 
 @bp.route('/stats', methods=['GET'])
 def get_user_stats():
-    """Get calculated gamification stats for user"""
+    """Get gamification stats for user from the maintained user_stats record"""
     try:
         user_id = request.args.get('user_id')
         if not user_id:
             return jsonify({'error': 'Missing user_id'}), 400
-            
-        # 1. Count Completed Videos (Approx count is faster)
-        vid_res = supabase.table('video_progress').select('id', count='exact').eq('user_id', user_id).eq('completed', True).execute()
-        completed_videos = vid_res.count 
-        
-        # 2. Count Total Sessions
-        log_res = supabase.table('consistency_logs').select('id', count='exact').eq('user_id', user_id).execute()
-        total_sessions = log_res.count 
-        
-        # 3. Calculate Streak
-        # New logic: if current date matches last activity date, add 1, else reset to 0
-        dates_res = supabase.table('consistency_logs').select('date').eq('user_id', user_id).order('date', desc=True).limit(50).execute()
-        
-        streak = 0
-        if dates_res.data:
-            # Extract unique dates
-            raw_dates = [d['date'] for d in dates_res.data]
-            unique_dates = sorted(list(set(raw_dates)), reverse=True)
-            
-            today = datetime.now().date()
-            last_logged_date_str = unique_dates[0]
-            last_logged_date = datetime.strptime(last_logged_date_str, '%Y-%m-%d').date()
-            
-            # If user logged activity today, count consecutive days
-            if last_logged_date == today:
-                streak = 1
-                current_check = last_logged_date
-                
-                # Count backwards for consecutive days
-                for i in range(1, len(unique_dates)):
-                    prev_date_str = unique_dates[i]
-                    prev_date = datetime.strptime(prev_date_str, '%Y-%m-%d').date()
-                    
-                    expected_prev = current_check - timedelta(days=1)
-                    if prev_date == expected_prev:
-                        streak += 1
-                        current_check = prev_date
-                    else:
-                        break
-            else:
-                # If user skipped (last activity was before today), streak is 0
-                streak = 0
-
-        # XP Calculation - Simple and Consistent
-        # 100 XP per completed video
-        # Every 500 XP = 1 level
-        xp = completed_videos * 100
-        level = (xp // 500) + 1  # Integer division
-        xp_in_current_level = xp % 500  # XP progress in current level
-        xp_needed_for_next = 500  # Always 500 XP per level
         
-        return jsonify({
-            'success': True,
-            'level': level,
-            'xp': xp,  # Total XP earned
-            'xp_in_current_level': xp_in_current_level,  # Progress toward next level
-            'next_level_xp': xp_needed_for_next,  # XP needed for next level (always 500)
-            'streak': streak,
-            'total_videos': completed_videos
-        })
+        # XP: 100 per completed video, every 500 XP = 1 level
+        # Streak: consecutive active days, counted only if active today
+        stats = present_stats(load_user_stats(user_id))
+        
+        return jsonify(dict(stats, success=True))
 
     except Exception as e:
         print(f"Error calculating stats: {e}")
@@ -452,10 +521,28 @@ def get_user_stats():
             'level': 1, 'xp': 0, 'next_level_xp': 500, 'streak': 0, 'total_videos': 0
         })
 
+@bp.route('/stats/rebuild', methods=['POST'])
+def rebuild_stats():
+    """Repair a user's stats record from consistency_logs and video_progress"""
+    try:
+        data = request.json
+        user_id = data.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'Missing user_id'}), 400
+        
+        stats = rebuild_user_stats(user_id)
+        
+        return jsonify(dict(present_stats(stats), success=True))
+    
+    except Exception as e:
+        print(f"Error rebuilding stats: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/logs', methods=['GET'])
 def get_user_logs():
     """Get recent activity logs for a user"""
     try:
+        supabase = require_supabase()
         user_id = request.args.get('user_id')
         limit = request.args.get('limit', 10, type=int)
         
@@ -1,13 +1,14 @@
-from flask import Blueprint, request, jsonify
-from services.scheduler_service import calculate_completion_date, generate_study_schedule, distribute_videos_to_schedule
-from datetime import datetime
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from services.scheduler_service import (
+    calculate_completion_date,
+    iter_study_schedule,
+    iter_video_schedule,
+    filter_schedule_window
+)
+from datetime import datetime, timedelta
+import json
 import os
-from supabase import create_client, Client
-
-# Initialize Supabase
-url: str = os.environ.get("SUPABASE_URL")
-key: str = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(url, key)
+from services.supabase_client import require_supabase
 
 bp = Blueprint('schedule', __name__, url_prefix='/api/schedule')
 
@@ -22,8 +23,18 @@ def generate_schedule():
             "study_days": [0, 2, 4],  // Mon, Wed, Fri (0=Mon, 6=Sun)
             "hours_per_day": float,
             "start_date": "2024-01-01",
+            "blackout_dates": ["2024-01-15"], // Optional: days with no study session
             "videos": [...] // Optional: List of videos for detailed assignment
         }
+    
+    Query params (optional):
+        from=YYYY-MM-DD  First date of the window to return (default: start_date)
+        days=N           Window length in calendar days (default: whole schedule)
+        format=ndjson    Stream one JSON day per line, then a summary line
+                         (also selected by Accept: application/x-ndjson)
+        schedule_format=compact
+                         With videos: days carry video_start/video_end offsets
+                         into the request's videos list instead of video dicts
     """
     try:
         data = request.get_json()
@@ -43,24 +54,59 @@ def generate_schedule():
             start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
         else:
             start_date = datetime.now().date()
+        
+        blackout_dates = [
+            datetime.strptime(d, '%Y-%m-%d').date()
+            for d in data.get('blackout_dates', [])
+        ]
+        
+        # Optional window
+        window_from = request.args.get('from')
+        window_days = request.args.get('days', type=int)
+        window_start = datetime.strptime(window_from, '%Y-%m-%d').date() if window_from else None
+        if window_days is not None:
+            if window_days <= 0:
+                return jsonify({'error': 'days must be a positive integer'}), 400
+            window_start = window_start or start_date
+        window_end = window_start + timedelta(days=window_days) if window_start and window_days else None
+        
+        stream = request.args.get('format') == 'ndjson' or \
+            request.accept_mimetypes.best == 'application/x-ndjson'
+        compact = request.args.get('schedule_format') == 'compact'
             
         if videos:
             # Generate detailed video-by-video schedule
+            if not any(0 <= day <= 6 for day in study_days):
+                return jsonify({'error': 'Could not generate schedule (no videos or days)'}), 400
+            
             daily_minutes = int(hours_per_day * 60)
-            schedule = distribute_videos_to_schedule(
+            tally = _ScheduleTally(iter_video_schedule(
                 videos=videos,
                 study_days=study_days,
                 daily_minutes=daily_minutes,
-                start_date=start_date
-            )
+                start_date=start_date,
+                blackout_dates=blackout_dates,
+                compact=compact
+            ))
+            days = filter_schedule_window(tally, window_start, window_days)
             
-            if not schedule:
-                return jsonify({'error': 'Could not generate schedule (no videos or days)'}), 400
-                
-            last_session = schedule[-1]
-            completion_date = datetime.strptime(last_session['date'], '%Y-%m-%d').date()
-            study_sessions = len(schedule)
-            total_days = (completion_date - start_date).days + 1
+            def summary():
+                completion_date = datetime.strptime(tally.last_date, '%Y-%m-%d').date()
+                result = _schedule_summary(
+                    start_date, completion_date,
+                    (completion_date - start_date).days + 1,
+                    tally.sessions, study_days, hours_per_day,
+                    window_start, window_days, window_end
+                )
+                if compact:
+                    result['schedule_format'] = 'compact'
+                return result
+            
+            if not stream:
+                schedule = list(days)
+                if not tally.sessions:
+                    return jsonify({'error': 'Could not generate schedule (no videos or days)'}), 400
+                return jsonify(dict(summary(), schedule=schedule)), 200
             
         else:
             # Fallback to simple estimation logic
@@ -68,35 +114,83 @@ def generate_schedule():
                 total_duration_minutes,
                 study_days,
                 hours_per_day,
-                start_date
+                start_date,
+                blackout_dates
             )
             
-            schedule = generate_study_schedule(
+            # The completion date is known up front, so only the window is walked
+            first_day = max(window_start, start_date) if window_start else start_date
+            last_day = min(window_end - timedelta(days=1), completion_date) if window_end else completion_date
+            days = iter_study_schedule(
                 study_days,
                 hours_per_day,
-                start_date,
-                completion_date
+                first_day,
+                last_day,
+                blackout_dates
             )
+            
+            def summary():
+                return _schedule_summary(
+                    start_date, completion_date, total_days,
+                    study_sessions, study_days, hours_per_day,
+                    window_start, window_days, window_end
+                )
+            
+            if not stream:
+                return jsonify(dict(summary(), schedule=list(days))), 200
         
-        return jsonify({
-            'start_date': start_date.isoformat(),
-            'completion_date': completion_date.isoformat(),
-            'total_days': total_days,
-            'study_sessions': study_sessions,
-            'average_hours_per_week': len(study_days) * hours_per_day,
-            'schedule': schedule  # Return full schedule for now
-        }), 200
+        def generate():
+            for day in days:
+                yield json.dumps(day) + '\n'
+            yield json.dumps(dict(summary(), type='summary')) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
         
+    except ValueError as e:
+        # Bad input: no valid study day, malformed dates
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error generating schedule: {e}")
         return jsonify({'error': str(e)}), 500
 
+class _ScheduleTally:
+    """Pass-through iterator that records session count and last date"""
+    
+    def __init__(self, days):
+        self._days = days
+        self.sessions = 0
+        self.last_date = None
+    
+    def __iter__(self):
+        for day in self._days:
+            self.sessions += 1
+            self.last_date = day['date']
+            yield day
+
+def _schedule_summary(start_date, completion_date, total_days, study_sessions,
+                      study_days, hours_per_day, window_start, window_days, window_end):
+    summary = {
+        'start_date': start_date.isoformat(),
+        'completion_date': completion_date.isoformat(),
+        'total_days': total_days,
+        'study_sessions': study_sessions,
+        'average_hours_per_week': len(study_days) * hours_per_day
+    }
+    if window_start:
+        summary['window'] = {
+            'from': window_start.isoformat(),
+            'days': window_days,
+            'has_more': bool(window_end and completion_date >= window_end)
+        }
+    return summary
+
 @bp.route('/save', methods=['POST'])
 def save_schedule():
     """
     Save generated schedule to database
     """
     try:
+        supabase = require_supabase()
         data = request.get_json()
         user_id = data.get('user_id')
         schedule_data = data.get('schedule_data')
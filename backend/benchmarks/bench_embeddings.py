@@ -0,0 +1,94 @@
+"""
+Benchmark: local hashed n-gram embeddings on chunk_transcript chunks
+
+Builds a synthetic playlist (VIDEOS transcripts of WORDS_PER_VIDEO words, each
+drawn from a shared vocabulary plus topic words), chunks every transcript the
+way retrieval does, and measures with EMBEDDING_PROVIDER=hashed:
+
+- indexing: chunk + embed + SparseVectorIndex.add for the whole playlist
+- query latency: embed_query + top-k search in one video's index
+- hit@k: a query of a few words sampled from one chunk finds that chunk
+
+For comparison it prints how many embed_content requests the Gemini provider
+would need for the same chunks. No network access is used.
+
+Run from the backend folder:
+    python benchmarks/bench_embeddings.py [videos]
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.embedding_service import HashedNgramProvider
+from services.gemini_service import EMBED_BATCH_SIZE
+from services.retrieval_service import RAG_CHUNK_WORDS, RAG_CHUNK_OVERLAP_WORDS, RAG_TOP_K
+from services.transcript_service import chunk_transcript
+from utils.vector_index import SparseVectorIndex
+
+VIDEOS = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+WORDS_PER_VIDEO = 2000   # About 13 minutes of speech
+VOCABULARY = 8000
+QUERIES = 500
+QUERY_WORDS = 6
+
+
+def synthetic_playlist(rng):
+    vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 10)))
+                  for _ in range(VOCABULARY)]
+    common = vocabulary[:300]
+    transcripts = []
+    for _ in range(VIDEOS):
+        words = []
+        while len(words) < WORDS_PER_VIDEO:
+            # Each stretch of the lecture has its own topic words
+            topic = rng.sample(vocabulary[300:], 40)
+            words.extend(rng.choice(topic) if rng.random() < 0.4 else rng.choice(common) for _ in range(120))
+        transcripts.append(' '.join(words[:WORDS_PER_VIDEO]))
+    return transcripts
+
+
+def main():
+    rng = random.Random(7)
+    transcripts = synthetic_playlist(rng)
+    provider = HashedNgramProvider()
+
+    started = time.perf_counter()
+    indexes = []
+    chunk_count = 0
+    for transcript in transcripts:
+        chunks = chunk_transcript(transcript, chunk_size=RAG_CHUNK_WORDS, overlap=RAG_CHUNK_OVERLAP_WORDS)
+        index = SparseVectorIndex(provider.dim)
+        index.add(provider.embed_documents(chunks), list(range(len(chunks))))
+        indexes.append((index, chunks))
+        chunk_count += len(chunks)
+    indexing = time.perf_counter() - started
+
+    latencies, hits = [], 0
+    for _ in range(QUERIES):
+        video = rng.randrange(VIDEOS)
+        index, chunks = indexes[video]
+        target = rng.randrange(len(chunks))
+        query = ' '.join(rng.sample(chunks[target].split(), QUERY_WORDS))
+        started = time.perf_counter()
+        results = index.search(provider.embed_query(query), RAG_TOP_K)
+        latencies.append(time.perf_counter() - started)
+        hits += target in [payload for _, payload in results]
+
+    latencies.sort()
+    print(f"{VIDEOS} videos x {WORDS_PER_VIDEO} words -> {chunk_count} chunks "
+          f"({RAG_CHUNK_WORDS} words, {RAG_CHUNK_OVERLAP_WORDS} overlap), dim 2^{provider.dim.bit_length() - 1}\n")
+    print(f"  indexing (chunk + embed + index)   {indexing:>8.2f} s   {chunk_count / indexing:>8.0f} chunks/s")
+    print(f"  query p50                          {statistics.median(latencies) * 1000:>8.2f} ms")
+    print(f"  query p95                          {latencies[int(len(latencies) * 0.95)] * 1000:>8.2f} ms")
+    print(f"  hit@{RAG_TOP_K} ({QUERY_WORDS}-word queries)          {hits / QUERIES:>8.1%}")
+    print(f"\n  gemini provider would need {-(-chunk_count // EMBED_BATCH_SIZE)} embed_content requests "
+          f"for the same chunks")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark: keyword vs vector vs hybrid retrieval on lecture-like transcripts
+
+Offline relevance test. Synthetic transcripts are built from sections, each
+about a few topic words (used in varying inflections) plus code identifiers
+made of the same words. Transcripts are chunked as retrieval does
+(chunk_transcript), and two kinds of questions are asked:
+
+- identifier: names a code identifier verbatim ("what does parse_qsort do")
+- paraphrase: names the section's topics in an inflection that never occurs
+  in the transcript ("flumenize the gorbation"), which exact keyword matching
+  cannot see
+
+A chunk is relevant if it contains the identifier (identifier questions) or
+all the topic stems (paraphrase questions). The vector side uses the local
+hashed n-gram provider so the run needs no network; with Gemini embeddings
+paraphrase recall is what improves, identifier recall is what BM25 adds.
+
+Reports recall@k (share of relevant chunks in the top k, capped at k) and
+per-question latency for each mode (hybrid runs its two searches one after
+the other here; the service runs them in parallel).
+
+Run from the backend folder:
+    python benchmarks/bench_retrieval.py [questions]
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.embedding_service import HashedNgramProvider
+from services.retrieval_service import (
+    fuse_rankings, merge_overlapping, RAG_CHUNK_WORDS, RAG_CHUNK_OVERLAP_WORDS, RAG_TOP_K
+)
+from services.transcript_service import chunk_transcript
+from utils.bm25 import BM25Index
+from utils.vector_index import SparseVectorIndex
+
+QUESTIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+VIDEOS = 20
+SECTIONS = 24
+SECTION_WORDS = 160
+STEM_POOL = 16
+SUFFIXES = ('', 's', 'ing', 'ed', 'ation')  # Used in transcripts
+QUERY_SUFFIXES = ('ize', 'ism')             # Only used in paraphrase questions
+FILLER = ('so', 'now', 'basically', 'right', 'we', 'look', 'here', 'okay', 'this', 'one', 'then', 'see')
+
+
+def word(rng, length):
+    return ''.join(rng.choice('bcdfghklmnprstvz') + rng.choice('aeiou') for _ in range(length))
+
+
+def build_video(rng):
+    # Topics recur across a lecture and identifiers are built from the same
+    # vocabulary (parse_tree, tree_node, ...), so neither signal is trivially unique
+    pool = [word(rng, 3) for _ in range(STEM_POOL)]
+    sections = []
+    for _ in range(SECTIONS):
+        stems = rng.sample(pool, 3)
+        identifiers = ['_'.join(rng.sample(pool, 2)) for _ in range(2)]
+        words = []
+        for _ in range(SECTION_WORDS):
+            roll = rng.random()
+            if roll < 0.12:
+                words.append(rng.choice(stems) + rng.choice(SUFFIXES))
+            elif roll < 0.14:
+                words.append(rng.choice(identifiers))
+            else:
+                words.append(rng.choice(FILLER) if rng.random() < 0.5 else word(rng, rng.randint(1, 3)))
+        sections.append((stems, identifiers, words))
+    transcript = ' '.join(w for _, _, words in sections for w in words)
+    return sections, transcript
+
+
+def main():
+    rng = random.Random(11)
+    provider = HashedNgramProvider()
+    videos = []
+    for _ in range(VIDEOS):
+        sections, transcript = build_video(rng)
+        texts = chunk_transcript(transcript, chunk_size=RAG_CHUNK_WORDS, overlap=RAG_CHUNK_OVERLAP_WORDS)
+        chunks = [{'chunk_index': i, 'text': text} for i, text in enumerate(texts)]
+        vectors = SparseVectorIndex(provider.dim)
+        vectors.add(provider.embed_documents(texts), chunks)
+        bm25 = BM25Index()
+        for chunk in chunks:
+            bm25.add(str(chunk['chunk_index']), chunk['text'])
+        videos.append((sections, chunks, vectors, bm25))
+
+    def vector_ranking(video, query, depth):
+        _, _, vectors, _ = video
+        return [dict(chunk, score=score) for score, chunk in vectors.search(provider.embed_query(query), depth)]
+
+    def keyword_ranking(video, query, depth):
+        _, chunks, _, bm25 = video
+        return [dict(chunks[int(hit['key'])], score=hit['score']) for hit in bm25.search(query, depth)]
+
+    modes = {
+        'keyword': lambda video, query: fuse_rankings([keyword_ranking(video, query, 20)]),
+        'vector': lambda video, query: fuse_rankings([vector_ranking(video, query, 20)]),
+        'hybrid': lambda video, query: fuse_rankings([vector_ranking(video, query, 20), keyword_ranking(video, query, 20)]),
+    }
+
+    questions = []
+    for i in range(QUESTIONS):
+        video = rng.choice(videos)
+        stems, identifiers, _ = rng.choice(video[0])
+        if i % 2:
+            identifier = rng.choice(identifiers)
+            query = f"what does {identifier} do"
+            relevant = {c['chunk_index'] for c in video[1] if identifier in c['text'].split()}
+            kind = 'identifier'
+        else:
+            picked = rng.sample(stems, 2)
+            query = ' '.join(stem + rng.choice(QUERY_SUFFIXES) for stem in picked)
+            relevant = {c['chunk_index'] for c in video[1]
+                        if all(any(w.startswith(stem) for w in c['text'].split()) for stem in picked)}
+            kind = 'paraphrase'
+        if relevant:
+            questions.append((kind, video, query, relevant))
+
+    print(f"{len(questions)} questions over {VIDEOS} videos "
+          f"({RAG_CHUNK_WORDS}-word chunks, {RAG_CHUNK_OVERLAP_WORDS} overlap), recall@{RAG_TOP_K}\n")
+    print(f"  {'mode':<10}{'identifier':>12}{'paraphrase':>12}{'all':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, run in modes.items():
+        recall = {'identifier': [], 'paraphrase': []}
+        latencies = []
+        for kind, video, query, relevant in questions:
+            started = time.perf_counter()
+            top = run(video, query)[:RAG_TOP_K]
+            merge_overlapping(top)
+            latencies.append(time.perf_counter() - started)
+            found = {chunk['chunk_index'] for chunk in top}
+            recall[kind].append(len(found & relevant) / min(len(relevant), RAG_TOP_K))
+        latencies.sort()
+        overall = recall['identifier'] + recall['paraphrase']
+        print(f"  {name:<10}{statistics.mean(recall['identifier']):>12.1%}{statistics.mean(recall['paraphrase']):>12.1%}"
+              f"{statistics.mean(overall):>10.1%}{statistics.median(latencies) * 1000:>10.2f}"
+              f"{latencies[int(len(latencies) * 0.95)] * 1000:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
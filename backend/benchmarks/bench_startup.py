@@ -0,0 +1,95 @@
+"""
+Benchmark: cold import time of the Flask app
+
+Runs `python -X importtime -c "import app"` in fresh interpreters (what a
+gunicorn worker or a cold serverless start pays before serving anything),
+and reports the median cumulative import time of `app` plus the heaviest
+third-party packages pulled in at import.
+
+Dummy API keys are set so import-time SDK setup behaves as in production
+without touching the network.
+
+Run from the backend folder:
+    python benchmarks/bench_startup.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+TOP = 12
+
+# Top-level packages worth tracking individually
+WATCHED = ('google', 'googleapiclient', 'supabase', 'postgrest', 'httpx', 'pypdf',
+           'youtube_transcript_api', 'grpc', 'numpy', 'flask')
+
+ENV = dict(
+    os.environ,
+    YOUTUBE_API_KEY='benchmark',
+    GEMINI_API_KEY='benchmark',
+    SUPABASE_URL='https://benchmark.supabase.co',
+    SUPABASE_KEY='benchmark',
+    PYTHONDONTWRITEBYTECODE='1'
+)
+
+
+def run_once():
+    """Import app once; returns (wall seconds, app cumulative us, {top-level package: self us})"""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=BACKEND_DIR, env=ENV, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise SystemExit(f"import app failed:\n{proc.stderr[-2000:]}")
+
+    app_us = 0
+    packages = {}
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        if name == 'app':
+            app_us = int(cumulative_us)
+        # Self times add up without double counting nested imports
+        root = name.split('.')[0]
+        packages[root] = packages.get(root, 0) + int(self_us)
+    return wall, app_us, packages
+
+
+def main():
+    walls, app_times = [], []
+    samples = {}
+    for _ in range(RUNS):
+        wall, app_us, packages = run_once()
+        walls.append(wall)
+        app_times.append(app_us)
+        for name, us in packages.items():
+            samples.setdefault(name, []).append(us)
+
+    medians = {name: statistics.median(values) for name, values in samples.items()}
+
+    print(f"Runs: {RUNS}")
+    print(f"Interpreter wall time (median): {statistics.median(walls) * 1000:.0f} ms")
+    print(f"import app cumulative (median): {statistics.median(app_times) / 1000:.0f} ms")
+
+    print("\nWatched packages loaded at import (ms, '-' = not imported):")
+    for root in WATCHED:
+        us = medians.get(root)
+        print(f"  {root:<24}{us / 1000:>8.1f}" if us else f"  {root:<24}{'-':>8}")
+
+    print(f"\nTop {TOP} packages by import time:")
+    ranked = sorted(((us, name) for name, us in medians.items() if name != 'app'), reverse=True)
+    for us, name in ranked[:TOP]:
+        print(f"  {name:<32}{us / 1000:>8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
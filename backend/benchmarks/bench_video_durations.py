@@ -0,0 +1,100 @@
+"""
+Benchmark: get_video_durations on synthetic playlists
+
+Compares the previous nested-scan merge with the indexed, concurrent
+enrich_video_durations. The YouTube client is replaced with a fake that
+answers videos().list from memory after a fixed simulated latency, so no
+API key or network access is needed.
+
+Run from the backend folder:
+    python benchmarks/bench_video_durations.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('YOUTUBE_API_KEY', 'benchmark')
+
+import isodate
+from services import youtube_service
+from services.youtube_service import enrich_video_durations, format_duration
+
+SIZES = [500, 1000, 2000, 5000]
+DUPLICATE_EVERY = 10         # Every 10th playlist entry repeats an earlier video
+SIMULATED_LATENCY = 0.05     # Seconds per videos().list call
+
+
+class FakeRequest:
+    def __init__(self, ids):
+        self.ids = ids
+
+    def execute(self, http=None):
+        time.sleep(SIMULATED_LATENCY)
+        return {'items': [
+            {'id': vid, 'contentDetails': {'duration': f"PT{(hash(vid) % 50) + 1}M{hash(vid) % 60}S"}}
+            for vid in self.ids
+        ]}
+
+
+class FakeVideos:
+    def list(self, part, id):
+        return FakeRequest(id.split(','))
+
+
+class FakeYouTube:
+    def videos(self):
+        return FakeVideos()
+
+
+def make_playlist(n: int) -> list:
+    videos = []
+    for i in range(n):
+        vid = f"vid{i // 2:06d}" if i % DUPLICATE_EVERY == 0 and i else f"vid{i:06d}"
+        videos.append({'video_id': vid, 'title': f"Lecture {i}"})
+    return videos
+
+
+def legacy_get_video_durations(videos: list) -> list:
+    """The pre-index implementation: serial batches + linear scan per item"""
+    video_ids = [v['video_id'] for v in videos]
+    for i in range(0, len(video_ids), 50):
+        batch_ids = video_ids[i:i + 50]
+        response = youtube_service._get_youtube().videos().list(part='contentDetails', id=','.join(batch_ids)).execute()
+        for item in response['items']:
+            duration_seconds = int(isodate.parse_duration(item['contentDetails']['duration']).total_seconds())
+            for video in videos:
+                if video['video_id'] == item['id']:
+                    video['duration_seconds'] = duration_seconds
+                    video['duration_formatted'] = format_duration(duration_seconds)
+                    break
+    return videos
+
+
+def run(label: str, fn, n: int):
+    videos = make_playlist(n)
+    started = time.perf_counter()
+    fn(videos)
+    elapsed = time.perf_counter() - started
+    missing = sum(1 for v in videos if 'duration_seconds' not in v)
+    print(f"  {label:<10} n={n:<5} {elapsed * 1000:9.1f} ms   missing durations: {missing}")
+    return elapsed
+
+
+def main():
+    youtube_service._youtube = FakeYouTube()
+
+    global SIMULATED_LATENCY
+    for latency in (0.0, SIMULATED_LATENCY):
+        SIMULATED_LATENCY = latency
+        print(f"\nSimulated API latency: {latency * 1000:.0f} ms per batch")
+        print("=" * 60)
+        for n in SIZES:
+            legacy = run('legacy', legacy_get_video_durations, n)
+            indexed = run('indexed', enrich_video_durations, n)
+            print(f"  speedup: {legacy / indexed:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
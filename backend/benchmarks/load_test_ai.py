@@ -0,0 +1,140 @@
+"""
+Load test: concurrent Gemini generations
+
+Offline (default): the Gemini model is replaced with a fake that answers
+after SIMULATED_LATENCY seconds, and CONCURRENCY generation requests are
+served three ways:
+
+- sync workers: one request per worker process (SYNC_WORKERS slots)
+- gthread: SYNC_WORKERS x THREADS slots
+- asyncio: generate_json_content_async on the shared loop (utils.async_runner)
+
+Live: fire concurrent requests at a running server while probing /health,
+to compare gunicorn worker classes end to end:
+
+    GUNICORN_WORKER_CLASS=sync    gunicorn -c gunicorn.conf.py app:app
+    GUNICORN_WORKER_CLASS=gthread gunicorn -c gunicorn.conf.py app:app
+    python benchmarks/load_test_ai.py --url http://localhost:5000 \\
+        --path /api/ai/summarize --body '{"transcript": "..."}'
+
+Run from the backend folder:
+    python benchmarks/load_test_ai.py [--url URL ...]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CONCURRENCY = 24
+SIMULATED_LATENCY = 0.5  # Seconds per generation (real calls take 5-20 s)
+SYNC_WORKERS = 4
+THREADS = 8
+
+
+class FakeResponse:
+    text = '{"ok": true}'
+
+
+class FakeModel:
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(SIMULATED_LATENCY)
+        return FakeResponse()
+
+    async def generate_content_async(self, prompt, **kwargs):
+        await asyncio.sleep(SIMULATED_LATENCY)
+        return FakeResponse()
+
+
+def run_offline():
+    from services import gemini_service
+    from utils.async_runner import gather
+
+    gemini_service._model = FakeModel()
+    gemini_service.generate_json_content('warm-up', use_cache=False)  # Pay the SDK import outside the timings
+    prompts = [f"quiz request {i}" for i in range(CONCURRENCY)]
+
+    def pool(slots):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=slots) as executor:
+            list(executor.map(lambda p: gemini_service.generate_json_content(p, use_cache=False), prompts))
+        return time.perf_counter() - started
+
+    def async_loop():
+        started = time.perf_counter()
+        gather([gemini_service.generate_json_content_async(p, use_cache=False) for p in prompts])
+        return time.perf_counter() - started
+
+    print(f"{CONCURRENCY} concurrent generations, {SIMULATED_LATENCY * 1000:.0f} ms each\n")
+    results = [
+        (f"sync workers ({SYNC_WORKERS} slots)", pool(SYNC_WORKERS)),
+        (f"gthread ({SYNC_WORKERS}x{THREADS} slots)", pool(SYNC_WORKERS * THREADS)),
+        ("asyncio (one loop)", async_loop()),
+    ]
+    baseline = results[0][1]
+    for name, elapsed in results:
+        print(f"  {name:<28}{elapsed * 1000:>8.0f} ms   {CONCURRENCY / elapsed:>6.1f} req/s   {baseline / elapsed:>5.1f}x")
+
+
+def run_live(url, path, body, concurrency):
+    latencies, health = [], []
+    done = threading.Event()
+
+    def request():
+        req = urllib.request.Request(url + path, data=body.encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+        started = time.perf_counter()
+        try:
+            urllib.request.urlopen(req, timeout=300).read()
+        except Exception as e:
+            print(f"  request failed: {e}")
+        latencies.append(time.perf_counter() - started)
+
+    def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            try:
+                urllib.request.urlopen(url + '/health', timeout=30).read()
+                health.append(time.perf_counter() - started)
+            except Exception:
+                health.append(float('inf'))
+            time.sleep(0.25)
+
+    prober = threading.Thread(target=probe, daemon=True)
+    prober.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(request)
+    elapsed = time.perf_counter() - started
+    done.set()
+    prober.join()
+
+    print(f"{concurrency} concurrent POST {path}: {elapsed:.1f} s total, {concurrency / elapsed:.2f} req/s")
+    print(f"  request latency p50 {statistics.median(latencies):.2f} s, max {max(latencies):.2f} s")
+    failed = sum(1 for h in health if h == float('inf'))
+    ok = [h for h in health if h != float('inf')] or [0]
+    print(f"  /health during load: p50 {statistics.median(ok) * 1000:.0f} ms, "
+          f"max {max(ok) * 1000:.0f} ms, {failed} timeouts")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', help='Base URL of a running server (omit for the offline comparison)')
+    parser.add_argument('--path', default='/api/ai/summarize')
+    parser.add_argument('--body', default=json.dumps({'transcript': 'Load test transcript. ' * 200}))
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    args = parser.parse_args()
+
+    if args.url:
+        run_live(args.url.rstrip('/'), args.path, args.body, args.concurrency)
+    else:
+        run_offline()
@@ -0,0 +1,34 @@
+"""
+Gunicorn configuration
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Gemini calls take 5-20 s, so the default sync worker (one request per process)
+is exhausted by a handful of concurrent AI requests and /health starts timing
+out. Two concurrent worker classes are supported:
+
+- gthread (default): each worker serves GUNICORN_THREADS requests at once.
+  Slow generations hold a thread, not the whole process.
+- gevent (pip install gevent): thousands of greenlets per worker. grpc, which
+  the Gemini SDK uses, is made gevent-cooperative after fork. Use the sync
+  gemini_service API with this worker class, not utils.async_runner.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('GUNICORN_WORKERS', str(min(4, multiprocessing.cpu_count() * 2 + 1))))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))  # gevent only
+# Long enough for a slow generation plus transcript fetch
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+
+def post_worker_init(worker):
+    if worker_class == 'gevent':
+        from grpc.experimental import gevent as grpc_gevent
+        grpc_gevent.init_gevent()
@@ -1,4 +1,5 @@
 from services.gemini_service import generate_json_content
+from services.summarization_service import condense_transcript
 import json
 
 def generate_course_summary(transcript: str) -> dict:
@@ -15,7 +16,7 @@ def generate_course_summary(transcript: str) -> dict:
 Analyze this YouTube course transcript and provide a structured analysis.
 
 TRANSCRIPT:
-{transcript[:5000]}
+{condense_transcript(transcript)}
 
 Provide the following in JSON format:
 {{
@@ -56,7 +57,7 @@ def analyze_difficulty(transcript: str) -> dict:
 Analyze the difficulty level of this educational content.
 
 TRANSCRIPT:
-{transcript[:3000]}
+{condense_transcript(transcript)}
 
 Consider:
 - Technical jargon density
@@ -3,10 +3,11 @@ AI Learning Tools Service
 Provides quiz generation, flashcards, summaries, and personalized learning features
 """
 
-from services.gemini_service import get_gemini_response
+from services.gemini_service import get_gemini_response, generate_json_content
+from services.summarization_service import condense_transcript, condense_timed_transcript
 import json
 
-def generate_quiz_from_transcript(transcript, difficulty='medium', num_questions=5):
+def generate_quiz_from_transcript(transcript, difficulty='medium', num_questions=5, strict=False):
     """
     Generate quiz questions from video transcript
     
@@ -14,6 +15,7 @@ def generate_quiz_from_transcript(transcript, difficulty='medium', num_questions
         transcript (str): Video transcript text
         difficulty (str): 'easy', 'medium', or 'hard'
         num_questions (int): Number of questions to generate
+        strict (bool): Raise ValueError instead of returning placeholder questions
     
     Returns:
         list: Quiz questions with options and answers
@@ -22,7 +24,7 @@ def generate_quiz_from_transcript(transcript, difficulty='medium', num_questions
     Based on this video transcript, generate {num_questions} {difficulty} difficulty multiple-choice quiz questions.
     
     Transcript:
-    {transcript[:3000]}...
+    {condense_transcript(transcript)}
     
     For each question provide:
     1. Question text
@@ -49,6 +51,8 @@ def generate_quiz_from_transcript(transcript, difficulty='medium', num_questions
         questions = json.loads(response)
         return questions
     except:
+        if strict:
+            raise ValueError("Quiz response was not valid JSON")
         # Fallback if JSON parsing fails
         return [{
             'question': 'What is the main topic covered in this video?',
@@ -62,13 +66,14 @@ def generate_quiz_from_transcript(transcript, difficulty='medium', num_questions
             'explanation': 'Based on the video content.'
         }]
 
-def generate_flashcards(transcript, num_cards=10):
+def generate_flashcards(transcript, num_cards=10, strict=False):
     """
     Generate flashcards from video content
     
     Args:
         transcript (str): Video transcript
         num_cards (int): Number of flashcards to create
+        strict (bool): Raise ValueError instead of returning placeholder cards
     
     Returns:
         list: Flashcards with front/back content
@@ -77,7 +82,7 @@ def generate_flashcards(transcript, num_cards=10):
     Create {num_cards} flashcards from this educational content.
     
     Content:
-    {transcript[:3000]}...
+    {condense_transcript(transcript)}
     
     Each flashcard should have:
     - Front: A concise question or term
@@ -101,19 +106,22 @@ def generate_flashcards(transcript, num_cards=10):
         flashcards = json.loads(response)
         return flashcards
     except:
+        if strict:
+            raise ValueError("Flashcards response was not valid JSON")
         return [{
             'front': 'Key Concept',
             'back': 'Important information from the video',
             'category': 'concept'
         }]
 
-def generate_video_summary(transcript, title):
+def generate_video_summary(transcript, title, strict=False):
     """
     Generate concise video summary
     
     Args:
         transcript (str): Full video transcript
         title (str): Video title
+        strict (bool): Raise ValueError instead of returning a placeholder summary
     
     Returns:
         dict: Summary with different sections
@@ -124,7 +132,7 @@ def generate_video_summary(transcript, title):
     Title: {title}
     
     Transcript:
-    {transcript[:4000]}...
+    {condense_transcript(transcript)}
     
     Provide:
     1. TL;DR (2-3 sentences)
@@ -141,6 +149,8 @@ def generate_video_summary(transcript, title):
     try:
         summary = json.loads(response)
     except:
+        if strict:
+            raise ValueError("Summary response was not valid JSON")
         summary = {
             'tldr': 'This video covers important concepts.',
             'key_points': ['Point 1', 'Point 2', 'Point 3'],
@@ -151,24 +161,30 @@ def generate_video_summary(transcript, title):
     
     return summary
 
-def generate_chapter_recommendations(transcript, duration_seconds):
+def generate_chapter_recommendations(transcript, duration_seconds, strict=False, timed=None):
     """
     Generate chapter markers and timestamp recommendations
     
     Args:
-        transcript (str): Video transcript with timestamps
+        transcript (str): Video transcript text
         duration_seconds (int): Total video duration
+        strict (bool): Raise ValueError instead of returning evenly spaced placeholders
+        timed (TimedTranscript): Segment timings; when non-empty, the prompt carries real
+            times and chapter timestamps are snapped to segment starts
     
     Returns:
         list: Chapter markers with timestamps and titles
     """
+    if timed and not duration_seconds:
+        duration_seconds = int(timed.end_time)
+    
     prompt = f"""
     Analyze this video transcript and create chapter markers.
     
     Duration: {duration_seconds} seconds ({duration_seconds//60} minutes)
-    
+    {_TIME_MARKER_NOTE if timed else ''}
     Transcript:
-    {transcript[:4000]}...
+    {_prompt_transcript(transcript, timed)}
     
     Identify 5-8 natural chapter breaks and provide:
     1. Timestamp (in seconds)
@@ -190,6 +206,8 @@ def generate_chapter_recommendations(transcript, duration_seconds):
     try:
         chapters = json.loads(response)
     except:
+        if strict:
+            raise ValueError("Chapters response was not valid JSON")
         # Create basic chapters
         chapters = [
             {'timestamp': 0, 'title': 'Introduction', 'description': 'Video introduction'},
@@ -197,7 +215,102 @@ def generate_chapter_recommendations(transcript, duration_seconds):
             {'timestamp': duration_seconds - 120, 'title': 'Conclusion', 'description': 'Summary and next steps'}
         ]
     
-    return chapters
+    return snap_chapters(chapters, timed) if timed else chapters
+
+def snap_chapters(chapters, timed):
+    """
+    Move chapter timestamps to the start of the nearest transcript segment
+    
+    Args:
+        chapters (list): Chapter dicts with a 'timestamp' in seconds
+        timed (TimedTranscript): Segment timings of the video
+    
+    Returns:
+        list: Chapters in time order, one per distinct snapped timestamp
+    """
+    if not isinstance(chapters, list) or not timed:
+        return chapters
+    
+    snapped = {}
+    for chapter in chapters:
+        try:
+            seconds = float(chapter['timestamp'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        timestamp = int(timed.snap_time(seconds))
+        snapped.setdefault(timestamp, dict(chapter, timestamp=timestamp))
+    return [snapped[timestamp] for timestamp in sorted(snapped)]
+
+_TIME_MARKER_NOTE = "Markers like [95s] give the time (seconds from the start) of the text that follows; use them for timestamps.\n"
+
+def _prompt_transcript(transcript, timed):
+    return condense_timed_transcript(timed) if timed else condense_transcript(transcript)
+
+def generate_study_pack(transcript, title, duration_seconds=0, difficulty='medium', num_questions=5, num_cards=10,
+                        timed=None):
+    """
+    Generate summary, quiz, flashcards and chapter markers in one JSON generation
+    
+    Args:
+        transcript (str): Video transcript
+        title (str): Video title
+        duration_seconds (int): Total video duration
+        difficulty (str): Quiz difficulty
+        num_questions (int): Number of quiz questions
+        num_cards (int): Number of flashcards
+        timed (TimedTranscript): Segment timings for chapter timestamps (optional)
+    
+    Returns:
+        dict: {summary, quiz, flashcards, chapters}; a section is None if the
+        response did not contain a usable value for it
+    """
+    if timed and not duration_seconds:
+        duration_seconds = int(timed.end_time)
+    
+    prompt = f"""
+    Create a complete study pack for this educational video.
+    
+    Title: {title}
+    Duration: {duration_seconds} seconds ({duration_seconds//60} minutes)
+    {_TIME_MARKER_NOTE if timed else ''}
+    Transcript:
+    {_prompt_transcript(transcript, timed)}
+    
+    Provide all four sections:
+    1. summary: TL;DR (2-3 sentences), key points (5-7), main takeaways (3 actionable insights),
+       prerequisites (what to know before watching), next steps (what to learn after this)
+    2. quiz: {num_questions} {difficulty} difficulty multiple-choice questions on key concepts and
+       practical understanding, each with four options, the correct answer and a 2-3 sentence explanation
+    3. flashcards: {num_cards} cards on key concepts, definitions, formulas and important facts;
+       front is a concise question or term, back is a clear answer (2-3 sentences max)
+    4. chapters: 5-8 natural chapter breaks with timestamp (seconds), title (5-8 words) and a one-sentence description
+    
+    Format as JSON:
+    {{
+        "summary": {{"tldr": "...", "key_points": ["..."], "takeaways": ["..."], "prerequisites": ["..."], "next_steps": ["..."]}},
+        "quiz": [{{"question": "...", "options": {{"A": "...", "B": "...", "C": "...", "D": "..."}}, "correct_answer": "A", "explanation": "..."}}],
+        "flashcards": [{{"front": "...", "back": "...", "category": "concept/definition/formula"}}],
+        "chapters": [{{"timestamp": 0, "title": "...", "description": "..."}}]
+    }}
+    """
+    
+    response = generate_json_content(prompt)
+    
+    try:
+        pack = json.loads(response)
+    except ValueError:
+        pack = {}
+    if not isinstance(pack, dict):
+        pack = {}
+    
+    expected = {'summary': dict, 'quiz': list, 'flashcards': list, 'chapters': list}
+    sections = {
+        section: pack.get(section) if isinstance(pack.get(section), kind) and pack.get(section) else None
+        for section, kind in expected.items()
+    }
+    if timed and sections['chapters']:
+        sections['chapters'] = snap_chapters(sections['chapters'], timed) or None
+    return sections
 
 def generate_personalized_notes(transcript, user_learning_style='visual', focus_areas=None):
     """
@@ -217,7 +330,7 @@ def generate_personalized_notes(transcript, user_learning_style='visual', focus_
     Create personalized study notes for a {user_learning_style} learner.
     
     Content:
-    {transcript[:3000]}...
+    {condense_transcript(transcript)}
     
     Focus on: {focus_text}
     
@@ -1,4 +1,5 @@
 from services.gemini_service import generate_json_content
+from services.summarization_service import condense_transcript
 import json
 
 def generate_quiz(transcript: str, num_questions: int = 5, difficulty: str = 'Medium') -> dict:
@@ -17,7 +18,7 @@ def generate_quiz(transcript: str, num_questions: int = 5, difficulty: str = 'Me
 Generate {num_questions} multiple-choice questions from this video transcript.
 
 TRANSCRIPT:
-{transcript[:4000]}
+{condense_transcript(transcript)}
 
 DIFFICULTY: {difficulty}
 
@@ -72,7 +73,7 @@ def generate_flashcards(transcript: str, num_cards: int = 10) -> dict:
 Generate {num_cards} flashcards for key concepts from this content.
 
 TRANSCRIPT:
-{transcript[:3000]}
+{condense_transcript(transcript)}
 
 Return JSON:
 {{
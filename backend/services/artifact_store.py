@@ -0,0 +1,64 @@
+"""
+Per-video AI artifact store
+
+Generated study material (summary, quiz, flashcards, chapters) is stored
+per artifact, keyed by (video_id, artifact, version, params), so an artifact
+produced by the study pack can be served by its individual endpoint and vice
+versa. Bumping an artifact's version (after a prompt or format change) stops
+older entries from being served.
+Storage reuses the response cache backends (AI_CACHE_BACKEND); keys are
+namespaced so they never collide with prompt-addressed responses.
+"""
+
+import hashlib
+import json
+from services.response_cache import ResponseCache, create_backend, AI_CACHE_BACKEND
+
+ARTIFACTS = ('summary', 'quiz', 'flashcards', 'chapters')
+
+# Bump when an artifact's prompt or output format changes
+ARTIFACT_VERSIONS = {
+    'summary': 1,
+    'quiz': 1,
+    'flashcards': 1,
+    'chapters': 2  # Timed transcript prompt, timestamps snapped to segment starts
+}
+
+def artifact_key(video_id: str, artifact: str, params: dict = None) -> str:
+    """
+    Build the storage key for an artifact
+
+    Args:
+        video_id: YouTube video ID
+        artifact: One of ARTIFACTS
+        params: Generation parameters that change the artifact (e.g. num_questions)
+
+    Returns:
+        Key string
+    """
+    digest = hashlib.sha256(json.dumps(params or {}, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    return f"artifact:{video_id}:{artifact}:v{ARTIFACT_VERSIONS[artifact]}:{digest}"
+
+def get_artifact(video_id: str, artifact: str, params: dict = None):
+    """Return the stored artifact (decoded JSON), or None"""
+    raw = _store.get(artifact_key(video_id, artifact, params))
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+def put_artifact(video_id: str, artifact: str, params: dict, value, elapsed_seconds: float = 0.0):
+    """Store an artifact; elapsed_seconds is its share of the generation time (for stats)"""
+    _store.set(
+        artifact_key(video_id, artifact, params),
+        json.dumps(value, ensure_ascii=False),
+        model=f"artifact:{artifact}",
+        elapsed_seconds=elapsed_seconds
+    )
+
+def stats() -> dict:
+    return _store.stats()
+
+_store = ResponseCache(create_backend(AI_CACHE_BACKEND))
@@ -0,0 +1,295 @@
+"""
+Server-side chat sessions with a token-budgeted conversation window
+
+/api/ai/chat used to be stateless: clients that wanted follow-up questions
+resent the whole history, so prompts (and latency) grew with every turn. A
+session logs its turns in ai_chat_history and keeps a rolling summary in
+ai_chat_sessions. The prompt gets the summary plus the most recent turns that
+fit CHAT_HISTORY_TOKENS. Once the unsummarized turns pass that budget, the
+oldest are folded into the summary in the background (one Gemini call) until
+they are under half of it, so a fold happens every few turns instead of on
+every turn and never delays an answer. The summary is capped at
+CHAT_SUMMARY_TOKENS, so the history part of a prompt has a fixed ceiling
+however long the conversation runs.
+
+With Supabase configured every request reloads the session (the session row
+plus the newest unsummarized turns, one query each) so all workers see the
+same conversation; a fold reads the oldest unsummarized turns separately.
+Otherwise sessions live in an in-process LRU.
+"""
+
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from utils.cache import LRUCache
+from services.gemini_service import generate_content
+from services.summarization_service import chars_per_token, estimate_tokens
+from services.supabase_client import get_supabase
+
+# Recent turns sent verbatim with each question
+CHAT_HISTORY_TOKENS = int(os.getenv('CHAT_HISTORY_TOKENS', '1500'))
+# Ceiling for the rolling summary of older turns
+CHAT_SUMMARY_TOKENS = int(os.getenv('CHAT_SUMMARY_TOKENS', '400'))
+CHAT_SESSION_CACHE_SIZE = int(os.getenv('CHAT_SESSION_CACHE_SIZE', '256'))
+
+SESSIONS_TABLE = 'ai_chat_sessions'
+HISTORY_TABLE = 'ai_chat_history'
+MAX_LOADED_TURNS = 50  # Unsummarized turns read per request or folded at once; folding keeps far fewer
+
+# session_id -> ChatSession (used when Supabase is not configured)
+_sessions = LRUCache(max_entries=CHAT_SESSION_CACHE_SIZE)
+# Folds run off the request thread; one at a time per session
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='chat-fold')
+_folding = set()
+_folding_lock = threading.Lock()
+_counters = {'folds': 0, 'folded_turns': 0, 'fold_failures': 0}
+
+
+class SessionNotFound(LookupError):
+    pass
+
+
+class ChatSession:
+    def __init__(self, session_id: str, user_id: str, summary: str = '',
+                 summarized_turns: int = 0, turns: list = None, unsummarized: int = None):
+        self.id = session_id
+        self.user_id = user_id
+        self.summary = summary
+        self.summarized_turns = summarized_turns  # Oldest turns already covered by summary
+        self.turns = turns or []                  # Newest [(user_message, ai_response)] not yet folded
+        # Turns not yet folded; more than len(turns) if only the newest were loaded
+        self.unsummarized = len(self.turns) if unsummarized is None else unsummarized
+        self.lock = threading.Lock()
+
+
+def get_session(session_id: str = None, user_id: str = None) -> ChatSession:
+    """
+    Load a chat session, or start one
+
+    Args:
+        session_id: Existing session to continue (None starts a new session)
+        user_id: Owner; must match an existing session's owner
+
+    Returns:
+        ChatSession
+
+    Raises:
+        SessionNotFound: Unknown session_id, or one owned by another user
+        ValueError: No user_id
+    """
+    if not user_id:
+        raise ValueError("user_id is required for chat sessions")
+    if session_id:
+        session = _load(session_id)
+        if session is None or str(session.user_id) != str(user_id):
+            raise SessionNotFound(session_id)
+        return session
+
+    session = ChatSession(str(uuid.uuid4()), user_id)
+    supabase = get_supabase()
+    if supabase is None:
+        _sessions.set(session.id, session)
+    else:
+        supabase.table(SESSIONS_TABLE).insert({'id': session.id, 'user_id': user_id}).execute()
+    return session
+
+def history_prompt(session: ChatSession) -> str:
+    """
+    Conversation context for the next question
+
+    Returns:
+        The rolling summary followed by the most recent turns that fit
+        CHAT_HISTORY_TOKENS ('' for a new session)
+    """
+    with session.lock:
+        summary, turns = session.summary, list(session.turns)
+    parts = []
+    if summary:
+        parts.append(f"CONVERSATION SUMMARY:\n{summary}")
+    recent = recent_turns(turns, CHAT_HISTORY_TOKENS)
+    if recent:
+        parts.append("RECENT CONVERSATION:\n" + '\n\n'.join(_format_turn(turn) for turn in recent))
+    return '\n\n'.join(parts)
+
+def record_turn(session: ChatSession, user_message: str, ai_response: str, context: dict = None):
+    """
+    Log a question and its answer, folding older turns once over budget
+
+    Args:
+        session: Session the turn belongs to
+        user_message: The user's message
+        ai_response: The assistant's answer
+        context: Stored with the turn (video_id, sources, ...)
+    """
+    supabase = get_supabase()
+    if supabase is not None:
+        try:
+            supabase.table(HISTORY_TABLE).insert({
+                'session_id': session.id,
+                'user_id': session.user_id,
+                'user_message': user_message,
+                'ai_response': ai_response,
+                'context': context
+            }).execute()
+        except Exception as e:
+            # Not logged, so not counted: summarized_turns must stay an offset into the stored rows
+            print(f"DEBUG: Chat history write failed for session {session.id}: {e}")
+            return
+
+    with session.lock:
+        session.turns.append((user_message, ai_response))
+        session.unsummarized += 1
+        over_budget = turns_to_fold(session.turns, unsummarized=session.unsummarized) > 0
+    if supabase is None:
+        _sessions.set(session.id, session)
+
+    if over_budget:
+        with _folding_lock:
+            if session.id in _folding:
+                return
+            _folding.add(session.id)
+        _executor.submit(_fold, session)
+
+def recent_turns(turns: list, max_tokens: int) -> list:
+    """The newest turns whose combined size fits max_tokens, oldest first"""
+    kept, used = [], 0
+    for turn in reversed(turns):
+        used += _turn_tokens(turn)
+        if used > max_tokens:
+            break
+        kept.append(turn)
+    kept.reverse()
+    return kept
+
+def turns_to_fold(turns: list, max_tokens: int = CHAT_HISTORY_TOKENS, unsummarized: int = None) -> int:
+    """
+    Number of oldest unsummarized turns to fold so the rest fit in half of max_tokens
+
+    Folding below the budget (not just to it) leaves room for a few more turns
+    before the next fold.
+
+    Args:
+        turns: The newest unsummarized turns, oldest first
+        max_tokens: Budget for verbatim turns
+        unsummarized: All unsummarized turns, if only the newest were loaded
+
+    Returns:
+        0 while every unsummarized turn is loaded and they fit max_tokens
+    """
+    unsummarized = len(turns) if unsummarized is None else unsummarized
+    if unsummarized <= len(turns) and sum(_turn_tokens(turn) for turn in turns) <= max_tokens:
+        return 0
+    return unsummarized - len(recent_turns(turns, max_tokens // 2))
+
+def stats() -> dict:
+    """Return session cache and folding counters"""
+    return {
+        'history_tokens': CHAT_HISTORY_TOKENS,
+        'summary_tokens': CHAT_SUMMARY_TOKENS,
+        'sessions': _sessions.stats(),
+        **_counters
+    }
+
+def _fold(session: ChatSession):
+    try:
+        with session.lock:
+            count = min(turns_to_fold(session.turns, unsummarized=session.unsummarized), MAX_LOADED_TURNS)
+            summary, summarized = session.summary, session.summarized_turns
+            folded = session.turns[:count]  # In-process sessions hold every unsummarized turn
+        if count <= 0:
+            return
+
+        supabase = get_supabase()
+        if supabase is not None:
+            # Only the newest turns were loaded; fold the oldest unsummarized ones, not the window's head
+            folded = _oldest_turns(supabase, session.id, summarized, count)
+        if not folded:
+            return
+        # Advance by the turns actually read, which can be fewer than count
+        count = len(folded)
+        new_summary = _summarize(summary, folded)
+        with session.lock:
+            # Turns recorded meanwhile were appended after the folded ones
+            session.summary = new_summary
+            session.summarized_turns = summarized + count
+            session.unsummarized = max(session.unsummarized - count, 0)
+            session.turns = session.turns[len(session.turns) - min(session.unsummarized, len(session.turns)):]
+        _counters['folds'] += 1
+        _counters['folded_turns'] += count
+
+        if supabase is not None:
+            # Compare-and-set: if another worker folded this session first, keep its summary
+            supabase.table(SESSIONS_TABLE).update({
+                'summary': new_summary,
+                'summarized_turns': summarized + count,
+                'updated_at': datetime.now(timezone.utc).isoformat()
+            }).eq('id', session.id).eq('summarized_turns', summarized).execute()
+    except Exception as e:
+        _counters['fold_failures'] += 1
+        print(f"DEBUG: Chat summary fold failed for session {session.id}: {e}")
+    finally:
+        with _folding_lock:
+            _folding.discard(session.id)
+
+def _summarize(summary: str, turns: list) -> str:
+    words = int(CHAT_SUMMARY_TOKENS * 0.7)
+    conversation = '\n\n'.join(_format_turn(turn) for turn in turns)
+    prompt = f"""You keep a running summary of a conversation between a student and a learning assistant.
+Update the summary with the new turns. Keep what the student is studying, the questions they asked
+and the key points of the answers, and anything they said about their goals or level. Drop greetings
+and small talk. Write plain text, at most {words} words.
+
+CURRENT SUMMARY:
+{summary or '(none yet)'}
+
+NEW TURNS:
+{conversation}
+
+UPDATED SUMMARY:"""
+    text = generate_content(prompt, temperature=0.3).strip()
+    if estimate_tokens(text) > CHAT_SUMMARY_TOKENS:
+        # The word limit is a request, not a guarantee; the ceiling is what keeps prompts bounded
+        text = text[:int(CHAT_SUMMARY_TOKENS * chars_per_token())].rsplit(' ', 1)[0]
+    return text
+
+def _oldest_turns(supabase, session_id: str, summarized: int, count: int) -> list:
+    """The count oldest turns after the first summarized ones"""
+    res = supabase.table(HISTORY_TABLE).select(
+        'user_message, ai_response'
+    ).eq('session_id', session_id).order('created_at').range(summarized, summarized + count - 1).execute()
+    return [(r['user_message'], r['ai_response']) for r in res.data]
+
+def _load(session_id: str):
+    supabase = get_supabase()
+    if supabase is None:
+        return _sessions.get(session_id)
+
+    try:
+        uuid.UUID(str(session_id))
+    except ValueError:
+        return None
+    res = supabase.table(SESSIONS_TABLE).select(
+        'id, user_id, summary, summarized_turns'
+    ).eq('id', session_id).limit(1).execute()
+    if not res.data:
+        return None
+    row = res.data[0]
+
+    # Newest turns first; the total count says how many of them are not summarized yet
+    history = supabase.table(HISTORY_TABLE).select(
+        'user_message, ai_response', count='exact'
+    ).eq('session_id', session_id).order('created_at', desc=True).limit(MAX_LOADED_TURNS).execute()
+    unsummarized = max((history.count or 0) - row['summarized_turns'], 0)
+    turns = [(r['user_message'], r['ai_response']) for r in history.data[:unsummarized]]
+    turns.reverse()
+    return ChatSession(row['id'], row['user_id'], row.get('summary') or '', row['summarized_turns'],
+                       turns, unsummarized)
+
+def _format_turn(turn: tuple) -> str:
+    user_message, ai_response = turn
+    return f"USER: {user_message}\nASSISTANT: {ai_response}"
+
+def _turn_tokens(turn: tuple) -> int:
+    return estimate_tokens(_format_turn(turn))
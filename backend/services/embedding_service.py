@@ -0,0 +1,113 @@
+"""
+Embedding providers for transcript retrieval
+
+A provider turns text into fixed-size float32 vectors:
+
+    embed_documents(texts) -> (n, dim) array, for indexed chunks
+    embed_query(text)      -> (dim,) array, for questions
+
+EMBEDDING_PROVIDER selects one:
+
+    gemini - Gemini text-embedding-004 (768 dims, one API call per 100 chunks)
+    hashed - local TF-IDF over hashed word and character n-grams: no network,
+             deterministic, microseconds per chunk. Vectors are sparse
+             (CSRMatrix, `sparse = True`) and log-tf weighted; the index adds
+             idf on the query side (lnc.ltc).
+"""
+
+import os
+import re
+import zlib
+from functools import lru_cache
+import numpy as np
+from services import gemini_service
+from utils.vector_index import CSRMatrix
+
+EMBEDDING_PROVIDER = os.getenv('EMBEDDING_PROVIDER', 'gemini').lower()
+EMBEDDING_HASH_BITS = int(os.getenv('EMBEDDING_HASH_BITS', '18'))
+
+TOKEN_RE = re.compile(r'\w+')
+CHAR_NGRAM_SIZES = (3, 4, 5)
+BIGRAM_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+class GeminiEmbeddingProvider:
+    """Remote embeddings from the Gemini API"""
+
+    name = 'gemini'
+    dim = 768
+    sparse = False
+
+    def embed_documents(self, texts: list) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.asarray(gemini_service.embed_texts(texts, 'retrieval_document'), dtype=np.float32)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return np.asarray(gemini_service.embed_texts([text], 'retrieval_query')[0], dtype=np.float32)
+
+
+class HashedNgramProvider:
+    """Local sparse embeddings: hashed word unigrams/bigrams and character 3-5 grams"""
+
+    name = 'hashed'
+    sparse = True
+
+    def __init__(self, bits: int = EMBEDDING_HASH_BITS):
+        self.dim = 1 << bits
+
+    def embed_documents(self, texts: list) -> CSRMatrix:
+        data, indices, indptr = [], [], [0]
+        for text in texts:
+            terms, weights = self._weights(text)
+            indices.append(terms)
+            data.append(weights)
+            indptr.append(indptr[-1] + len(terms))
+        return CSRMatrix(
+            np.concatenate(data) if data else np.zeros(0, dtype=np.float32),
+            np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32),
+            np.asarray(indptr, dtype=np.int64),
+            self.dim
+        )
+
+    def embed_query(self, text: str) -> CSRMatrix:
+        return self.embed_documents([text])
+
+    def _weights(self, text: str):
+        """Sorted feature ids and their 1 + ln(tf) weights"""
+        tokens = TOKEN_RE.findall(text.lower())
+        if not tokens:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        words = np.fromiter((_word_hash(token) for token in tokens), dtype=np.uint64, count=len(tokens))
+        with np.errstate(over='ignore'):
+            bigrams = words[:-1] * BIGRAM_MIX + words[1:]  # Wraps mod 2**64 by design
+        features = np.concatenate([words, bigrams] + [_char_hashes(token) for token in tokens])
+        ids, tf = np.unique(features % np.uint64(self.dim), return_counts=True)
+        return ids.astype(np.int32), (1 + np.log(tf)).astype(np.float32)
+
+
+@lru_cache(maxsize=200000)
+def _word_hash(token: str) -> int:
+    return zlib.crc32(b'w:' + token.encode('utf-8'))
+
+@lru_cache(maxsize=200000)
+def _char_hashes(token: str) -> np.ndarray:
+    padded = f" {token} "
+    grams = [padded[i:i + n] for n in CHAR_NGRAM_SIZES for i in range(len(padded) - n + 1)]
+    return np.fromiter((zlib.crc32(b'c:' + gram.encode('utf-8')) for gram in grams), dtype=np.uint64, count=len(grams))
+
+def create_provider(name: str):
+    if name == 'hashed':
+        return HashedNgramProvider()
+    if name != 'gemini':
+        print(f"Unknown EMBEDDING_PROVIDER '{name}', falling back to gemini")
+    return GeminiEmbeddingProvider()
+
+_provider = None
+
+def get_provider():
+    """The configured provider (EMBEDDING_PROVIDER), created on first use"""
+    global _provider
+    if _provider is None:
+        _provider = create_provider(EMBEDDING_PROVIDER)
+    return _provider
@@ -1,58 +1,173 @@
-import google.generativeai as genai
+import asyncio
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from services.response_cache import response_cache, make_key
+from utils.singleflight import SingleFlight
 
 load_dotenv()
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+# Gemini 2.5 Flash model, configured on first use: google.generativeai
+# (and grpc under it) is the slowest import in the app
+MODEL_NAME = 'gemini-2.5-flash'
+_model = None
+_model_lock = threading.Lock()
 
-# Initialize Gemini 2.5 Flash model
-model = genai.GenerativeModel('gemini-2.5-flash')
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'models/text-embedding-004')
+EMBED_BATCH_SIZE = 100  # Texts per embed_content request (API limit)
 
-def generate_content(prompt: str, temperature: float = 0.7) -> str:
+# Identical concurrent cache misses share one API call
+generation_flight = SingleFlight('generations')
+
+def _get_model():
+    """Configure the SDK and build the model on first use"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+                _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
+
+def _cached_generate(prompt: str, temperature: float, config: dict, use_cache: bool) -> str:
+    """
+    Run a generation through the response cache
+    
+    Identical concurrent cache misses share one API call.
+    
+    Args:
+        prompt: The input prompt
+        temperature: Sampling temperature
+        config: Remaining GenerationConfig fields (part of the cache key)
+        use_cache: Set False to always call the API
+    
+    Returns:
+        Generated text response
+    """
+    if not use_cache:
+        return _generate(prompt, temperature, config)
+    
+    key = make_key(MODEL_NAME, prompt, temperature, config)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    return generation_flight.do(
+        key, _generate, prompt, temperature, config, key,
+        recheck=lambda: response_cache.get(key)
+    )
+
+def _generate(prompt: str, temperature: float, config: dict, cache_key: str = None) -> str:
+    """Call the API, storing the response under cache_key if given"""
+    import google.generativeai as genai
+    
+    model = _get_model()
+    started = time.perf_counter()
+    response = model.generate_content(
+        prompt,
+        generation_config=genai.GenerationConfig(temperature=temperature, **config)
+    )
+    text = response.text
+    
+    if cache_key is not None:
+        response_cache.set(cache_key, text, model=MODEL_NAME, elapsed_seconds=time.perf_counter() - started)
+    return text
+
+async def _cached_generate_async(prompt: str, temperature: float, config: dict, use_cache: bool) -> str:
+    """
+    Async counterpart of _cached_generate (cache I/O runs off the event loop)
+    """
+    if not use_cache:
+        return await _generate_async(prompt, temperature, config)
+    
+    key = make_key(MODEL_NAME, prompt, temperature, config)
+    cached = await asyncio.to_thread(response_cache.get, key)
+    if cached is not None:
+        return cached
+    
+    return await generation_flight.do_async(
+        key, _generate_async, prompt, temperature, config, key,
+        recheck=lambda: response_cache.get(key)
+    )
+
+async def _generate_async(prompt: str, temperature: float, config: dict, cache_key: str = None) -> str:
+    import google.generativeai as genai
+    
+    model = _get_model()
+    started = time.perf_counter()
+    response = await model.generate_content_async(
+        prompt,
+        generation_config=genai.GenerationConfig(temperature=temperature, **config)
+    )
+    text = response.text
+    
+    if cache_key is not None:
+        await asyncio.to_thread(
+            response_cache.set, cache_key, text, model=MODEL_NAME, elapsed_seconds=time.perf_counter() - started
+        )
+    return text
+
+def generate_content(prompt: str, temperature: float = 0.7, use_cache: bool = True) -> str:
     """
     Generate content using Gemini 2.5 Flash
     
     Args:
         prompt: The input prompt
         temperature: Controls randomness (0.0 to 1.0)
+        use_cache: Serve identical requests from the response cache
     
     Returns:
         Generated text response
     """
     try:
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.GenerationConfig(
-                temperature=temperature,
-                max_output_tokens=2048
-            )
-        )
-        return response.text
+        return _cached_generate(prompt, temperature, {'max_output_tokens': 2048}, use_cache)
     except Exception as e:
         print(f"Error generating content: {e}")
         raise
 
-def generate_json_content(prompt: str) -> str:
+def generate_json_content(prompt: str, use_cache: bool = True) -> str:
     """
     Generate JSON-formatted content
     
     Args:
         prompt: The input prompt
+        use_cache: Serve identical requests from the response cache
     
     Returns:
         JSON string response
     """
     try:
-        response = model.generate_content(
+        return _cached_generate(
             prompt,
-            generation_config=genai.GenerationConfig(
-                temperature=0.3,  # Lower temperature for more consistent JSON
-                response_mime_type="application/json"
-            )
+            0.3,  # Lower temperature for more consistent JSON
+            {'response_mime_type': "application/json"},
+            use_cache
         )
-        return response.text
+    except Exception as e:
+        print(f"Error generating JSON content: {e}")
+        raise
+
+async def generate_content_async(prompt: str, temperature: float = 0.7, use_cache: bool = True) -> str:
+    """
+    Async version of generate_content
+    
+    Run on the shared loop from utils.async_runner (the SDK's async client is
+    bound to the first loop it is used on).
+    """
+    try:
+        return await _cached_generate_async(prompt, temperature, {'max_output_tokens': 2048}, use_cache)
+    except Exception as e:
+        print(f"Error generating content: {e}")
+        raise
+
+async def generate_json_content_async(prompt: str, use_cache: bool = True) -> str:
+    """
+    Async version of generate_json_content
+    """
+    try:
+        return await _cached_generate_async(prompt, 0.3, {'response_mime_type': "application/json"}, use_cache)
     except Exception as e:
         print(f"Error generating JSON content: {e}")
         raise
@@ -68,7 +183,7 @@ def count_tokens(text: str) -> int:
         Token count
     """
     try:
-        return model.count_tokens(text).total_tokens
+        return _get_model().count_tokens(text).total_tokens
     except Exception as e:
         print(f"Error counting tokens: {e}")
         return 0
@@ -84,7 +199,7 @@ def stream_content(prompt: str):
         Text chunks as they're generated
     """
     try:
-        response = model.generate_content(prompt, stream=True)
+        response = _get_model().generate_content(prompt, stream=True)
         for chunk in response:
             if chunk.text:
                 yield chunk.text
@@ -92,9 +207,50 @@ def stream_content(prompt: str):
         print(f"Error streaming content: {e}")
         raise
 
+async def stream_content_async(prompt: str):
+    """
+    Async version of stream_content
+    
+    Yields:
+        Text chunks as they're generated
+    """
+    try:
+        response = await _get_model().generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+    except Exception as e:
+        print(f"Error streaming content: {e}")
+        raise
+
+def embed_texts(texts: list, task_type: str = 'retrieval_document', model: str = EMBEDDING_MODEL) -> list:
+    """
+    Embed texts with the Gemini embedding model
+    
+    Args:
+        texts: Strings to embed
+        task_type: 'retrieval_document' for indexed text, 'retrieval_query' for questions
+        model: Embedding model name
+    
+    Returns:
+        One vector (list of floats) per text
+    """
+    _get_model()  # Configures the SDK
+    import google.generativeai as genai
+    vectors = []
+    for i in range(0, len(texts), EMBED_BATCH_SIZE):
+        batch = texts[i:i + EMBED_BATCH_SIZE]
+        try:
+            result = genai.embed_content(model=model, content=batch, task_type=task_type)
+        except Exception as e:
+            print(f"Error embedding content: {e}")
+            raise
+        vectors.extend(result['embedding'])
+    return vectors
+
 # Alias for backward compatibility
-def get_gemini_response(prompt: str, temperature: float = 0.7) -> str:
+def get_gemini_response(prompt: str, temperature: float = 0.7, use_cache: bool = True) -> str:
     """
     Alias for generate_content() for backward compatibility
     """
-    return generate_content(prompt, temperature)
+    return generate_content(prompt, temperature, use_cache)
@@ -1,6 +1,5 @@
 import os
 import io
-from pypdf import PdfReader
 
 def extract_text_from_file(file, filename):
     """
@@ -10,6 +9,7 @@ def extract_text_from_file(file, filename):
     
     if ext == 'pdf':
         try:
+            from pypdf import PdfReader  # Imported on first PDF, not at startup
             reader = PdfReader(file)
             text = ""
             for page in reader.pages:
@@ -0,0 +1,152 @@
+"""
+Playlist snapshot cache
+
+Stores each playlist's items (with durations) by youtube_playlist_id, in memory
+and in the playlist_snapshots table. Snapshots are served immediately; once a
+snapshot is older than the staleness window it is revalidated in the background
+with a conditional (If-None-Match) request, so unchanged playlists cost a single
+API call and no page view waits on YouTube.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from utils.cache import LRUCache
+from services.supabase_client import get_supabase
+from services.youtube_service import fetch_playlist_snapshot, enrich_video_durations
+
+# Revalidate snapshots older than this (seconds)
+PLAYLIST_SNAPSHOT_TTL_SECONDS = int(os.getenv('PLAYLIST_SNAPSHOT_TTL_SECONDS', '900'))
+# Force a full refetch (ignoring the ETag) after this long (seconds)
+PLAYLIST_SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv('PLAYLIST_SNAPSHOT_MAX_AGE_SECONDS', str(24 * 3600)))
+PLAYLIST_SNAPSHOT_CACHE_SIZE = int(os.getenv('PLAYLIST_SNAPSHOT_CACHE_SIZE', '128'))
+
+TABLE = 'playlist_snapshots'
+
+_memory = LRUCache(max_entries=PLAYLIST_SNAPSHOT_CACHE_SIZE)
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='playlist-refresh')
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+def get_playlist_videos(playlist_id: str) -> list:
+    """
+    Get a playlist's videos with durations, served from the snapshot cache
+
+    Only the very first request for a playlist calls YouTube synchronously;
+    stale snapshots are returned as-is and refreshed in the background.
+
+    Args:
+        playlist_id: YouTube playlist ID
+
+    Returns:
+        List of video dicts (copies, safe for the caller to mutate)
+    """
+    snapshot = _memory.get(playlist_id)
+    if snapshot is None:
+        snapshot = _load_row(playlist_id)
+        if snapshot is not None:
+            _memory.set(playlist_id, snapshot)
+
+    if snapshot is None:
+        snapshot = refresh_snapshot(playlist_id)
+    elif time.time() - snapshot['validated_at'] > PLAYLIST_SNAPSHOT_TTL_SECONDS:
+        _schedule_refresh(playlist_id)
+
+    return [dict(video) for video in snapshot['videos']]
+
+def refresh_snapshot(playlist_id: str, snapshot: dict = None) -> dict:
+    """
+    Revalidate (or build) the snapshot for a playlist
+
+    Args:
+        playlist_id: YouTube playlist ID
+        snapshot: Current snapshot, if any; its ETag is used for a conditional request
+
+    Returns:
+        The up-to-date snapshot dict
+    """
+    now = time.time()
+    etag = None
+    if snapshot and now - snapshot['fetched_at'] < PLAYLIST_SNAPSHOT_MAX_AGE_SECONDS:
+        etag = snapshot.get('etag')
+
+    result = fetch_playlist_snapshot(playlist_id, etag=etag)
+    if result is None:
+        # 304 Not Modified: keep items and durations, just mark as validated
+        snapshot = dict(snapshot, validated_at=now)
+        print(f"DEBUG: Playlist {playlist_id} unchanged (ETag match)")
+    else:
+        videos, new_etag = result
+        enrich_video_durations(videos)
+        snapshot = {'videos': videos, 'etag': new_etag, 'fetched_at': now, 'validated_at': now}
+        print(f"DEBUG: Playlist {playlist_id} snapshot refreshed ({len(videos)} videos)")
+
+    _memory.set(playlist_id, snapshot)
+    _save_row(playlist_id, snapshot, validated_only=result is None)
+    return snapshot
+
+def invalidate(playlist_id: str):
+    """Drop a playlist from the in-process tier"""
+    _memory.pop(playlist_id)
+
+def _schedule_refresh(playlist_id: str):
+    with _refreshing_lock:
+        if playlist_id in _refreshing:
+            return
+        _refreshing.add(playlist_id)
+    _refresh_executor.submit(_background_refresh, playlist_id)
+
+def _background_refresh(playlist_id: str):
+    try:
+        refresh_snapshot(playlist_id, _memory.get(playlist_id))
+    except Exception as e:
+        print(f"DEBUG: Background refresh failed for playlist {playlist_id}: {e}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(playlist_id)
+
+def _load_row(playlist_id: str):
+    supabase = get_supabase()
+    if supabase is None:
+        return None
+    try:
+        res = supabase.table(TABLE).select('videos, etag, fetched_at, validated_at').eq(
+            'youtube_playlist_id', playlist_id
+        ).limit(1).execute()
+    except Exception as e:
+        print(f"DEBUG: Playlist snapshot read failed for {playlist_id}: {e}")
+        return None
+    if not res.data:
+        return None
+    row = res.data[0]
+    return {
+        'videos': row['videos'],
+        'etag': row.get('etag'),
+        'fetched_at': _to_epoch(row['fetched_at']),
+        'validated_at': _to_epoch(row['validated_at'])
+    }
+
+def _save_row(playlist_id: str, snapshot: dict, validated_only: bool = False):
+    supabase = get_supabase()
+    if supabase is None:
+        return
+    try:
+        if validated_only:
+            supabase.table(TABLE).update({
+                'validated_at': datetime.fromtimestamp(snapshot['validated_at'], timezone.utc).isoformat()
+            }).eq('youtube_playlist_id', playlist_id).execute()
+            return
+        supabase.table(TABLE).upsert({
+            'youtube_playlist_id': playlist_id,
+            'videos': snapshot['videos'],
+            'etag': snapshot.get('etag'),
+            'fetched_at': datetime.fromtimestamp(snapshot['fetched_at'], timezone.utc).isoformat(),
+            'validated_at': datetime.fromtimestamp(snapshot['validated_at'], timezone.utc).isoformat()
+        }, on_conflict='youtube_playlist_id').execute()
+    except Exception as e:
+        print(f"DEBUG: Playlist snapshot write failed for {playlist_id}: {e}")
+
+def _to_epoch(timestamp: str) -> float:
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
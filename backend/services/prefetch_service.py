@@ -0,0 +1,211 @@
+"""
+Background transcript prefetch for whole playlists
+
+When a playlist is analyzed, every video's transcript is warmed into the
+transcript cache through a bounded thread pool, so quizzes and summaries on
+later videos load instantly. Concurrency is capped per upstream host and
+transient failures are retried with exponential backoff.
+
+Job counters live in the worker that started the job. Polls that land on
+another worker (gunicorn runs several) get a status derived from the shared
+transcript cache instead. Finished jobs are kept for FINISHED_JOB_TTL_SECONDS.
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from utils.cache import LRUCache
+from services import transcript_cache
+from services.transcript_service import fetch_and_cache_transcript
+
+PREFETCH_WORKERS = int(os.getenv('TRANSCRIPT_PREFETCH_WORKERS', '8'))
+PREFETCH_PER_HOST = int(os.getenv('TRANSCRIPT_PREFETCH_PER_HOST', '4'))
+PREFETCH_RETRIES = int(os.getenv('TRANSCRIPT_PREFETCH_RETRIES', '3'))
+PREFETCH_BACKOFF_SECONDS = float(os.getenv('TRANSCRIPT_PREFETCH_BACKOFF_SECONDS', '1.0'))
+PREFETCH_JOB_HISTORY = 256
+FINISHED_JOB_TTL_SECONDS = 600
+
+# Transcripts are served from the YouTube watch host
+TRANSCRIPT_HOST = 'www.youtube.com'
+
+
+class HostLimiter:
+    """Caps the number of concurrent requests to each upstream host"""
+
+    def __init__(self, per_host: int):
+        self.per_host = per_host
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return self._semaphores[host]
+
+
+class PrefetchJob:
+    """Progress of one playlist's prefetch run"""
+
+    def __init__(self, playlist_id: str, video_ids: list, language: str):
+        self.playlist_id = playlist_id
+        self.video_ids = video_ids
+        self.language = language
+        self.total = len(video_ids)
+        self.cached = 0       # Already in the cache, nothing fetched
+        self.fetched = 0      # Fetched from YouTube and cached
+        self.unavailable = 0  # No captions (cached as negative)
+        self.failed = 0       # Gave up after retries
+        self.retries = 0
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> int:
+        return self.cached + self.fetched + self.unavailable + self.failed
+
+    @property
+    def status(self) -> str:
+        return 'completed' if self.finished_at else 'running'
+
+    def record(self, outcome: str, retries: int = 0):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.retries += retries
+            if self.done >= self.total:
+                self.finished_at = datetime.now(timezone.utc)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                'playlist_id': self.playlist_id,
+                'source': 'job',
+                'status': self.status,
+                'total': self.total,
+                'done': self.done,
+                'cached': self.cached,
+                'fetched': self.fetched,
+                'unavailable': self.unavailable,
+                'failed': self.failed,
+                'retries': self.retries,
+                'progress_percent': round(self.done / self.total * 100, 1) if self.total else 100.0,
+                'started_at': self.started_at.isoformat(),
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None
+            }
+
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix='transcript-prefetch')
+_limiter = HostLimiter(PREFETCH_PER_HOST)
+# playlist_id -> PrefetchJob started by this worker
+_jobs = LRUCache(max_entries=PREFETCH_JOB_HISTORY)
+_jobs_lock = threading.Lock()
+
+def start_prefetch(playlist_id: str, videos: list, language: str = 'en') -> PrefetchJob:
+    """
+    Start warming transcripts for every video in a playlist
+
+    If a prefetch for the playlist is already running, that job is returned.
+
+    Args:
+        playlist_id: YouTube playlist ID (used as the job key)
+        videos: Output of fetch_playlist_items (dicts with 'video_id')
+        language: Preferred transcript language
+
+    Returns:
+        The PrefetchJob tracking progress
+    """
+    video_ids = list(dict.fromkeys(v['video_id'] for v in videos))
+
+    with _jobs_lock:
+        existing = _jobs.get(playlist_id)
+        if existing and existing.status == 'running':
+            return existing
+        job = PrefetchJob(playlist_id, video_ids, language)
+        _jobs.set(playlist_id, job)
+
+    print(f"DEBUG: Prefetching {job.total} transcripts for playlist {playlist_id}")
+    if not video_ids:
+        job.finished_at = datetime.now(timezone.utc)
+        _expire(job)
+    for video_id in video_ids:
+        _executor.submit(_prefetch_one, job, video_id)
+    return job
+
+def get_prefetch_status(playlist_id: str, video_ids: list = None, language: str = 'en'):
+    """
+    Get the status of the latest prefetch for a playlist
+
+    Args:
+        playlist_id: YouTube playlist ID
+        video_ids: The playlist's videos; used when this worker has no job for it
+        language: Preferred transcript language
+
+    Returns:
+        Live job counters if this worker ran the prefetch, otherwise a status
+        derived from the transcript cache ('source': 'cache'; 'status' is
+        'completed' once every video is cached, else 'partial'), or None if
+        there is no job and no video_ids
+    """
+    job = _jobs.get(playlist_id)
+    if job is not None:
+        return job.to_dict()
+    if video_ids is None:
+        return None
+
+    video_ids = list(dict.fromkeys(video_ids))
+    states = transcript_cache.cached_states(video_ids, language)
+    cached = sum(1 for state in states.values() if state == 'cached')
+    unavailable = len(states) - cached
+    total = len(video_ids)
+    return {
+        'playlist_id': playlist_id,
+        'source': 'cache',
+        'status': 'completed' if len(states) == total else 'partial',
+        'total': total,
+        'done': len(states),
+        'cached': cached,
+        'unavailable': unavailable,
+        'missing': total - len(states),
+        'progress_percent': round(len(states) / total * 100, 1) if total else 100.0
+    }
+
+def _expire(job: PrefetchJob):
+    # Finished jobs only answer polls for a while; a newer job for the playlist is left alone
+    with _jobs_lock:
+        if _jobs.get(job.playlist_id) is job:
+            _jobs.set(job.playlist_id, job, ttl_seconds=FINISHED_JOB_TTL_SECONDS)
+
+def _prefetch_one(job: PrefetchJob, video_id: str):
+    try:
+        _prefetch_video(job, video_id)
+    finally:
+        if job.finished_at:
+            _expire(job)
+
+def _prefetch_video(job: PrefetchJob, video_id: str):
+    cached = transcript_cache.lookup(video_id, job.language)
+    if cached is transcript_cache.UNAVAILABLE:
+        job.record('unavailable')
+        return
+    if cached is not None:
+        job.record('cached')
+        return
+
+    for attempt in range(PREFETCH_RETRIES + 1):
+        try:
+            with _limiter.slot(TRANSCRIPT_HOST):
+                text = fetch_and_cache_transcript(video_id, job.language)
+            job.record('fetched' if text is not None else 'unavailable', retries=attempt)
+            return
+        except Exception as e:
+            if attempt == PREFETCH_RETRIES:
+                print(f"DEBUG: Prefetch gave up on {video_id} after {attempt + 1} attempts: {e}")
+                job.record('failed', retries=attempt)
+                return
+            # Exponential backoff with jitter, outside the host slot
+            delay = PREFETCH_BACKOFF_SECONDS * (2 ** attempt)
+            time.sleep(delay + random.uniform(0, delay))
@@ -0,0 +1,196 @@
+"""
+Write-behind buffer for video position heartbeats
+
+Players call /api/progress/save-timestamp every few seconds. Instead of one
+upsert per heartbeat, positions are coalesced in memory per (user, video),
+keeping only the latest, and flushed in bulk through the save_progress_heartbeats
+RPC on a timer or once the buffer reaches the batch size. Pending writes are
+flushed on interpreter shutdown.
+
+Most heartbeats carry only the position. The RPC updates existing rows in place
+and creates a missing row only from a heartbeat that has every column
+video_progress requires (playlist_id, video_title, duration_seconds); others
+are counted as skipped.
+"""
+
+import atexit
+import os
+import threading
+from services.supabase_client import get_supabase
+
+PROGRESS_FLUSH_INTERVAL_SECONDS = float(os.getenv('PROGRESS_FLUSH_INTERVAL_SECONDS', '5'))
+PROGRESS_FLUSH_BATCH_SIZE = int(os.getenv('PROGRESS_FLUSH_BATCH_SIZE', '500'))
+PROGRESS_MAX_PENDING = int(os.getenv('PROGRESS_MAX_PENDING', '50000'))
+PROGRESS_FLUSH_RETRIES = 3
+
+# Columns sent for every heartbeat (optional ones as null)
+HEARTBEAT_COLUMNS = ('user_id', 'youtube_video_id', 'current_position', 'last_watched',
+                     'duration_seconds', 'playlist_id', 'video_title')
+
+
+class ProgressWriteBuffer:
+    """Coalescing write-behind buffer in front of video_progress"""
+
+    def __init__(self, flush_interval: float = PROGRESS_FLUSH_INTERVAL_SECONDS,
+                 batch_size: int = PROGRESS_FLUSH_BATCH_SIZE,
+                 max_pending: int = PROGRESS_MAX_PENDING,
+                 writer=None):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._writer = writer or save_heartbeats
+        self._pending = {}  # (user_id, video_id) -> (row, attempts)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.submitted = 0
+        self.coalesced = 0  # Heartbeats superseded by a newer one before flushing
+        self.dropped = 0    # Rejected (buffer full) or abandoned after failed retries
+        self.skipped = 0    # No progress row yet and not enough columns to create one
+        self.written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def submit(self, row: dict) -> bool:
+        """
+        Queue a video_progress row, replacing any pending row for the same (user, video)
+
+        Args:
+            row: Row with at least user_id and youtube_video_id
+
+        Returns:
+            False if the buffer is full and the write was dropped
+        """
+        key = (row['user_id'], row['youtube_video_id'])
+        with self._lock:
+            self.submitted += 1
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                # Keep columns only an earlier heartbeat sent (e.g. playlist_id for a new row)
+                row = {**pending[0], **row}
+            elif len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending[key] = (row, 0)
+            full = len(self._pending) >= self.batch_size
+
+        self._ensure_started()
+        if full:
+            self._wakeup.set()
+        return True
+
+    def flush(self) -> int:
+        """
+        Write every pending row now
+
+        Returns:
+            Number of rows written (skipped heartbeats not included)
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            written = skipped = 0
+            items = list(batch.items())
+            for i in range(0, len(items), self.batch_size):
+                chunk = items[i:i + self.batch_size]
+                try:
+                    chunk_skipped = self._writer([row for _, (row, _) in chunk]) or 0
+                    written += len(chunk) - chunk_skipped
+                    skipped += chunk_skipped
+                except Exception as e:
+                    print(f"Error flushing {len(chunk)} progress rows: {e}")
+                    self._requeue(chunk)
+
+            with self._lock:
+                self.written += written
+                self.skipped += skipped
+                self.flushes += 1
+            return written
+
+    def stop(self):
+        """Stop the background thread and flush what is left"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'submitted': self.submitted,
+                'coalesced': self.coalesced,
+                'dropped': self.dropped,
+                'skipped': self.skipped,
+                'written': self.written,
+                'flushes': self.flushes,
+                'failed_flushes': self.failed_flushes,
+                'flush_interval_seconds': self.flush_interval,
+                'batch_size': self.batch_size
+            }
+
+    def _requeue(self, chunk: list):
+        with self._lock:
+            self.failed_flushes += 1
+            for key, (row, attempts) in chunk:
+                if key in self._pending:
+                    # A newer heartbeat arrived meanwhile; it supersedes the failed one
+                    newer, newer_attempts = self._pending[key]
+                    self._pending[key] = ({**row, **newer}, newer_attempts)
+                    self.coalesced += 1
+                elif attempts + 1 >= PROGRESS_FLUSH_RETRIES or len(self._pending) >= self.max_pending:
+                    self.dropped += 1
+                else:
+                    self._pending[key] = (row, attempts + 1)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = threading.Thread(target=self._run, name='progress-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Progress writer error: {e}")
+
+
+def save_heartbeats(rows: list, supabase=None) -> int:
+    """
+    Write coalesced heartbeats in one save_progress_heartbeats call
+
+    Args:
+        rows: video_progress rows, at most one per (user_id, youtube_video_id)
+        supabase: Client to use (default: the process-wide client)
+
+    Returns:
+        Number of heartbeats skipped because their video has no progress row
+        yet and they lack the columns needed to create one
+    """
+    supabase = supabase or get_supabase()
+    payload = [{column: row.get(column) for column in HEARTBEAT_COLUMNS} for row in rows]
+    result = supabase.rpc('save_progress_heartbeats', {'p_rows': payload}).execute().data or {}
+    skipped = result.get('skipped') or []
+    if skipped:
+        print(f"DEBUG: Skipped {len(skipped)} heartbeats for videos without a progress row "
+              f"(playlist_id, video_title and duration are needed to create one)")
+    return len(skipped)
+
+
+# Process-wide buffer used by /api/progress/save-timestamp
+progress_buffer = ProgressWriteBuffer()
+atexit.register(progress_buffer.stop)
@@ -0,0 +1,284 @@
+"""
+Content-addressed cache for Gemini responses
+
+Responses are keyed by a SHA-256 of (model, prompt, temperature, generation config),
+so re-opening the same summary / quiz / flashcard deck never calls the API twice.
+The storage backend is pluggable via AI_CACHE_BACKEND:
+
+    memory   - in-process LRU (default)
+    sqlite   - local SQLite file at AI_CACHE_SQLITE_PATH, shared by all workers on a host
+    supabase - the ai_response_cache table, shared by every deployment
+    none     - caching disabled
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from utils.cache import LRUCache
+from services.supabase_client import get_supabase
+
+AI_CACHE_BACKEND = os.getenv('AI_CACHE_BACKEND', 'memory').lower()
+AI_CACHE_TTL_SECONDS = int(os.getenv('AI_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', '1000'))
+AI_CACHE_SQLITE_PATH = os.getenv('AI_CACHE_SQLITE_PATH', 'ai_response_cache.sqlite3')
+
+def make_key(model: str, prompt: str, temperature: float, config: dict = None) -> str:
+    """
+    Build the content address for a generation request
+
+    Args:
+        model: Model name
+        prompt: Full prompt text
+        temperature: Sampling temperature
+        config: Any other generation settings that affect the output
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps({
+        'model': model,
+        'prompt': prompt,
+        'temperature': temperature,
+        'config': config or {}
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU with TTL"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self._cache = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def get(self, key: str):
+        return self._cache.get(key)
+
+    def set(self, key: str, value: str, model: str = None):
+        self._cache.set(key, value)
+
+    def clear(self):
+        self._cache.clear()
+
+    def size(self) -> int:
+        return len(self._cache)
+
+
+class SQLiteBackend:
+    """Local SQLite file; evicts least recently used rows beyond max_entries"""
+
+    name = 'sqlite'
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ai_response_cache (
+                cache_key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_response_cache_accessed ON ai_response_cache(accessed_at)")
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3 connections cannot be shared across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute(
+            "SELECT response, created_at FROM ai_response_cache WHERE cache_key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if now - row[1] > self.ttl_seconds:
+            conn.execute("DELETE FROM ai_response_cache WHERE cache_key = ?", (key,))
+            conn.commit()
+            return None
+        conn.execute("UPDATE ai_response_cache SET accessed_at = ? WHERE cache_key = ?", (now, key))
+        conn.commit()
+        return row[0]
+
+    def set(self, key: str, value: str, model: str = None):
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO ai_response_cache (cache_key, model, response, created_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, model, value, now, now)
+        )
+        conn.execute("DELETE FROM ai_response_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM ai_response_cache WHERE cache_key IN ("
+            "SELECT cache_key FROM ai_response_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        conn.commit()
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM ai_response_cache")
+        conn.commit()
+
+    def size(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM ai_response_cache").fetchone()[0]
+
+
+class SupabaseBackend:
+    """
+    ai_response_cache table in Postgres
+
+    Expired rows are purged every PURGE_EVERY writes; the table is bounded by TTL
+    rather than by entry count, since counting rows over PostgREST is expensive.
+    """
+
+    name = 'supabase'
+    TABLE = 'ai_response_cache'
+    PURGE_EVERY = 100
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        supabase = get_supabase()
+        if supabase is None:
+            return None
+        res = supabase.table(self.TABLE).select('response, expires_at').eq('cache_key', key).limit(1).execute()
+        if not res.data:
+            return None
+        row = res.data[0]
+        expires_at = datetime.fromisoformat(row['expires_at'].replace('Z', '+00:00'))
+        if expires_at <= datetime.now(timezone.utc):
+            return None
+        return row['response']
+
+    def set(self, key: str, value: str, model: str = None):
+        supabase = get_supabase()
+        if supabase is None:
+            return
+        now = datetime.now(timezone.utc)
+        supabase.table(self.TABLE).upsert({
+            'cache_key': key,
+            'model': model,
+            'response': value,
+            'created_at': now.isoformat(),
+            'expires_at': (now + timedelta(seconds=self.ttl_seconds)).isoformat()
+        }, on_conflict='cache_key').execute()
+
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % self.PURGE_EVERY == 0
+        if purge:
+            supabase.table(self.TABLE).delete().lt('expires_at', now.isoformat()).execute()
+
+    def clear(self):
+        supabase = get_supabase()
+        if supabase is not None:
+            supabase.table(self.TABLE).delete().neq('cache_key', '').execute()
+
+    def size(self):
+        return None
+
+
+class ResponseCache:
+    """Wraps a backend with hit/miss accounting"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.seconds_saved = 0.0
+        self._miss_seconds = 0.0
+        self._stores = 0
+
+    def get(self, key: str):
+        """Return the cached response or None; backend errors count as misses"""
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            print(f"AI cache read error ({self.backend.name}): {e}")
+            value = None
+            with self._lock:
+                self.errors += 1
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                # Credit the average generation latency we avoided
+                if self._stores:
+                    self.seconds_saved += self._miss_seconds / self._stores
+        return value
+
+    def set(self, key: str, value: str, model: str = None, elapsed_seconds: float = 0.0):
+        """Store a response; elapsed_seconds is the generation time, used for savings stats"""
+        if self.backend is None or value is None:
+            return
+        with self._lock:
+            self._stores += 1
+            self._miss_seconds += elapsed_seconds
+        try:
+            self.backend.set(key, value, model=model)
+        except Exception as e:
+            print(f"AI cache write error ({self.backend.name}): {e}")
+            with self._lock:
+                self.errors += 1
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        """Return counters for monitoring cost savings"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'backend': self.backend.name if self.backend else 'none',
+                'entries': self.backend.size() if self.backend else 0,
+                'hits': self.hits,
+                'misses': self.misses,
+                'errors': self.errors,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'avg_generation_seconds': round(self._miss_seconds / self._stores, 3) if self._stores else 0.0,
+                'estimated_seconds_saved': round(self.seconds_saved, 1)
+            }
+
+
+def create_backend(name: str):
+    if name == 'none':
+        return None
+    if name == 'sqlite':
+        return SQLiteBackend(AI_CACHE_SQLITE_PATH, AI_CACHE_MAX_ENTRIES, AI_CACHE_TTL_SECONDS)
+    if name == 'supabase':
+        return SupabaseBackend(AI_CACHE_TTL_SECONDS)
+    if name != 'memory':
+        print(f"Unknown AI_CACHE_BACKEND '{name}', falling back to memory")
+    return MemoryBackend(AI_CACHE_MAX_ENTRIES, AI_CACHE_TTL_SECONDS)
+
+# Process-wide cache used by gemini_service
+response_cache = ResponseCache(create_backend(AI_CACHE_BACKEND))
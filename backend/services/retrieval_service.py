@@ -0,0 +1,338 @@
+"""
+Transcript retrieval for the chat assistant (RAG)
+
+A video's transcript is split with chunk_transcript, every chunk is embedded
+once, and questions are answered from the top-k most similar chunks instead of
+the first few thousand characters. Each chunk carries its character offset and
+start time (from the TimedTranscript) so answers can cite real seconds.
+
+Embeddings are kept in the video_embeddings table when Supabase is configured,
+so a video is embedded once per deployment, not once per process. Search runs
+in one of two places, selected by VECTOR_BACKEND:
+
+    memory   - NumPy VectorIndex per video, held in an LRU (default)
+    pgvector - the match_video_chunks RPC over video_embeddings
+
+Sparse providers (EMBEDDING_PROVIDER=hashed) always use an in-process
+SparseVectorIndex; their vectors are cheap to recompute and are not stored.
+
+RETRIEVAL_MODE=hybrid (default) also ranks the chunks with BM25, which catches
+exact code identifiers and names that embeddings blur, runs both searches in
+parallel and fuses the rankings with reciprocal-rank fusion. Selected chunks
+that are neighbours share RAG_CHUNK_OVERLAP_WORDS words, so they are merged
+into one passage instead of repeating the overlap in the prompt.
+"""
+
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from utils.bm25 import BM25Index
+from utils.cache import LRUCache
+from utils.singleflight import SingleFlight
+from utils.vector_index import VectorIndex, SparseVectorIndex
+from services.embedding_service import get_provider
+from services.supabase_client import get_supabase
+from services.transcript_service import get_timed_transcript, chunk_transcript
+
+VECTOR_BACKEND = os.getenv('VECTOR_BACKEND', 'memory').lower()
+VECTOR_INDEX_CACHE_SIZE = int(os.getenv('VECTOR_INDEX_CACHE_SIZE', '64'))
+VECTOR_IVF_MIN_SIZE = int(os.getenv('VECTOR_IVF_MIN_SIZE', '4096'))
+VECTOR_IVF_PROBES = int(os.getenv('VECTOR_IVF_PROBES', '8'))
+RAG_CHUNK_WORDS = int(os.getenv('RAG_CHUNK_WORDS', '200'))
+RAG_CHUNK_OVERLAP_WORDS = int(os.getenv('RAG_CHUNK_OVERLAP_WORDS', '50'))
+RAG_TOP_K = int(os.getenv('RAG_TOP_K', '4'))
+# vector | keyword | hybrid
+RETRIEVAL_MODE = os.getenv('RETRIEVAL_MODE', 'hybrid').lower()
+# Candidates taken from each ranking before fusion
+RAG_CANDIDATES = int(os.getenv('RAG_CANDIDATES', '20'))
+RRF_K = 60  # Reciprocal-rank fusion constant (Cormack et al.)
+
+TABLE = 'video_embeddings'
+STORED_DIM = 768  # video_embeddings.embedding is vector(768)
+
+# (provider, video_id) -> VectorIndex
+_indexes = LRUCache(max_entries=VECTOR_INDEX_CACHE_SIZE)
+# pgvector backend: (provider, video_id) -> number of stored chunks
+_stored = LRUCache(max_entries=1024)
+# video_id -> BM25Index over the video's chunks (keys are chunk indexes)
+_keyword_indexes = LRUCache(max_entries=VECTOR_INDEX_CACHE_SIZE)
+# Runs the keyword side of hybrid searches next to the vector side
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='retrieval')
+# Concurrent first questions about a video share one embedding pass
+index_flight = SingleFlight('embeddings')
+
+def transcript_chunks(video_id: str, language: str = 'en') -> list:
+    """
+    Split a video's transcript into retrieval chunks
+
+    Args:
+        video_id: YouTube video ID
+        language: Transcript language
+
+    Returns:
+        List of {'video_id', 'chunk_index', 'text', 'offset', 'start'} ('start' is
+        seconds, None without timings), or None if there is no transcript
+    """
+    timed = get_timed_transcript(video_id, language)
+    if timed is None or not timed.text:
+        return None
+
+    chunks = chunk_transcript(timed.text, chunk_size=RAG_CHUNK_WORDS, overlap=RAG_CHUNK_OVERLAP_WORDS)
+    word_offsets = [match.start() for match in re.finditer(r'\S+', timed.text)]
+    step = RAG_CHUNK_WORDS - RAG_CHUNK_OVERLAP_WORDS
+    result = []
+    for i, text in enumerate(chunks):
+        offset = word_offsets[i * step]
+        result.append({
+            'video_id': video_id,
+            'chunk_index': i,
+            'text': text,
+            'offset': offset,
+            'start': timed.time_at_offset(offset) if timed else None
+        })
+    return result
+
+def retrieve(video_id: str, query: str, k: int = RAG_TOP_K, mode: str = RETRIEVAL_MODE) -> list:
+    """
+    Find the transcript passages most relevant to a question
+
+    Args:
+        video_id: YouTube video ID
+        query: The user's question
+        k: Number of chunks to select
+        mode: 'vector', 'keyword' or 'hybrid'
+
+    Returns:
+        Up to k passages, best first: chunk dicts (see transcript_chunks) with a
+        fused 'score' and 'chunk_indexes' (adjacent chunks are merged into one);
+        empty if the video has no transcript
+    """
+    depth = max(k, RAG_CANDIDATES)
+    if mode == 'keyword':
+        rankings = [keyword_search(video_id, query, depth)]
+    elif mode == 'vector':
+        rankings = [vector_search(video_id, query, depth)]
+    else:
+        keyword = _executor.submit(keyword_search, video_id, query, depth)
+        try:
+            vector = vector_search(video_id, query, depth)
+        except Exception as e:
+            # Embedding API unavailable: keyword results alone still beat no context
+            print(f"DEBUG: Vector search failed for {video_id}, using keyword results: {e}")
+            vector = []
+        rankings = [vector, keyword.result()]
+    return merge_overlapping(fuse_rankings(rankings)[:k])
+
+def fuse_rankings(rankings: list, rrf_k: int = RRF_K) -> list:
+    """
+    Reciprocal-rank fusion: score(chunk) = sum over rankings of 1 / (rrf_k + rank)
+
+    Args:
+        rankings: Lists of chunk dicts, each best first
+        rrf_k: Fusion constant; larger values flatten the rank weighting
+
+    Returns:
+        Distinct chunks (by chunk_index) with the fused 'score', best first
+    """
+    fused, scores = {}, {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, 1):
+            index = chunk['chunk_index']
+            fused.setdefault(index, chunk)
+            scores[index] = scores.get(index, 0.0) + 1.0 / (rrf_k + rank)
+    order = sorted(scores, key=lambda index: (-scores[index], index))
+    return [dict(fused[index], score=scores[index]) for index in order]
+
+def merge_overlapping(chunks: list, overlap_words: int = RAG_CHUNK_OVERLAP_WORDS) -> list:
+    """
+    Merge selected chunks that are neighbours in the transcript
+
+    Consecutive chunks from chunk_transcript share overlap_words words; a
+    merged passage keeps them once.
+
+    Args:
+        chunks: Chunk dicts with 'chunk_index', 'text' and 'score'
+        overlap_words: Words shared by neighbouring chunks
+
+    Returns:
+        Passages (first chunk's fields, joined text, 'chunk_indexes', best
+        member's score), best first
+    """
+    passages = []
+    for chunk in sorted(chunks, key=lambda c: c['chunk_index']):
+        previous = passages[-1] if passages else None
+        if previous is not None and chunk['chunk_index'] == previous['chunk_indexes'][-1] + 1:
+            tail = chunk['text'].split()[overlap_words:]
+            if tail:
+                previous['text'] += ' ' + ' '.join(tail)
+            previous['chunk_indexes'].append(chunk['chunk_index'])
+            previous['score'] = max(previous['score'], chunk['score'])
+        else:
+            passages.append(dict(chunk, chunk_indexes=[chunk['chunk_index']]))
+    return sorted(passages, key=lambda p: -p['score'])
+
+def vector_search(video_id: str, query: str, k: int) -> list:
+    """Top-k chunks by embedding similarity ('score' is the cosine similarity)"""
+    provider = get_provider()
+    if _use_pgvector(provider):
+        if index_video(video_id) == 0:
+            return []
+        return _search_pgvector(provider, video_id, query, k)
+
+    index = get_video_index(video_id)
+    if index is None:
+        return []
+    return [dict(chunk, score=score) for score, chunk in index.search(provider.embed_query(query), k)]
+
+def keyword_search(video_id: str, query: str, k: int) -> list:
+    """Top-k chunks by BM25 ('score' is the BM25 score)"""
+    index = _keyword_indexes.get(video_id)
+    if index is None:
+        index = index_flight.do(('bm25', video_id), _build_keyword_index, video_id)
+    if index is None:
+        return []
+    chunks, bm25 = index
+    return [dict(chunks[int(hit['key'])], score=hit['score']) for hit in bm25.search(query, k)]
+
+def get_video_index(video_id: str):
+    """In-process index of a video's chunks, embedding them on first use (None without a transcript)"""
+    provider = get_provider()
+    key = (provider.name, video_id)
+    index = _indexes.get(key)
+    if index is None:
+        index = index_flight.do(key, _build_index, provider, video_id)
+    return index
+
+def index_video(video_id: str) -> int:
+    """
+    Make sure a video's chunk embeddings exist (and are stored, when possible)
+
+    Returns:
+        Number of chunks indexed (0 if there is no transcript)
+    """
+    provider = get_provider()
+    if not _use_pgvector(provider):
+        index = get_video_index(video_id)
+        return len(index) if index is not None else 0
+
+    key = (provider.name, video_id)
+    count = _stored.get(key)
+    if count is None:
+        embedded = index_flight.do(key, _embed_chunks, provider, video_id)
+        count = len(embedded[0]) if embedded else 0
+        _stored.set(key, count)
+    return count
+
+def stats() -> dict:
+    return {
+        'backend': VECTOR_BACKEND,
+        'provider': get_provider().name,
+        'mode': RETRIEVAL_MODE,
+        'indexes': _indexes.stats(),
+        'keyword_indexes': _keyword_indexes.stats(),
+        'embedding': index_flight.stats()
+    }
+
+def _use_pgvector(provider) -> bool:
+    return VECTOR_BACKEND == 'pgvector' and _storable(provider) and get_supabase() is not None
+
+def _storable(provider) -> bool:
+    return not provider.sparse and provider.dim == STORED_DIM
+
+def _embed_chunks(provider, video_id: str):
+    """(chunks, vectors) from storage, or freshly embedded and stored; None without a transcript"""
+    chunks = transcript_chunks(video_id)
+    if not chunks:
+        return None
+
+    vectors = _load_stored(provider, video_id, chunks)
+    if vectors is None:
+        vectors = provider.embed_documents([chunk['text'] for chunk in chunks])
+        _store(provider, video_id, chunks, vectors)
+        print(f"DEBUG: Embedded {len(chunks)} chunks for {video_id} with {provider.name}")
+    return chunks, vectors
+
+def _build_keyword_index(video_id: str):
+    chunks = transcript_chunks(video_id)
+    if not chunks:
+        return None
+    bm25 = BM25Index()
+    for chunk in chunks:
+        bm25.add(str(chunk['chunk_index']), chunk['text'])
+    _keyword_indexes.set(video_id, (chunks, bm25))
+    return chunks, bm25
+
+def _build_index(provider, video_id: str):
+    embedded = _embed_chunks(provider, video_id)
+    if embedded is None:
+        return None
+
+    chunks, vectors = embedded
+    if provider.sparse:
+        index = SparseVectorIndex(provider.dim)
+    else:
+        index = VectorIndex(provider.dim, ivf_min_size=VECTOR_IVF_MIN_SIZE, n_probe=VECTOR_IVF_PROBES)
+    index.add(vectors, chunks)
+    _indexes.set((provider.name, video_id), index)
+    return index
+
+def _load_stored(provider, video_id: str, chunks: list):
+    """Stored vectors for exactly these chunks, or None (missing, stale or other provider)"""
+    supabase = get_supabase()
+    if supabase is None or not _storable(provider):
+        return None
+    try:
+        res = supabase.table(TABLE).select(
+            'chunk_index, chunk_text, embedding, metadata'
+        ).eq('video_id', video_id).order('chunk_index').execute()
+    except Exception as e:
+        print(f"DEBUG: Embedding read failed for {video_id}: {e}")
+        return None
+
+    rows = res.data or []
+    if len(rows) != len(chunks) or any(
+        row['chunk_text'] != chunk['text'] or (row.get('metadata') or {}).get('provider') != provider.name
+        for row, chunk in zip(rows, chunks)
+    ):
+        return None
+    # PostgREST returns vector columns as '[0.1,0.2,...]' strings
+    return [json.loads(row['embedding']) if isinstance(row['embedding'], str) else row['embedding'] for row in rows]
+
+def _store(provider, video_id: str, chunks: list, vectors):
+    supabase = get_supabase()
+    if supabase is None or not _storable(provider):
+        return
+    rows = [{
+        'video_id': video_id,
+        'chunk_index': chunk['chunk_index'],
+        'chunk_text': chunk['text'],
+        'embedding': [float(x) for x in vector],
+        'metadata': {'provider': provider.name, 'offset': chunk['offset'], 'start': chunk['start']}
+    } for chunk, vector in zip(chunks, vectors)]
+    try:
+        # Drop chunks past the new end (transcript got shorter), then upsert the rest
+        supabase.table(TABLE).delete().eq('video_id', video_id).gte('chunk_index', len(rows)).execute()
+        supabase.table(TABLE).upsert(rows, on_conflict='video_id,chunk_index').execute()
+    except Exception as e:
+        print(f"DEBUG: Embedding write failed for {video_id}: {e}")
+
+def _search_pgvector(provider, video_id: str, query: str, k: int) -> list:
+    supabase = get_supabase()
+    res = supabase.rpc('match_video_chunks', {
+        'query_embedding': [float(x) for x in provider.embed_query(query)],
+        'p_video_id': video_id,
+        'match_count': k
+    }).execute()
+    results = []
+    for row in res.data or []:
+        metadata = row.get('metadata') or {}
+        results.append({
+            'video_id': video_id,
+            'chunk_index': row['chunk_index'],
+            'text': row['chunk_text'],
+            'offset': metadata.get('offset'),
+            'start': metadata.get('start'),
+            'score': row['similarity']
+        })
+    return results
@@ -1,77 +1,128 @@
 from datetime import date, timedelta, datetime
+from bisect import bisect_right
+import math
 
 def calculate_completion_date(
     total_duration_minutes: int,
     study_days: list,  # [0, 2, 4] for Mon, Wed, Fri
     hours_per_day: float,
-    start_date: date
+    start_date: date,
+    blackout_dates: list = None
 ) -> tuple:
     """
     Calculate course completion date based on study schedule
     
+    Computed arithmetically (whole weeks plus remainder sessions), so the cost
+    does not depend on how far away the completion date is.
+    
     Args:
         total_duration_minutes: Total course duration in minutes
         study_days: List of weekday numbers (0=Mon, 6=Sun)
         hours_per_day: Study hours per session
         start_date: Starting date
+        blackout_dates: Dates with no study session (holidays, exams...)
     
     Returns:
         (completion_date, total_days, study_sessions)
     """
     minutes_per_session = hours_per_day * 60
     total_sessions_needed = total_duration_minutes / minutes_per_session if minutes_per_session > 0 else 0
+    study_sessions = int(total_sessions_needed)
     
-    current_date = start_date
-    sessions_completed = 0
-    days_elapsed = 0
+    sessions = math.ceil(total_sessions_needed)
+    if sessions <= 0:
+        return start_date - timedelta(days=1), 0, study_sessions
     
-    while sessions_completed < total_sessions_needed:
-        # Check if current day is a study day
-        if current_date.weekday() in study_days:
-            sessions_completed += 1
-        
-        current_date += timedelta(days=1)
-        days_elapsed += 1
-        
-        # Safety check (max 1 year)
-        if days_elapsed > 365:
-            break
+    offsets = _study_day_offsets(study_days, start_date)
+    if not offsets:
+        raise ValueError("study_days must contain at least one weekday (0-6)")
     
-    completion_date = current_date - timedelta(days=1)  # Go back one day
-    study_sessions = int(total_sessions_needed)
+    completion_date = _nth_session_date(sessions, start_date, offsets, study_days, blackout_dates)
+    days_elapsed = (completion_date - start_date).days + 1
     
     return completion_date, days_elapsed, study_sessions
 
+def _is_study_day(current_date: date, study_days: list, blackouts: set) -> bool:
+    return current_date.weekday() in study_days and current_date not in blackouts
+
+def _study_day_offsets(study_days: list, start_date: date) -> list:
+    """Sorted day offsets (0-6) from start_date of each study weekday in the first week"""
+    start_weekday = start_date.weekday()
+    return sorted({(day - start_weekday) % 7 for day in study_days if 0 <= day <= 6})
+
+def _nth_session_date(n: int, start_date: date, offsets: list, study_days: list, blackout_dates: list = None) -> date:
+    """
+    Date of the n-th (1-based) study session on or after start_date
+    
+    Each blackout that falls on a study day in range pushes the target back by
+    one session; iterating to a fixed point takes at most len(blackout_dates) steps.
+    """
+    def nth(k):
+        weeks, remainder = divmod(k - 1, len(offsets))
+        return start_date + timedelta(days=7 * weeks + offsets[remainder])
+    
+    if not blackout_dates:
+        return nth(n)
+    
+    blocked = sorted({
+        d for d in blackout_dates
+        if d >= start_date and d.weekday() in study_days
+    })
+    lost = 0
+    while True:
+        candidate = nth(n + lost)
+        now_lost = bisect_right(blocked, candidate)
+        if now_lost == lost:
+            return candidate
+        lost = now_lost
+
 def generate_study_schedule(
     study_days: list,
     hours_per_day: float,
     start_date: date,
-    end_date: date
+    end_date: date,
+    blackout_dates: list = None
 ) -> list:
     """
     Generate detailed study calendar
     """
-    schedule = []
+    return list(iter_study_schedule(study_days, hours_per_day, start_date, end_date, blackout_dates))
+
+def iter_study_schedule(
+    study_days: list,
+    hours_per_day: float,
+    start_date: date,
+    end_date: date = None,
+    blackout_dates: list = None
+):
+    """
+    Lazily yield study calendar days from start_date to end_date (inclusive)
+    
+    With end_date=None the calendar is unbounded; take what you need with
+    itertools.islice.
+    """
     current_date = start_date
     weekday_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    blackouts = set(blackout_dates or ())
+    if not any(0 <= day <= 6 for day in study_days):
+        return
     
-    while current_date <= end_date:
-        if current_date.weekday() in study_days:
-            schedule.append({
+    while end_date is None or current_date <= end_date:
+        if _is_study_day(current_date, study_days, blackouts):
+            yield {
                 'date': current_date.isoformat(),
                 'day': weekday_names[current_date.weekday()],
                 'duration_minutes': int(hours_per_day * 60),
                 'is_study_day': True
-            })
+            }
         current_date += timedelta(days=1)
-    
-    return schedule
 
 def distribute_videos_to_schedule(
     videos: list,
     study_days: list,
     daily_minutes: int,
-    start_date: date
+    start_date: date,
+    blackout_dates: list = None
 ) -> list:
     """
     Distribute videos across study days respecting the daily time limit.
@@ -81,6 +132,7 @@ def distribute_videos_to_schedule(
         study_days: List of weekday numbers (0-6)
         daily_minutes: Max minutes per day
         start_date: Start date object
+        blackout_dates: Dates to skip even if they fall on a study day
         
     Returns:
         List of day objects with assigned videos:
@@ -94,18 +146,61 @@ def distribute_videos_to_schedule(
             ...
         ]
     """
-    schedule = []
+    return list(iter_video_schedule(videos, study_days, daily_minutes, start_date, blackout_dates))
+
+def iter_video_schedule(
+    videos,
+    study_days: list,
+    daily_minutes: int,
+    start_date: date,
+    blackout_dates: list = None,
+    compact: bool = False
+):
+    """
+    Lazily yield day objects as produced by distribute_videos_to_schedule
+    
+    Only the day currently being filled is held in memory, and videos may be
+    any iterable.
+    
+    With compact=True days reference videos by position in the input instead
+    of embedding them:
+        {
+            'date': '2024-01-01',
+            'day': 'Monday',
+            'video_start': 0,   # index of the first video (inclusive)
+            'video_end': 2,     # index after the last video (exclusive)
+            'video_count': 2,
+            'total_minutes': 45
+        }
+    """
     weekday_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
     
     current_date = start_date
     current_day_videos = []
+    current_day_start = 0
     current_day_minutes = 0
+    blackouts = set(blackout_dates or ())
+    
+    def make_day(end_index):
+        day = {
+            'date': current_date.isoformat(),
+            'day': weekday_names[current_date.weekday()],
+        }
+        if compact:
+            day['video_start'] = current_day_start
+            day['video_end'] = end_index
+            day['video_count'] = end_index - current_day_start
+        else:
+            day['videos'] = current_day_videos
+        day['total_minutes'] = round(current_day_minutes)
+        return day
     
     # Ensure current_date is a valid study day
-    while current_date.weekday() not in study_days:
+    while not _is_study_day(current_date, study_days, blackouts):
         current_date += timedelta(days=1)
-        
-    for video in videos:
+    
+    end_index = 0
+    for index, video in enumerate(videos):
         # Get duration in minutes
         duration = video.get('duration_minutes', 0)
         if 'duration_seconds' in video:
@@ -113,35 +208,51 @@ def distribute_videos_to_schedule(
             
         # Check if adding this video exceeds the daily limit
         # Allow at least one video per day even if it exceeds limit slightly
-        if current_day_minutes + duration > daily_minutes and current_day_videos:
+        if current_day_minutes + duration > daily_minutes and index > current_day_start:
             # Finalize current day
-            schedule.append({
-                'date': current_date.isoformat(),
-                'day': weekday_names[current_date.weekday()],
-                'videos': current_day_videos,
-                'total_minutes': round(current_day_minutes)
-            })
+            yield make_day(index)
             
             # Move to next valid study day
             current_date += timedelta(days=1)
-            while current_date.weekday() not in study_days:
+            while not _is_study_day(current_date, study_days, blackouts):
                 current_date += timedelta(days=1)
                 
             # Reset for new day
             current_day_videos = []
+            current_day_start = index
             current_day_minutes = 0
             
         # Add video to current day
-        current_day_videos.append(video)
+        if not compact:
+            current_day_videos.append(video)
         current_day_minutes += duration
+        end_index = index + 1
         
-    # Append the last day if it has videos
-    if current_day_videos:
-        schedule.append({
-            'date': current_date.isoformat(),
-            'day': weekday_names[current_date.weekday()],
-            'videos': current_day_videos,
-            'total_minutes': round(current_day_minutes)
-        })
-        
-    return schedule
+    # Emit the last day if it has videos
+    if end_index > current_day_start:
+        yield make_day(end_index)
+
+def filter_schedule_window(days, window_start: date = None, num_days: int = None):
+    """
+    Yield only the schedule days inside [window_start, window_start + num_days)
+    
+    The whole input is still consumed, so wrappers that tally the full schedule
+    (session count, completion date) see every day.
+    
+    Args:
+        days: Iterable of day dicts with an ISO 'date'
+        window_start: First date of the window (None = from the beginning)
+        num_days: Window length in calendar days (None = open-ended)
+    """
+    lower = window_start.isoformat() if window_start else None
+    upper = None
+    if window_start and num_days is not None:
+        upper = (window_start + timedelta(days=num_days)).isoformat()
+    
+    # ISO dates compare correctly as strings
+    for day in days:
+        if lower and day['date'] < lower:
+            continue
+        if upper and day['date'] >= upper:
+            continue
+        yield day
@@ -0,0 +1,129 @@
+"""
+Keyword search across a playlist's transcripts ("which video covers X?")
+
+Each playlist gets a BM25Index over the transcripts already in the transcript
+cache; search never fetches from YouTube (the playlist prefetch fills the
+cache). Indexes live in an LRU and are saved under SEARCH_INDEX_DIR, so a
+worker restart loads them instead of re-reading every transcript. At most
+every SEARCH_SYNC_SECONDS an index is synced with the playlist snapshot:
+newly cached transcripts are added and videos that left the playlist removed.
+"""
+
+import os
+import re
+import threading
+import time
+from utils.bm25 import BM25Index
+from utils.cache import LRUCache
+from services import transcript_cache
+from services.playlist_cache import get_playlist_videos
+
+SEARCH_INDEX_DIR = os.getenv('SEARCH_INDEX_DIR', 'search_indexes')
+SEARCH_INDEX_CACHE_SIZE = int(os.getenv('SEARCH_INDEX_CACHE_SIZE', '32'))
+SEARCH_SYNC_SECONDS = int(os.getenv('SEARCH_SYNC_SECONDS', '60'))
+
+# playlist_id -> _PlaylistIndex
+_indexes = LRUCache(max_entries=SEARCH_INDEX_CACHE_SIZE)
+_indexes_lock = threading.Lock()
+
+
+class _PlaylistIndex:
+    def __init__(self, index: BM25Index):
+        self.index = index
+        self.titles = {}
+        self.pending = 0      # Playlist videos without a cached transcript yet
+        self.synced_at = 0.0
+        self.lock = threading.Lock()
+
+
+def search_playlist(playlist_id: str, query: str, limit: int = 10) -> dict:
+    """
+    Rank a playlist's videos for a query
+
+    Args:
+        playlist_id: YouTube playlist ID
+        query: Free text
+        limit: Maximum number of videos
+
+    Returns:
+        {'results': [{'video_id', 'title', 'score', 'offsets'}], 'indexed', 'pending'}
+        where offsets maps each matched query term to its first character
+        offset in the video's transcript
+    """
+    entry = _get_index(playlist_id)
+    if time.time() - entry.synced_at > SEARCH_SYNC_SECONDS:
+        sync_playlist(playlist_id, entry)
+
+    results = [{
+        'video_id': hit['key'],
+        'title': entry.titles.get(hit['key']),
+        'score': round(hit['score'], 4),
+        'offsets': hit['offsets']
+    } for hit in entry.index.search(query, limit)]
+    return {'results': results, 'indexed': len(entry.index), 'pending': entry.pending}
+
+def sync_playlist(playlist_id: str, entry: '_PlaylistIndex' = None) -> int:
+    """
+    Bring a playlist's index in line with its snapshot and the transcript cache
+
+    Returns:
+        Number of videos added or removed
+    """
+    entry = entry or _get_index(playlist_id)
+    with entry.lock:
+        videos = get_playlist_videos(playlist_id)
+        entry.titles = {video['video_id']: video.get('title') for video in videos}
+        changed = 0
+
+        for video_id in set(entry.index.keys()) - set(entry.titles):
+            entry.index.remove(video_id)
+            changed += 1
+
+        pending = 0
+        for video_id in entry.titles:
+            if video_id in entry.index:
+                continue
+            text = transcript_cache.lookup(video_id)
+            if isinstance(text, str) and text:
+                entry.index.add(video_id, text)
+                changed += 1
+            elif text is None:
+                pending += 1
+
+        entry.pending = pending
+        entry.synced_at = time.time()
+        if changed:
+            _save(playlist_id, entry.index)
+            print(f"DEBUG: Search index for {playlist_id}: {changed} changes, {len(entry.index)} videos")
+        return changed
+
+def _get_index(playlist_id: str) -> _PlaylistIndex:
+    entry = _indexes.get(playlist_id)
+    if entry is not None:
+        return entry
+    with _indexes_lock:
+        entry = _indexes.get(playlist_id)
+        if entry is None:
+            entry = _PlaylistIndex(_load(playlist_id))
+            _indexes.set(playlist_id, entry)
+        return entry
+
+def _path(playlist_id: str) -> str:
+    # Playlist IDs are [A-Za-z0-9_-]; anything else is replaced to keep the path inside the directory
+    return os.path.join(SEARCH_INDEX_DIR, re.sub(r'[^A-Za-z0-9_-]', '_', playlist_id) + '.bm25.json')
+
+def _load(playlist_id: str) -> BM25Index:
+    path = _path(playlist_id)
+    if os.path.exists(path):
+        try:
+            return BM25Index.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"DEBUG: Rebuilding search index for {playlist_id}: {e}")
+    return BM25Index()
+
+def _save(playlist_id: str, index: BM25Index):
+    try:
+        os.makedirs(SEARCH_INDEX_DIR, exist_ok=True)
+        index.save(_path(playlist_id))
+    except OSError as e:
+        print(f"DEBUG: Search index write failed for {playlist_id}: {e}")
@@ -0,0 +1,193 @@
+"""
+Maintained per-user gamification stats
+
+The user_stats row holds streak, longest streak, last active date, completed
+video count and XP. log-session updates it incrementally through the
+record_activity database function and mark-complete through mark_video_complete;
+both lock the row, so concurrent updates never overwrite each other, and both
+follow the same rules as apply_activity. /api/progress/stats is a single
+primary-key read. rebuild_user_stats recomputes the row from consistency_logs
+and video_progress when it is missing or drifts.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from services.supabase_client import require_supabase
+
+TABLE = 'user_stats'
+
+XP_PER_VIDEO = 100
+XP_PER_LEVEL = 500
+LOG_PAGE_SIZE = 1000
+
+def empty_stats(user_id: str) -> dict:
+    return {
+        'user_id': user_id,
+        'current_streak': 0,
+        'longest_streak': 0,
+        'last_active_date': None,
+        'completed_videos': 0,
+        'total_sessions': 0,
+        'xp': 0
+    }
+
+def apply_activity(stats: dict, activity_date: date, completed_delta: int = 0, sessions_delta: int = 0) -> dict:
+    """
+    Fold one activity into a stats record (pure function)
+
+    Reference for the record_activity and mark_videos_complete database
+    functions, which apply the same rules under a row lock.
+
+    Args:
+        stats: Current stats record
+        activity_date: Date of the activity
+        completed_delta: Change in completed video count (+1, -1 or 0)
+        sessions_delta: Number of consistency log rows added
+
+    Returns:
+        Updated copy of the stats record
+    """
+    stats = dict(stats)
+    last = _parse_date(stats.get('last_active_date'))
+
+    if sessions_delta > 0:
+        if last is None or activity_date > last + timedelta(days=1):
+            stats['current_streak'] = 1
+        elif activity_date == last + timedelta(days=1):
+            stats['current_streak'] += 1
+        # Same day: no change. Back-dated activity is only picked up by a rebuild.
+
+        if last is None or activity_date > last:
+            stats['last_active_date'] = activity_date.isoformat()
+        stats['longest_streak'] = max(stats['longest_streak'], stats['current_streak'])
+
+    stats['completed_videos'] = max(0, stats['completed_videos'] + completed_delta)
+    stats['total_sessions'] += sessions_delta
+    stats['xp'] = stats['completed_videos'] * XP_PER_VIDEO
+    return stats
+
+def compute_streaks(dates) -> tuple:
+    """
+    Compute streaks from activity dates
+
+    Args:
+        dates: Iterable of dates (any order, duplicates allowed)
+
+    Returns:
+        (current_streak ending on the last active date, longest_streak, last_active_date)
+    """
+    unique_dates = sorted(set(dates))
+    if not unique_dates:
+        return 0, 0, None
+
+    longest = current = 1
+    for previous, day in zip(unique_dates, unique_dates[1:]):
+        current = current + 1 if day - previous == timedelta(days=1) else 1
+        longest = max(longest, current)
+    return current, longest, unique_dates[-1]
+
+def get_user_stats(user_id: str) -> dict:
+    """
+    Read the maintained stats record, rebuilding it if it does not exist yet
+    """
+    supabase = require_supabase()
+    res = supabase.table(TABLE).select('*').eq('user_id', user_id).limit(1).execute()
+    if res.data:
+        return res.data[0]
+    return rebuild_user_stats(user_id)
+
+def record_activity(user_id: str, activity_date: date = None, completed_delta: int = 0, sessions_delta: int = 0) -> dict:
+    """
+    Incrementally update a user's stats after log-session
+
+    The read-modify-write runs in the record_activity database function under a
+    row lock, so it cannot race with mark-complete.
+
+    Args:
+        user_id: User ID
+        activity_date: Date of the activity (default: today)
+        completed_delta: Change in completed video count
+        sessions_delta: Number of consistency log rows added
+
+    Returns:
+        The updated stats record
+    """
+    if not completed_delta and not sessions_delta:
+        return None
+
+    supabase = require_supabase()
+    stats = supabase.rpc('record_activity', {
+        'p_user_id': user_id,
+        'p_activity_date': (activity_date or datetime.now().date()).isoformat(),
+        'p_completed_delta': completed_delta,
+        'p_sessions_delta': sessions_delta
+    }).execute().data
+    if stats is None:
+        # First activity for this user (or missing row): derive from the source tables,
+        # which already include the activity being recorded
+        return rebuild_user_stats(user_id)
+    return stats
+
+def rebuild_user_stats(user_id: str) -> dict:
+    """
+    Repair job: recompute a user's stats from consistency_logs and video_progress
+
+    Returns:
+        The rebuilt stats record
+    """
+    supabase = require_supabase()
+
+    dates = []
+    offset = 0
+    while True:
+        page = supabase.table('consistency_logs').select('date').eq('user_id', user_id) \
+            .order('date').range(offset, offset + LOG_PAGE_SIZE - 1).execute()
+        dates.extend(_parse_date(row['date']) for row in page.data)
+        if len(page.data) < LOG_PAGE_SIZE:
+            break
+        offset += LOG_PAGE_SIZE
+
+    completed = supabase.table('video_progress').select('id', count='exact') \
+        .eq('user_id', user_id).eq('completed', True).execute()
+
+    current, longest, last = compute_streaks(dates)
+    stats = empty_stats(user_id)
+    stats.update({
+        'current_streak': current,
+        'longest_streak': longest,
+        'last_active_date': last.isoformat() if last else None,
+        'completed_videos': completed.count or 0,
+        'total_sessions': len(dates)
+    })
+    stats['xp'] = stats['completed_videos'] * XP_PER_VIDEO
+    return _save(stats)
+
+def present_stats(stats: dict, today: date = None) -> dict:
+    """
+    Shape a stats record for /api/progress/stats
+
+    The streak only counts if the user has been active today.
+    """
+    today = today or datetime.now().date()
+    last = _parse_date(stats.get('last_active_date'))
+    xp = stats['completed_videos'] * XP_PER_VIDEO
+
+    return {
+        'level': (xp // XP_PER_LEVEL) + 1,
+        'xp': xp,  # Total XP earned
+        'xp_in_current_level': xp % XP_PER_LEVEL,  # Progress toward next level
+        'next_level_xp': XP_PER_LEVEL,  # XP needed for next level (always 500)
+        'streak': stats['current_streak'] if last == today else 0,
+        'longest_streak': stats['longest_streak'],
+        'total_videos': stats['completed_videos'],
+        'total_sessions': stats['total_sessions']
+    }
+
+def _save(stats: dict) -> dict:
+    stats = dict(stats, updated_at=datetime.now(timezone.utc).isoformat())
+    require_supabase().table(TABLE).upsert(stats, on_conflict='user_id').execute()
+    return stats
+
+def _parse_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    return datetime.strptime(value[:10], '%Y-%m-%d').date()
@@ -0,0 +1,162 @@
+"""
+Study pack: every per-video artifact from one transcript fetch and one generation
+
+The study pack asks Gemini for summary, quiz, flashcards and chapter markers in a
+single structured JSON response. Each artifact is then persisted separately in
+the artifact store, so the individual /api/learning-tools endpoints serve what
+the study pack produced (and the study pack reuses what they produced).
+Summary, quiz and flashcards only need the transcript text; chapters load it
+with segment timings so their timestamps land on real segment starts.
+"""
+
+import time
+from services import artifact_store
+from services.artifact_store import ARTIFACTS
+from services.transcript_service import get_video_transcript, get_timed_transcript
+from services.ai_learning_tools import (
+    generate_study_pack,
+    generate_quiz_from_transcript,
+    generate_flashcards,
+    generate_video_summary,
+    generate_chapter_recommendations
+)
+
+DEFAULT_OPTIONS = {
+    'title': 'Educational Video',
+    'duration_seconds': 0,
+    'difficulty': 'medium',
+    'num_questions': 5,
+    'num_cards': 10
+}
+
+# The options each artifact's content depends on (its storage key)
+ARTIFACT_OPTIONS = {
+    'summary': ('title',),
+    'quiz': ('difficulty', 'num_questions'),
+    'flashcards': ('num_cards',),
+    'chapters': ('duration_seconds',)  # Also bounds the fallback's placeholder chapters
+}
+
+def normalize_options(options: dict) -> dict:
+    """Fill defaults and canonicalize options, so equal requests share stored artifacts"""
+    options = dict(DEFAULT_OPTIONS, **options)
+    return {
+        'title': str(options['title'] or DEFAULT_OPTIONS['title']).strip(),
+        'duration_seconds': int(options['duration_seconds'] or 0),
+        'difficulty': str(options['difficulty']).lower(),
+        'num_questions': int(options['num_questions']),
+        'num_cards': int(options['num_cards'])
+    }
+
+def artifact_params(artifact: str, options: dict) -> dict:
+    """The normalized options that change an artifact's content (its storage key)"""
+    return {name: options[name] for name in ARTIFACT_OPTIONS[artifact]}
+
+def get_artifact(video_id: str, artifact: str, **options):
+    """
+    Serve one artifact from the store, generating it with its own prompt on a miss
+
+    Args:
+        video_id: YouTube video ID
+        artifact: One of ARTIFACTS
+        **options: title, duration_seconds, difficulty, num_questions, num_cards
+
+    Returns:
+        The artifact, or None if the video has no transcript
+    """
+    options = normalize_options(options)
+    params = artifact_params(artifact, options)
+
+    value = artifact_store.get_artifact(video_id, artifact, params)
+    if value is not None:
+        return value
+
+    source = _load_source(video_id, artifact == 'chapters')
+    if source is None:
+        return None
+    return _generate_one(video_id, artifact, params, options, source)
+
+def get_study_pack(video_id: str, **options):
+    """
+    Get summary, quiz, flashcards and chapters for a video
+
+    Stored artifacts are reused; the rest come from one combined generation.
+
+    Args:
+        video_id: YouTube video ID
+        **options: title, duration_seconds, difficulty, num_questions, num_cards
+
+    Returns:
+        (pack, cached) where pack maps each artifact name to its value and cached
+        lists the artifacts served from the store; None if there is no transcript
+    """
+    options = normalize_options(options)
+    params = {artifact: artifact_params(artifact, options) for artifact in ARTIFACTS}
+
+    pack = {artifact: artifact_store.get_artifact(video_id, artifact, params[artifact]) for artifact in ARTIFACTS}
+    cached = [artifact for artifact in ARTIFACTS if pack[artifact] is not None]
+    missing = [artifact for artifact in ARTIFACTS if pack[artifact] is None]
+    if not missing:
+        return pack, cached
+
+    source = _load_source(video_id, 'chapters' in missing)
+    if source is None:
+        return None
+    timed = source if 'chapters' in missing else None
+    text = timed.text if timed is not None else source
+
+    started = time.perf_counter()
+    generated = generate_study_pack(
+        text,
+        options['title'],
+        options['duration_seconds'],
+        options['difficulty'],
+        options['num_questions'],
+        options['num_cards'],
+        timed=timed
+    )
+    share = (time.perf_counter() - started) / len(ARTIFACTS)
+
+    for artifact in missing:
+        value = generated[artifact]
+        if value is None:
+            # Section missing from the combined response: fall back to its own prompt
+            source = timed if artifact == 'chapters' else text
+            pack[artifact] = _generate_one(video_id, artifact, params[artifact], options, source)
+            continue
+        artifact_store.put_artifact(video_id, artifact, params[artifact], value, share)
+        pack[artifact] = value
+
+    return pack, cached
+
+def _load_source(video_id: str, timed: bool):
+    # Only chapters need timings; text artifacts never trigger a timings upgrade fetch
+    if timed:
+        source = get_timed_transcript(video_id)
+        return source if source is not None and source.text else None
+    return get_video_transcript(video_id) or None
+
+def _generate_one(video_id: str, artifact: str, params: dict, options: dict, source):
+    """source is a TimedTranscript for chapters and the transcript text otherwise"""
+    build = _BUILDERS[artifact]
+    started = time.perf_counter()
+    try:
+        value = build(source, options, strict=True)
+    except ValueError as e:
+        # Placeholder content is returned but never stored (the retry is a response cache hit)
+        print(f"DEBUG: {artifact} for {video_id} not stored: {e}")
+        return build(source, options, strict=False)
+
+    artifact_store.put_artifact(video_id, artifact, params, value, time.perf_counter() - started)
+    return value
+
+_BUILDERS = {
+    'summary': lambda text, o, strict: generate_video_summary(text, o['title'], strict=strict),
+    'quiz': lambda text, o, strict: generate_quiz_from_transcript(
+        text, difficulty=o['difficulty'], num_questions=o['num_questions'], strict=strict
+    ),
+    'flashcards': lambda text, o, strict: generate_flashcards(text, num_cards=o['num_cards'], strict=strict),
+    'chapters': lambda timed, o, strict: generate_chapter_recommendations(
+        timed.text, o['duration_seconds'], strict=strict, timed=timed
+    )
+}
@@ -0,0 +1,303 @@
+"""
+Token-budget-aware transcript condensing (map-reduce)
+
+Prompts used to take transcript[:3000]-style slices, so anything past the first
+few minutes of a long lecture was never seen. condense_transcript returns the
+transcript unchanged when it fits the prompt budget; otherwise it splits it
+into token-budgeted chunks, summarizes the chunks in parallel (map), and joins
+the chunk notes, merging them again if they are still over budget (reduce).
+Chunk boundaries are content-defined: a chunk ends where a hash of the last few
+words hits a target (within min/max sizes), not at a fixed word offset. Each
+chunk prompt depends only on its own text, so re-runs are served by the
+response cache, and an edit only changes the chunks around it; the boundaries
+after it fall on the same words as before. The map and merge calls run
+concurrently on the shared event loop (utils.async_runner) through the async
+Gemini API; gevent workers, which must not use that loop, use a thread pool.
+
+condense_timed_transcript does the same for a TimedTranscript, keeping time
+markers (direct) or each note's time range (condensed) so the model can place
+things such as chapter breaks at real seconds.
+"""
+
+import asyncio
+import json
+import math
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from services.gemini_service import generate_json_content, generate_json_content_async, count_tokens
+from utils.async_runner import run_coroutine
+from utils.timed_transcript import TimedTranscript
+
+# Transcripts up to this many tokens are sent to prompts as-is
+SUMMARY_DIRECT_TOKENS = int(os.getenv('SUMMARY_DIRECT_TOKENS', '6000'))
+# Target size of each map chunk
+SUMMARY_CHUNK_TOKENS = int(os.getenv('SUMMARY_CHUNK_TOKENS', '3000'))
+SUMMARY_CHUNK_OVERLAP_WORDS = int(os.getenv('SUMMARY_CHUNK_OVERLAP_WORDS', '50'))
+# Concurrent Gemini calls per condense_transcript call
+SUMMARY_MAP_CONCURRENCY = int(os.getenv('SUMMARY_MAP_CONCURRENCY', '4'))
+# The shared event loop is not usable under gevent (see gunicorn.conf.py)
+ASYNC_GENERATION = os.getenv('GUNICORN_WORKER_CLASS', 'gthread') != 'gevent'
+
+DEFAULT_CHARS_PER_TOKEN = 4.0
+CALIBRATION_CHARS = 4000
+CHUNK_WORDS_STEP = 50   # Chunk sizes are rounded to this so boundaries (and cache keys) stay stable
+CUT_WINDOW = 8          # Units hashed to decide a content-defined cut
+MAX_REDUCE_ROUNDS = 3
+TIME_MARKER_SECONDS = 30  # Direct timed text gets a [123s] marker at most this often
+
+_chars_per_token = None
+_calibration_lock = threading.Lock()
+
+def chars_per_token(sample: str = None) -> float:
+    """
+    Characters per token, calibrated once per process with count_tokens
+
+    Args:
+        sample: Text to calibrate on if not calibrated yet
+
+    Returns:
+        Ratio used by estimate_tokens (DEFAULT_CHARS_PER_TOKEN if counting fails)
+    """
+    global _chars_per_token
+    if _chars_per_token is None and sample:
+        with _calibration_lock:
+            if _chars_per_token is None:
+                sample = sample[:CALIBRATION_CHARS]
+                tokens = count_tokens(sample)
+                ratio = len(sample) / tokens if tokens else DEFAULT_CHARS_PER_TOKEN
+                # Coarse steps keep chunk boundaries (and their cache entries) the same across workers
+                _chars_per_token = max(round(ratio * 4) / 4, 1.0)
+    return _chars_per_token or DEFAULT_CHARS_PER_TOKEN
+
+def estimate_tokens(text: str) -> int:
+    """Estimate a text's token count from the calibrated ratio (no API call)"""
+    return math.ceil(len(text) / chars_per_token(text))
+
+def split_by_token_budget(transcript: str, max_tokens: int = SUMMARY_CHUNK_TOKENS,
+                          overlap_words: int = SUMMARY_CHUNK_OVERLAP_WORDS) -> list:
+    """
+    Split a transcript into content-defined chunks of at most max_tokens each
+
+    Args:
+        transcript: Full transcript text
+        max_tokens: Token budget per chunk
+        overlap_words: Words each chunk repeats from the end of the previous one
+
+    Returns:
+        List of chunk strings
+    """
+    words = transcript.split()
+    if not words:
+        return []
+    tokens_per_word = estimate_tokens(transcript) / len(words)
+    chunk_words = int(max_tokens / tokens_per_word) // CHUNK_WORDS_STEP * CHUNK_WORDS_STEP
+    chunk_words = max(chunk_words, overlap_words + CHUNK_WORDS_STEP)
+    new_words = chunk_words - overlap_words
+    chunks, start = [], 0
+    for end in _content_defined_cuts(words, [1] * len(words), new_words // 2, new_words):
+        chunks.append(' '.join(words[max(start - overlap_words, 0):end]))
+        start = end
+    return chunks
+
+def condense_transcript(transcript: str, max_tokens: int = SUMMARY_DIRECT_TOKENS) -> str:
+    """
+    Fit a transcript into a prompt budget without dropping any part of it
+
+    Args:
+        transcript: Full transcript text
+        max_tokens: Token budget for the transcript in the caller's prompt
+
+    Returns:
+        The transcript itself if it fits, else ordered notes covering all of it
+    """
+    if not transcript or estimate_tokens(transcript) <= max_tokens:
+        return transcript
+
+    chunks = split_by_token_budget(transcript)
+    notes = _map(_chunk_prompt, _parse_notes, chunks)
+    print(f"DEBUG: Condensed transcript of ~{estimate_tokens(transcript)} tokens into {len(chunks)} chunk notes")
+    return _reduce(notes, max_tokens)
+
+def condense_timed_transcript(timed: TimedTranscript, max_tokens: int = SUMMARY_DIRECT_TOKENS) -> str:
+    """
+    condense_transcript for a timed transcript, keeping times in the output
+
+    Args:
+        timed: TimedTranscript
+        max_tokens: Token budget for the transcript in the caller's prompt
+
+    Returns:
+        Text with [123s] markers if it fits, else ordered notes labelled with their time ranges
+    """
+    marked = _with_time_markers(timed)
+    if estimate_tokens(marked) <= max_tokens:
+        return marked
+
+    windows = _time_windows(timed, SUMMARY_CHUNK_TOKENS)
+    notes = _map(_chunk_prompt, _parse_notes, [text for text, _, _ in windows])
+    for note, (_, start, end) in zip(notes, windows):
+        note['start'], note['end'] = start, end
+    print(f"DEBUG: Condensed timed transcript into {len(windows)} windows")
+    return _reduce(notes, max_tokens)
+
+def _reduce(notes: list, max_tokens: int) -> str:
+    for _ in range(MAX_REDUCE_ROUNDS):
+        text = _format_notes(notes)
+        if estimate_tokens(text) <= max_tokens or len(notes) == 1:
+            return text
+        # Still over budget: merge neighbouring notes in groups and try again
+        groups = _group_notes(notes, SUMMARY_CHUNK_TOKENS)
+        notes = _map(_merge_prompt, _merged_notes, groups)
+
+    return _format_notes(notes)
+
+def _map(build_prompt, make_notes, items: list) -> list:
+    """Generate build_prompt(item) for every item, at most SUMMARY_MAP_CONCURRENCY at once"""
+    prompts = [build_prompt(item) for item in items]
+    if len(prompts) <= 1 or SUMMARY_MAP_CONCURRENCY <= 1:
+        responses = [generate_json_content(prompt) for prompt in prompts]
+    elif ASYNC_GENERATION:
+        responses = run_coroutine(_generate_all(prompts))
+    else:
+        with ThreadPoolExecutor(max_workers=min(SUMMARY_MAP_CONCURRENCY, len(prompts))) as pool:
+            responses = list(pool.map(generate_json_content, prompts))
+    return [make_notes(response, item) for response, item in zip(responses, items)]
+
+async def _generate_all(prompts: list) -> list:
+    semaphore = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+
+    async def generate(prompt):
+        async with semaphore:
+            return await generate_json_content_async(prompt)
+
+    return await asyncio.gather(*(generate(prompt) for prompt in prompts))
+
+def _chunk_prompt(chunk: str) -> str:
+    # Position-independent prompt, so the response cache entry survives re-chunking elsewhere
+    return f"""
+Summarize this excerpt of an educational video transcript for a study guide.
+Keep every concept, definition, formula, example and step that a quiz or summary could ask about.
+
+EXCERPT:
+{chunk}
+
+Return JSON:
+{{
+  "summary": "3-5 sentence summary of the excerpt",
+  "key_points": ["point1", "point2", "..."],
+  "terms": ["important term or formula", "..."]
+}}
+"""
+
+def _with_time_markers(timed: TimedTranscript) -> str:
+    parts, next_marker = [], 0.0
+    for i in range(len(timed)):
+        if timed.starts[i] >= next_marker:
+            parts.append(f"[{int(timed.starts[i])}s]")
+            next_marker = timed.starts[i] + TIME_MARKER_SECONDS
+        parts.append(timed.segment_text(i))
+    return ' '.join(parts)
+
+def _time_windows(timed: TimedTranscript, max_tokens: int) -> list:
+    """Split at content-defined segment boundaries into (text, start_seconds, end_seconds) windows of up to max_tokens"""
+    budget_chars = int(max_tokens * chars_per_token(timed.text))
+    segments = [timed.segment_text(i) for i in range(len(timed))]
+    windows, first = [], 0
+    for end in _content_defined_cuts(segments, [len(text) + 1 for text in segments], budget_chars // 2, budget_chars):
+        last = end - 1
+        end_offset = timed.offsets[end] - 1 if end < len(timed) else len(timed.text)
+        windows.append((
+            timed.text[timed.offsets[first]:end_offset],
+            timed.starts[first],
+            timed.starts[last] + timed.durations[last]
+        ))
+        first = end
+    return windows
+
+def _content_defined_cuts(units: list, sizes: list, min_size: int, max_size: int) -> list:
+    """
+    End index (exclusive) of each piece of units
+
+    A piece ends after a unit once it holds min_size and the hash of the last
+    CUT_WINDOW units modulo gap is below the unit's size (so a cut comes about
+    gap past min_size), or before it would exceed max_size otherwise. Cuts
+    depend only on nearby content, so after an edit they fall on the same
+    units again within a piece or two.
+    """
+    gap = max((max_size - min_size) // 3, 1)  # Few pieces reach max_size, whose cut is positional
+    cuts, size = [], 0
+    for i, unit_size in enumerate(sizes):
+        if size and size + unit_size > max_size:
+            cuts.append(i)
+            size = 0
+        size += unit_size
+        window = ' '.join(units[max(i - CUT_WINDOW + 1, 0):i + 1])
+        if size >= min_size and zlib.crc32(window.encode('utf-8')) % gap < unit_size:
+            cuts.append(i + 1)
+            size = 0
+    if size:
+        cuts.append(len(units))
+    return cuts
+
+def _merge_prompt(notes: list) -> str:
+    return f"""
+Merge these consecutive study notes from one educational video into a single, shorter set of notes.
+Keep the order of topics and every distinct concept.
+
+NOTES:
+{_format_notes(notes)}
+
+Return JSON:
+{{
+  "summary": "3-5 sentence summary",
+  "key_points": ["point1", "point2", "..."],
+  "terms": ["important term or formula", "..."]
+}}
+"""
+
+def _merged_notes(response: str, notes: list) -> dict:
+    merged = _parse_notes(response, _format_notes(notes))
+    if 'start' in notes[0]:
+        merged['start'], merged['end'] = notes[0]['start'], notes[-1]['end']
+    return merged
+
+def _parse_notes(response: str, source: str) -> dict:
+    try:
+        notes = json.loads(response)
+        if isinstance(notes, dict) and notes.get('summary'):
+            return notes
+    except ValueError:
+        pass
+    # Unusable response: keep the start of the source text rather than losing the section
+    return {'summary': source[:1000], 'key_points': [], 'terms': []}
+
+def _format_notes(notes: list) -> str:
+    parts = []
+    for i, note in enumerate(notes, 1):
+        label = f"Part {i}/{len(notes)}"
+        if 'start' in note:
+            label += f", {int(note['start'])}s-{int(note['end'])}s"
+        lines = [f"[{label}] {note.get('summary', '')}"]
+        lines.extend(f"- {point}" for point in note.get('key_points') or [])
+        if note.get('terms'):
+            lines.append(f"Terms: {', '.join(str(term) for term in note['terms'])}")
+        parts.append('\n'.join(lines))
+    return '\n\n'.join(parts)
+
+def _group_notes(notes: list, max_tokens: int) -> list:
+    groups, current, size = [], [], 0
+    for note in notes:
+        tokens = estimate_tokens(_format_notes([note]))
+        if current and size + tokens > max_tokens:
+            groups.append(current)
+            current, size = [], 0
+        current.append(note)
+        size += tokens
+    if current:
+        groups.append(current)
+    # Always make progress, even if every note is over budget on its own
+    if len(groups) == len(notes) and len(notes) > 1:
+        groups = [notes[i:i + 2] for i in range(0, len(notes), 2)]
+    return groups
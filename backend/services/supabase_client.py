@@ -0,0 +1,82 @@
+"""
+Process-wide Supabase client
+
+Every blueprint and service shares one client, created on first use, so
+worker startup never depends on the database and HTTP connections are reused
+across requests. The underlying httpx pool, keep-alive and timeouts are
+tunable through environment variables.
+"""
+
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Total request timeout / connect timeout (seconds)
+SUPABASE_TIMEOUT_SECONDS = float(os.getenv('SUPABASE_TIMEOUT_SECONDS', '10'))
+SUPABASE_CONNECT_TIMEOUT_SECONDS = float(os.getenv('SUPABASE_CONNECT_TIMEOUT_SECONDS', '5'))
+# Connection pool shared by all threads of a worker process
+SUPABASE_MAX_CONNECTIONS = int(os.getenv('SUPABASE_MAX_CONNECTIONS', '20'))
+SUPABASE_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('SUPABASE_MAX_KEEPALIVE_CONNECTIONS', '10'))
+SUPABASE_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv('SUPABASE_KEEPALIVE_EXPIRY_SECONDS', '30'))
+SUPABASE_HTTP2 = os.getenv('SUPABASE_HTTP2', 'true').lower() == 'true'
+
+_client = None
+_client_lock = threading.Lock()
+
+class SupabaseNotConfigured(RuntimeError):
+    pass
+
+def get_supabase():
+    """
+    Get the process-wide Supabase client, creating it on first use
+
+    Returns:
+        Supabase Client, or None if SUPABASE_URL / SUPABASE_KEY are not set
+    """
+    global _client
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            url = os.environ.get("SUPABASE_URL")
+            key = os.environ.get("SUPABASE_KEY")
+            if not url or not key:
+                return None
+
+            _client = _create_client(url, key)
+
+    return _client
+
+def require_supabase():
+    """
+    Like get_supabase, for code paths that cannot work without the database
+
+    Raises:
+        SupabaseNotConfigured: If SUPABASE_URL / SUPABASE_KEY are not set
+    """
+    client = get_supabase()
+    if client is None:
+        raise SupabaseNotConfigured("Supabase is not configured (set SUPABASE_URL and SUPABASE_KEY)")
+    return client
+
+def _create_client(url: str, key: str):
+    import httpx
+    from supabase import create_client, ClientOptions
+
+    http_client = httpx.Client(
+        timeout=httpx.Timeout(SUPABASE_TIMEOUT_SECONDS, connect=SUPABASE_CONNECT_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=SUPABASE_MAX_CONNECTIONS,
+            max_keepalive_connections=SUPABASE_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY_SECONDS
+        ),
+        http2=SUPABASE_HTTP2,
+        follow_redirects=True
+    )
+    return create_client(url, key, options=ClientOptions(
+        httpx_client=http_client,
+        postgrest_client_timeout=SUPABASE_TIMEOUT_SECONDS
+    ))
@@ -0,0 +1,113 @@
+"""
+Delta sync of a user's progress rows
+
+Clients keep an opaque cursor and receive only the video_progress and
+consistency_logs rows whose updated_at moved past it. The cursor stores an
+(updated_at, id) position per table, so rows sharing a timestamp are never
+skipped at page boundaries. Deleted rows are reported by id from the
+sync_deletions tombstones (filled by an AFTER DELETE trigger), paged the same
+way on (deleted_at, id).
+
+A row's updated_at is stamped when it is written but only becomes visible when
+its transaction commits, so a sync can run in between and hand out a cursor
+past it. Rows newer than SYNC_SAFETY_LAG_SECONDS are therefore held back until
+the next sync; the lag has to cover write-to-commit time plus any clock skew
+between the app servers and the database.
+"""
+
+import base64
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from services.supabase_client import require_supabase
+
+SYNC_TABLES = ('video_progress', 'consistency_logs')
+DELETIONS_TABLE = 'sync_deletions'
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1000
+SYNC_SAFETY_LAG_SECONDS = float(os.getenv('SYNC_SAFETY_LAG_SECONDS', '5'))
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(positions: dict) -> str:
+    """Encode {table: [timestamp, id]} as a URL-safe string"""
+    raw = json.dumps(positions, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a cursor produced by encode_cursor (empty/None = from the beginning)"""
+    if not cursor:
+        return {}
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        positions = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Malformed sync cursor: {e}")
+    if not isinstance(positions, dict) or not all(
+        isinstance(pos, list) and len(pos) == 2 for pos in positions.values()
+    ):
+        raise InvalidCursor("Malformed sync cursor")
+    return positions
+
+def fetch_changes(user_id: str, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+    """
+    Fetch rows changed or deleted since a cursor, up to SYNC_SAFETY_LAG_SECONDS ago
+
+    Args:
+        user_id: User ID
+        cursor: Cursor from a previous call (None for a full initial sync)
+        limit: Maximum rows per table in this page
+
+    Returns:
+        {
+            'video_progress': [...],
+            'consistency_logs': [...],
+            'deleted': {'video_progress': [ids], 'consistency_logs': [ids]},
+            'cursor': str,       # pass back on the next call
+            'has_more': bool     # True if any table filled its page
+        }
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    positions = decode_cursor(cursor)
+    supabase = require_supabase()
+    settled = (datetime.now(timezone.utc) - timedelta(seconds=SYNC_SAFETY_LAG_SECONDS)).isoformat()
+    if not cursor:
+        # A full sync has nothing to delete; later syncs report deletes from now on
+        positions[DELETIONS_TABLE] = [settled, 0]
+
+    result = {}
+    has_more = False
+    for table in SYNC_TABLES:
+        query = supabase.table(table).select('*').eq('user_id', user_id)
+        rows = _page(query, 'updated_at', positions, table, settled, limit)
+        result[table] = rows
+        has_more = has_more or len(rows) == limit
+
+    query = supabase.table(DELETIONS_TABLE).select('id, table_name, row_id, deleted_at').eq('user_id', user_id)
+    tombstones = _page(query, 'deleted_at', positions, DELETIONS_TABLE, settled, limit)
+    result['deleted'] = {table: [] for table in SYNC_TABLES}
+    for tombstone in tombstones:
+        if tombstone['table_name'] in result['deleted']:
+            result['deleted'][tombstone['table_name']].append(tombstone['row_id'])
+    has_more = has_more or len(tombstones) == limit
+
+    result['cursor'] = encode_cursor(positions)
+    result['has_more'] = has_more
+    return result
+
+def _page(query, time_column: str, positions: dict, key: str, settled: str, limit: int) -> list:
+    """Next page of settled rows after positions[key], advancing it past the page"""
+    query = query.lt(time_column, settled)
+
+    position = positions.get(key)
+    if position:
+        timestamp, row_id = position
+        query = query.or_(
+            f'{time_column}.gt."{timestamp}",and({time_column}.eq."{timestamp}",id.gt.{row_id})'
+        )
+
+    rows = query.order(time_column).order('id').limit(limit).execute().data or []
+    if rows:
+        positions[key] = [rows[-1][time_column], rows[-1]['id']]
+    return rows
@@ -0,0 +1,206 @@
+"""
+Two-tier transcript cache
+
+Tier 1 is an in-process LRU, tier 2 is the `video_transcripts` table in Supabase.
+Entries are keyed by (video_id, requested language). Videos without captions are
+cached as negative entries with a shorter TTL so they are retried eventually.
+Transcripts are kept with their segment timings (TimedTranscript); rows cached
+before timings were stored only have text.
+"""
+
+import os
+from datetime import datetime, timezone
+from utils.cache import LRUCache
+from utils.timed_transcript import TimedTranscript
+from services.supabase_client import get_supabase
+
+TRANSCRIPT_CACHE_SIZE = int(os.getenv('TRANSCRIPT_CACHE_SIZE', '256'))
+NEGATIVE_TTL_SECONDS = int(os.getenv('TRANSCRIPT_NEGATIVE_TTL_SECONDS', str(6 * 3600)))
+
+TABLE = 'video_transcripts'
+
+# Marker stored in the LRU for videos known to have no transcript
+UNAVAILABLE = object()
+
+_memory = LRUCache(max_entries=TRANSCRIPT_CACHE_SIZE)
+
+def _key(video_id: str, language: str) -> tuple:
+    return (video_id, language)
+
+def lookup(video_id: str, language: str = 'en'):
+    """
+    Look up a transcript in memory, then in the database
+
+    Args:
+        video_id: YouTube video ID
+        language: Requested language code
+
+    Returns:
+        Transcript text, UNAVAILABLE for a cached negative result,
+        or None on a cache miss
+    """
+    cached = _lookup(video_id, language)
+    return cached.text if isinstance(cached, TimedTranscript) else cached
+
+def lookup_timed(video_id: str, language: str = 'en'):
+    """
+    Look up a transcript with its segment timings
+
+    Returns:
+        TimedTranscript, UNAVAILABLE for a cached negative result, or None on a
+        cache miss (including cached text that has no timings)
+    """
+    cached = _lookup(video_id, language)
+    return cached if cached is UNAVAILABLE or isinstance(cached, TimedTranscript) else None
+
+def _lookup(video_id: str, language: str):
+    key = _key(video_id, language)
+    cached = _memory.get(key)
+    if cached is not None:
+        return cached
+
+    row = _load_row(video_id, language)
+    if row is None:
+        return None
+
+    if not row.get('available', True):
+        age = _age_seconds(row.get('fetched_at'))
+        if age is None or age >= NEGATIVE_TTL_SECONDS:
+            return None
+        _memory.set(key, UNAVAILABLE, ttl_seconds=NEGATIVE_TTL_SECONDS - age)
+        return UNAVAILABLE
+
+    value = row['transcript_text']
+    if row.get('segments'):
+        try:
+            value = TimedTranscript.from_dict(value, row['segments'])
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"DEBUG: Ignoring malformed segments for {video_id}: {e}")
+    _memory.set(key, value)
+    return value
+
+def store(video_id: str, language: str, transcript,
+          transcript_language: str = None, auto_generated: bool = True):
+    """
+    Cache a successfully fetched transcript in both tiers
+
+    Args:
+        video_id: YouTube video ID
+        language: Requested language code (cache key)
+        transcript: TimedTranscript, or plain transcript text
+        transcript_language: Language code of the transcript actually used
+        auto_generated: Whether the transcript was auto-generated
+    """
+    timed = isinstance(transcript, TimedTranscript)
+    _memory.set(_key(video_id, language), transcript)
+    _save_row({
+        'youtube_video_id': video_id,
+        'language': language,
+        'transcript_language': transcript_language or language,
+        'transcript_text': transcript.text if timed else transcript,
+        'segments': transcript.to_dict() if timed else None,
+        'auto_generated': auto_generated,
+        'available': True,
+        'fetched_at': datetime.now(timezone.utc).isoformat()
+    })
+
+def store_unavailable(video_id: str, language: str):
+    """
+    Cache the fact that a video has no transcript (disabled / not found)
+
+    Args:
+        video_id: YouTube video ID
+        language: Requested language code (cache key)
+    """
+    _memory.set(_key(video_id, language), UNAVAILABLE, ttl_seconds=NEGATIVE_TTL_SECONDS)
+    _save_row({
+        'youtube_video_id': video_id,
+        'language': language,
+        'transcript_text': '',
+        'segments': None,
+        'available': False,
+        'fetched_at': datetime.now(timezone.utc).isoformat()
+    })
+
+def cached_states(video_ids: list, language: str = 'en') -> dict:
+    """
+    Which of several videos have a cached transcript, without loading the text
+
+    Memory is checked first; the rest are looked up in one database query.
+
+    Args:
+        video_ids: YouTube video IDs
+        language: Requested language code
+
+    Returns:
+        {video_id: 'cached' | 'unavailable'}; videos with no (current) entry are omitted
+    """
+    states, remaining = {}, []
+    for video_id in video_ids:
+        cached = _memory.get(_key(video_id, language))
+        if cached is UNAVAILABLE:
+            states[video_id] = 'unavailable'
+        elif cached is not None:
+            states[video_id] = 'cached'
+        else:
+            remaining.append(video_id)
+
+    supabase = get_supabase()
+    if supabase is None or not remaining:
+        return states
+    try:
+        res = supabase.table(TABLE).select(
+            'youtube_video_id, available, fetched_at'
+        ).eq('language', language).in_('youtube_video_id', remaining).execute()
+    except Exception as e:
+        print(f"DEBUG: Transcript cache status read failed: {e}")
+        return states
+    for row in res.data or []:
+        if row.get('available', True):
+            states[row['youtube_video_id']] = 'cached'
+        else:
+            age = _age_seconds(row.get('fetched_at'))
+            if age is not None and age < NEGATIVE_TTL_SECONDS:
+                states[row['youtube_video_id']] = 'unavailable'
+    return states
+
+def invalidate(video_id: str, language: str = 'en'):
+    """Drop a video from the in-process tier (the durable row is overwritten on next store)"""
+    _memory.pop(_key(video_id, language))
+
+def stats() -> dict:
+    """Return in-process cache counters"""
+    return _memory.stats()
+
+def _load_row(video_id: str, language: str):
+    supabase = get_supabase()
+    if supabase is None:
+        return None
+    try:
+        res = supabase.table(TABLE).select(
+            'transcript_text, segments, available, fetched_at'
+        ).eq('youtube_video_id', video_id).eq('language', language).limit(1).execute()
+        return res.data[0] if res.data else None
+    except Exception as e:
+        print(f"DEBUG: Transcript cache read failed for {video_id}: {e}")
+        return None
+
+def _save_row(row: dict):
+    supabase = get_supabase()
+    if supabase is None:
+        return
+    try:
+        supabase.table(TABLE).upsert(row, on_conflict='youtube_video_id,language').execute()
+    except Exception as e:
+        print(f"DEBUG: Transcript cache write failed for {row['youtube_video_id']}: {e}")
+
+def _age_seconds(timestamp):
+    if not timestamp:
+        return None
+    try:
+        fetched_at = datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if fetched_at.tzinfo is None:
+        fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - fetched_at).total_seconds()
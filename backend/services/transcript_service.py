@@ -1,74 +1,199 @@
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
+from services import transcript_cache
+from utils.cache import LRUCache
+from utils.singleflight import SingleFlight
+from utils.timed_transcript import TimedTranscript
 
-def get_video_transcript(video_id: str, language: str = 'en') -> str:
+# youtube_transcript_api is imported where it is used, keeping it off the startup path
+
+# Concurrent requests for the same (video, language) share one YouTube fetch
+transcript_flight = SingleFlight('transcripts')
+
+# Cached text whose timings could not be fetched is not retried for this long
+TIMINGS_RETRY_SECONDS = 3600
+_timings_failures = LRUCache(max_entries=1024)
+
+def get_video_transcript(video_id: str, language: str = 'en', use_cache: bool = True) -> str:
     """
-    Fetch transcript for a YouTube video with robust fallback
+    Get transcript for a YouTube video, served from the transcript cache when possible
     
     Args:
         video_id: YouTube video ID
         language: Preferred language code (default: 'en')
+        use_cache: Set False to bypass the cache and refetch from YouTube
     
     Returns:
         Transcript text as a single string, or None if not available
     """
+    if use_cache:
+        cached = transcript_cache.lookup(video_id, language)
+        if cached is transcript_cache.UNAVAILABLE:
+            print(f"DEBUG: Transcript cached as unavailable for {video_id}")
+            return None
+        if cached is not None:
+            return cached
+
+    try:
+        return fetch_and_cache_transcript(video_id, language)
+    except Exception as e:
+        # Transient failures (network, rate limits) are not cached
+        print(f"DEBUG: Critical error fetching transcript for {video_id}: {e}")
+        return None
+
+def get_timed_transcript(video_id: str, language: str = 'en', use_cache: bool = True) -> TimedTranscript:
+    """
+    Get a transcript with its segment start times and durations
+    
+    Served from the transcript cache like get_video_transcript. For cached
+    text without timings (older rows) the timings are fetched once; if that
+    fails the cached text is returned without segments, and the cached row is
+    never replaced by a negative entry.
+    
+    Args:
+        video_id: YouTube video ID
+        language: Preferred language code (default: 'en')
+        use_cache: Set False to bypass the cache and refetch from YouTube
+    
+    Returns:
+        TimedTranscript (its .text equals get_video_transcript's result; it has no
+        segments if timings could not be fetched), or None if not available
+    """
+    if use_cache:
+        cached = transcript_cache.lookup_timed(video_id, language)
+        if cached is transcript_cache.UNAVAILABLE:
+            return None
+        if cached is not None:
+            return cached
+        text = transcript_cache.lookup(video_id, language)
+        if isinstance(text, str):
+            return _add_timings(video_id, language, text)
+
+    try:
+        result = _fetch_timed(video_id, language)
+    except Exception as e:
+        print(f"DEBUG: Critical error fetching transcript for {video_id}: {e}")
+        return None
+    return result if isinstance(result, TimedTranscript) else None
+
+def _add_timings(video_id: str, language: str, text: str) -> TimedTranscript:
+    # Upgrade a text-only cache row; any failure keeps the text (an empty TimedTranscript is falsy)
+    untimed = TimedTranscript(text, [], [], [])
+    key = (video_id, language)
+    if _timings_failures.get(key):
+        return untimed
+    try:
+        result = transcript_flight.do(('timings',) + key, _fetch_transcript, video_id, language)
+    except Exception as e:
+        # Includes TranscriptsDisabled: the cached text stays the video's transcript
+        print(f"DEBUG: Could not add timings to cached transcript for {video_id}: {e}")
+        result = None
+    if result is None:
+        _timings_failures.set(key, True, ttl_seconds=TIMINGS_RETRY_SECONDS)
+        return untimed
+
+    timed, transcript_language, auto_generated = result
+    transcript_cache.store(video_id, language, timed, transcript_language, auto_generated)
+    return timed
+
+def fetch_and_cache_transcript(video_id: str, language: str = 'en') -> str:
+    """
+    Fetch a transcript from YouTube and write the outcome to the transcript cache
+    
+    Unlike get_video_transcript, transient failures are raised so callers
+    (e.g. the prefetch pipeline) can retry them. Concurrent calls for the
+    same video and language share a single fetch.
+    
+    Args:
+        video_id: YouTube video ID
+        language: Preferred language code (default: 'en')
+    
+    Returns:
+        Transcript text, or None if the video has no transcript
+    """
+    result = _fetch_timed(video_id, language)
+    return result.text if isinstance(result, TimedTranscript) else None
+
+def _fetch_timed(video_id: str, language: str):
+    return transcript_flight.do(
+        (video_id, language), _fetch_and_store, video_id, language,
+        recheck=lambda: transcript_cache.lookup_timed(video_id, language)
+    )
+
+def _fetch_and_store(video_id: str, language: str):
+    from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
+    try:
+        result = _fetch_transcript(video_id, language)
+    except (TranscriptsDisabled, NoTranscriptFound) as e:
+        print(f"DEBUG: Transcript Disabled/Not Found for {video_id}: {e}")
+        result = None
+
+    if result is None:
+        transcript_cache.store_unavailable(video_id, language)
+        return None
+
+    timed, transcript_language, auto_generated = result
+    transcript_cache.store(video_id, language, timed, transcript_language, auto_generated)
+    return timed
+
+def _fetch_transcript(video_id: str, language: str):
+    """
+    Fetch a timed transcript from YouTube with robust language fallback
+    
+    Raises TranscriptsDisabled / NoTranscriptFound when the video has no captions;
+    any other exception is a transient failure.
+    
+    Returns:
+        (TimedTranscript, language_code, is_generated), or None if no transcript was found
+    """
+    from youtube_transcript_api import YouTubeTranscriptApi
     print(f"DEBUG: Fetching transcript for {video_id}...")
+    # Get list of all available transcripts
+    transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+    
+    transcript = None
+    
+    # Strategy 1: Try exact language match
     try:
-        # Get list of all available transcripts
-        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-        
-        transcript = None
+        transcript = transcript_list.find_transcript([language])
+        print(f"DEBUG: Found preferred transcript: {language}")
+    except:
+        print(f"DEBUG: Preferred language '{language}' not found.")
         
-        # Strategy 1: Try exact language match
+    # Strategy 2: If no preferred, try English (any type)
+    if not transcript and language != 'en':
         try:
-            transcript = transcript_list.find_transcript([language])
-            print(f"DEBUG: Found preferred transcript: {language}")
+            transcript = transcript_list.find_transcript(['en'])
+            print("DEBUG: Found English fallback.")
         except:
-            print(f"DEBUG: Preferred language '{language}' not found.")
-            
-        # Strategy 2: If no preferred, try English (any type)
-        if not transcript and language != 'en':
-            try:
-                transcript = transcript_list.find_transcript(['en'])
-                print("DEBUG: Found English fallback.")
-            except:
-                pass
-                
-        # Strategy 3: Iterate through all available transcripts
-        if not transcript:
-            print("DEBUG: Iterating through all available transcripts...")
-            for t in transcript_list:
-                # Prefer not generated if possible, but take what we can get
-                if not t.is_generated:
-                    transcript = t
-                    print(f"DEBUG: Selected fallback (manual): {t.language_code}")
-                    break
+            pass
             
-            # If still nothing, take the first one (auto-generated)
-            if not transcript:
-                for t in transcript_list:
-                    transcript = t
-                    print(f"DEBUG: Selected final fallback (auto): {t.language_code}")
-                    break
+    # Strategy 3: Iterate through all available transcripts
+    if not transcript:
+        print("DEBUG: Iterating through all available transcripts...")
+        for t in transcript_list:
+            # Prefer not generated if possible, but take what we can get
+            if not t.is_generated:
+                transcript = t
+                print(f"DEBUG: Selected fallback (manual): {t.language_code}")
+                break
         
+        # If still nothing, take the first one (auto-generated)
         if not transcript:
-            print("DEBUG: No transcript object found after all strategies.")
-            return None
-            
-        # Fetch the actual text
-        print(f"DEBUG: Fetching text for {transcript.language_code}...")
-        transcript_data = transcript.fetch()
-        full_text = ' '.join([entry['text'] for entry in transcript_data])
-        print(f"DEBUG: Successfully fetched {len(full_text)} chars.")
-        
-        return full_text
-        
-    except (TranscriptsDisabled, NoTranscriptFound) as e:
-        print(f"DEBUG: Transcript Disabled/Not Found for {video_id}: {e}")
-        return None
-    except Exception as e:
-        print(f"DEBUG: Critical error fetching transcript for {video_id}: {e}")
+            for t in transcript_list:
+                transcript = t
+                print(f"DEBUG: Selected final fallback (auto): {t.language_code}")
+                break
+    
+    if not transcript:
+        print("DEBUG: No transcript object found after all strategies.")
         return None
+        
+    # Fetch the actual text
+    print(f"DEBUG: Fetching text for {transcript.language_code}...")
+    transcript_data = transcript.fetch()
+    timed = TimedTranscript.from_entries(transcript_data)
+    print(f"DEBUG: Successfully fetched {len(timed.text)} chars in {len(timed)} segments.")
+    
+    return timed, transcript.language_code, transcript.is_generated
 
 def chunk_transcript(transcript: str, chunk_size: int = 500, overlap: int = 50) -> list:
     """
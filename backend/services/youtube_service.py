@@ -1,13 +1,40 @@
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from concurrent.futures import ThreadPoolExecutor
 import os
+import threading
 import isodate
 from dotenv import load_dotenv
 
 load_dotenv()
 
 YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
-youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
+
+# Built on first use: googleapiclient and the discovery document are slow to load
+_youtube = None
+_youtube_lock = threading.Lock()
+
+# YouTube API allows max 50 IDs per videos().list request
+VIDEOS_BATCH_SIZE = 50
+DURATION_FETCH_WORKERS = int(os.getenv('YOUTUBE_DURATION_WORKERS', '4'))
+
+# httplib2.Http is not thread-safe, so concurrent batches each get their own
+_thread_local = threading.local()
+
+def _get_youtube():
+    global _youtube
+    if _youtube is None:
+        with _youtube_lock:
+            if _youtube is None:
+                from googleapiclient.discovery import build
+                _youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
+    return _youtube
+
+def _thread_http():
+    http = getattr(_thread_local, 'http', None)
+    if http is None:
+        import httplib2
+        http = httplib2.Http()
+        _thread_local.http = http
+    return http
 
 def fetch_playlist_items(playlist_id: str) -> list:
     """
@@ -19,9 +46,29 @@ def fetch_playlist_items(playlist_id: str) -> list:
     Returns:
         List of video dictionaries
     """
+    videos, _ = fetch_playlist_snapshot(playlist_id)
+    return videos
+
+def fetch_playlist_snapshot(playlist_id: str, etag: str = None):
+    """
+    Fetch all videos from a playlist, revalidating against a known ETag
+    
+    The first page is requested with If-None-Match; a 304 means the playlist
+    has not changed and no further pages are fetched.
+    
+    Args:
+        playlist_id: YouTube playlist ID
+        etag: ETag of the first page from a previous fetch (optional)
+    
+    Returns:
+        (videos, etag) tuple, or None if the playlist is unchanged since etag
+    """
+    from googleapiclient.errors import HttpError
+    youtube = _get_youtube()
     try:
         videos = []
         next_page_token = None
+        first_page_etag = None
         
         while True:
             request = youtube.playlistItems().list(
@@ -30,7 +77,18 @@ def fetch_playlist_items(playlist_id: str) -> list:
                 maxResults=50,
                 pageToken=next_page_token
             )
-            response = request.execute()
+            if etag and next_page_token is None:
+                request.headers['If-None-Match'] = etag
+            
+            try:
+                response = request.execute()
+            except HttpError as e:
+                if e.resp.status == 304:
+                    return None
+                raise
+            
+            if first_page_etag is None:
+                first_page_etag = response.get('etag')
             
             for item in response['items']:
                 video = {
@@ -46,7 +104,7 @@ def fetch_playlist_items(playlist_id: str) -> list:
             if not next_page_token:
                 break
         
-        return videos
+        return videos, first_page_etag
         
     except HttpError as e:
         print(f"YouTube API error: {e}")
@@ -62,29 +120,44 @@ def get_video_durations(videos: list) -> list:
     Returns:
         Updated list with 'duration_seconds' field
     """
+    return enrich_video_durations(videos)
+
+def enrich_video_durations(videos: list, max_workers: int = DURATION_FETCH_WORKERS) -> list:
+    """
+    Fill 'duration_seconds' / 'duration_formatted' on every video in place
+    
+    Builds a video_id -> [videos] index so each ID is requested once and
+    duplicate playlist entries all receive the duration. The 50-ID
+    videos().list batches run concurrently.
+    
+    Args:
+        videos: List of video dictionaries with 'video_id'
+        max_workers: Maximum concurrent batch requests
+    
+    Returns:
+        The same list, enriched
+    """
+    from googleapiclient.errors import HttpError
     try:
-        video_ids = [v['video_id'] for v in videos]
+        index = {}
+        for video in videos:
+            index.setdefault(video['video_id'], []).append(video)
         
-        # YouTube API allows max 50 IDs per request
-        for i in range(0, len(video_ids), 50):
-            batch_ids = video_ids[i:i+50]
-            
-            request = youtube.videos().list(
-                part='contentDetails',
-                id=','.join(batch_ids)
-            )
-            response = request.execute()
-            
-            for idx, item in enumerate(response['items']):
-                duration_iso = item['contentDetails']['duration']
-                duration_seconds = int(isodate.parse_duration(duration_iso).total_seconds())
-                
-                # Find matching video and add duration
-                for video in videos:
-                    if video['video_id'] == item['id']:
-                        video['duration_seconds'] = duration_seconds
-                        video['duration_formatted'] = format_duration(duration_seconds)
-                        break
+        video_ids = list(index)
+        batches = [video_ids[i:i + VIDEOS_BATCH_SIZE] for i in range(0, len(video_ids), VIDEOS_BATCH_SIZE)]
+        
+        if len(batches) <= 1 or max_workers <= 1:
+            results = map(_fetch_duration_batch, batches)
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as pool:
+                results = list(pool.map(_fetch_duration_batch, batches))
+        
+        for durations in results:
+            for video_id, duration_seconds in durations.items():
+                formatted = format_duration(duration_seconds)
+                for video in index.get(video_id, ()):
+                    video['duration_seconds'] = duration_seconds
+                    video['duration_formatted'] = formatted
         
         return videos
         
@@ -92,6 +165,20 @@ def get_video_durations(videos: list) -> list:
         print(f"YouTube API error: {e}")
         raise
 
+def _fetch_duration_batch(batch_ids: list) -> dict:
+    """Fetch durations for up to 50 IDs; returns {video_id: seconds}"""
+    request = _get_youtube().videos().list(
+        part='contentDetails',
+        id=','.join(batch_ids)
+    )
+    response = request.execute(http=_thread_http())
+    
+    durations = {}
+    for item in response['items']:
+        duration_iso = item['contentDetails']['duration']
+        durations[item['id']] = int(isodate.parse_duration(duration_iso).total_seconds())
+    return durations
+
 def format_duration(seconds: int) -> str:
     """Convert seconds to HH:MM:SS format"""
     hours = seconds // 3600
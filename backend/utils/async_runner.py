@@ -0,0 +1,75 @@
+"""
+Process-wide asyncio event loop for calling coroutines from Flask views
+
+The Gemini SDK caches one async (grpc.aio) client per process, and that
+client is bound to the event loop it was first used on, so every coroutine
+from gemini_service must run on the same loop. This module owns that loop
+in a daemon thread; sync code hands coroutines to it and blocks only the
+calling thread while many generations are in flight concurrently.
+
+Not for gevent workers: there, use the sync gemini_service API (grpc is made
+cooperative by gunicorn.conf.py).
+"""
+
+import asyncio
+import threading
+
+_loop = None
+_loop_lock = threading.Lock()
+_DONE = object()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Get the shared event loop, starting its thread on first use"""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='async-runner', daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def run_coroutine(coro, timeout: float = None):
+    """
+    Run a coroutine on the shared loop and wait for its result
+
+    Args:
+        coro: Coroutine object
+        timeout: Seconds to wait (None = no limit)
+
+    Returns:
+        The coroutine's result (exceptions are re-raised in the caller)
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result(timeout)
+
+
+def gather(coros, return_exceptions: bool = False) -> list:
+    """Run several coroutines concurrently on the shared loop; results in input order"""
+    async def _gather():
+        return await asyncio.gather(*coros, return_exceptions=return_exceptions)
+    return run_coroutine(_gather())
+
+
+def iter_async(agen):
+    """
+    Consume an async generator from sync code (e.g. a streaming Flask response)
+
+    Yields:
+        Items produced by the async generator
+    """
+    async def _next():
+        try:
+            return await agen.__anext__()
+        except StopAsyncIteration:
+            return _DONE
+
+    try:
+        while True:
+            item = run_coroutine(_next())
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        run_coroutine(agen.aclose())
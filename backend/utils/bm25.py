@@ -0,0 +1,258 @@
+"""
+BM25 inverted index with compact, array-backed postings
+
+Each term's postings are three parallel arrays: doc id, term frequency and
+the character offset of the term's first occurrence in that document (used
+for snippets). Doc ids only grow, so postings stay sorted and adding a
+document is an append. Removing one marks it dead; postings are compacted
+once dead documents pass COMPACT_RATIO. Search copies just the query terms'
+postings into NumPy (one memcpy each) and scores them vectorized.
+
+The index saves to a single JSON file with the arrays base64-encoded, written
+atomically so concurrent workers never read a partial file.
+"""
+
+import base64
+import json
+import math
+import os
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+import numpy as np
+
+TOKEN_RE = re.compile(r'\w+')
+COMPACT_RATIO = 0.25
+FORMAT_VERSION = 1
+
+# Very common words carry no ranking signal and make up most postings
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have i if in into is it its of on or so that the their '
+    'then there these this to was we were what when which will with you your'.split()
+)
+
+
+def tokenize(text: str):
+    """Yield (term, offset) for each indexable word"""
+    for match in TOKEN_RE.finditer(text):
+        term = match.group().lower()  # Lowercasing the match keeps offsets aligned with text
+        if term not in STOPWORDS:
+            yield term, match.start()
+
+
+class BM25Index:
+    """Okapi BM25 over documents identified by string keys"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._terms = {}       # term -> term id
+        self._doc_ids = []     # term id -> array('I') of doc ids
+        self._tfs = []         # term id -> array('I') of term frequencies
+        self._offsets = []     # term id -> array('I') of first-occurrence offsets
+        self._keys = []        # doc id -> key (None once removed)
+        self._lengths = array('I')  # doc id -> length in terms (0 once removed)
+        self._live = bytearray()    # doc id -> 1 while indexed
+        self._doc_by_key = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_by_key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._doc_by_key
+
+    def keys(self) -> list:
+        with self._lock:
+            return list(self._doc_by_key)
+
+    def add(self, key: str, text: str):
+        """Index a document, replacing any previous version with the same key"""
+        counts, first = Counter(), {}
+        for term, offset in tokenize(text):
+            counts[term] += 1
+            first.setdefault(term, offset)
+
+        with self._lock:
+            if key in self._doc_by_key:
+                self.remove(key)
+            doc_id = len(self._keys)
+            self._keys.append(key)
+            length = sum(counts.values())
+            self._lengths.append(length)
+            self._live.append(1)
+            self._doc_by_key[key] = doc_id
+            self._total_length += length
+            for term, tf in counts.items():
+                term_id = self._terms.get(term)
+                if term_id is None:
+                    term_id = self._terms[term] = len(self._doc_ids)
+                    self._doc_ids.append(array('I'))
+                    self._tfs.append(array('I'))
+                    self._offsets.append(array('I'))
+                self._doc_ids[term_id].append(doc_id)
+                self._tfs[term_id].append(tf)
+                self._offsets[term_id].append(first[term])
+
+    def remove(self, key: str) -> bool:
+        """Drop a document; returns False if it was not indexed"""
+        with self._lock:
+            doc_id = self._doc_by_key.pop(key, None)
+            if doc_id is None:
+                return False
+            self._total_length -= self._lengths[doc_id]
+            self._keys[doc_id] = None
+            self._lengths[doc_id] = 0
+            self._live[doc_id] = 0
+            if len(self._keys) - len(self._doc_by_key) > COMPACT_RATIO * len(self._keys):
+                self._compact()
+            return True
+
+    def search(self, query: str, k: int = 10) -> list:
+        """
+        Rank documents for a query
+
+        Args:
+            query: Free text
+            k: Maximum number of results
+
+        Returns:
+            List of {'key', 'score', 'offsets'} best first; offsets maps each
+            matched query term to its first character offset in the document
+        """
+        terms = list(dict.fromkeys(term for term, _ in tokenize(query)))
+        with self._lock:
+            n_docs = len(self._doc_by_key)
+            if not n_docs:
+                return []
+            live = np.frombuffer(bytes(self._live), dtype=np.uint8).astype(bool)
+            lengths = np.array(self._lengths, dtype=np.float32)
+            avgdl = max(self._total_length / n_docs, 1.0)
+            norm = self.k1 * (1 - self.b + self.b * lengths / avgdl)
+            scores = np.zeros(len(self._keys), dtype=np.float32)
+            matched = []
+            for term in terms:
+                term_id = self._terms.get(term)
+                if term_id is None:
+                    continue
+                doc_ids = np.array(self._doc_ids[term_id], dtype=np.uint32)
+                tfs = np.array(self._tfs[term_id], dtype=np.float32)
+                df = int(np.count_nonzero(live[doc_ids]))
+                if not df:
+                    continue
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                scores[doc_ids] += idf * tfs * (self.k1 + 1) / (tfs + norm[doc_ids])
+                matched.append((term, term_id))
+
+            scores[~live] = 0
+            candidates = np.flatnonzero(scores > 0)
+            if not len(candidates):
+                return []
+            top = candidates[np.argsort(-scores[candidates], kind='stable')[:k]]
+            results = []
+            for doc_id in top.tolist():
+                offsets = {}
+                for term, term_id in matched:
+                    postings = self._doc_ids[term_id]
+                    i = bisect_left(postings, doc_id)
+                    if i < len(postings) and postings[i] == doc_id:
+                        offsets[term] = self._offsets[term_id][i]
+                results.append({'key': self._keys[doc_id], 'score': float(scores[doc_id]), 'offsets': offsets})
+            return results
+
+    def save(self, path: str):
+        """Write the index to path atomically"""
+        with self._lock:
+            self._compact()
+            ptr = array('I', [0])
+            doc_ids, tfs, offsets = array('I'), array('I'), array('I')
+            for term_id in range(len(self._doc_ids)):
+                doc_ids.extend(self._doc_ids[term_id])
+                tfs.extend(self._tfs[term_id])
+                offsets.extend(self._offsets[term_id])
+                ptr.append(len(doc_ids))
+            payload = {
+                'version': FORMAT_VERSION,
+                'byteorder': sys.byteorder,
+                'k1': self.k1,
+                'b': self.b,
+                'terms': sorted(self._terms, key=self._terms.get),
+                'keys': self._keys,
+                'lengths': _encode(self._lengths),
+                'ptr': _encode(ptr),
+                'doc_ids': _encode(doc_ids),
+                'tfs': _encode(tfs),
+                'offsets': _encode(offsets)
+            }
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'BM25Index':
+        """Read an index written by save()"""
+        with open(path, encoding='utf-8') as f:
+            payload = json.load(f)
+        if payload.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index version: {payload.get('version')}")
+
+        swap = payload['byteorder'] != sys.byteorder
+        index = cls(k1=payload['k1'], b=payload['b'])
+        index._keys = payload['keys']
+        index._lengths = _decode(payload['lengths'], swap)
+        index._live = bytearray(key is not None for key in index._keys)
+        index._doc_by_key = {key: doc_id for doc_id, key in enumerate(index._keys) if key is not None}
+        index._total_length = sum(index._lengths)
+        ptr = _decode(payload['ptr'], swap)
+        doc_ids, tfs, offsets = (_decode(payload[name], swap) for name in ('doc_ids', 'tfs', 'offsets'))
+        for term_id, term in enumerate(payload['terms']):
+            start, end = ptr[term_id], ptr[term_id + 1]
+            index._terms[term] = term_id
+            index._doc_ids.append(doc_ids[start:end])
+            index._tfs.append(tfs[start:end])
+            index._offsets.append(offsets[start:end])
+        return index
+
+    def _compact(self):
+        """Drop removed documents from postings and renumber doc ids"""
+        if len(self._doc_by_key) == len(self._keys):
+            return
+        remap = {}
+        keys, lengths = [], array('I')
+        for doc_id, key in enumerate(self._keys):
+            if key is not None:
+                remap[doc_id] = len(keys)
+                keys.append(key)
+                lengths.append(self._lengths[doc_id])
+
+        terms, doc_id_lists, tf_lists, offset_lists = {}, [], [], []
+        for term, term_id in self._terms.items():
+            kept = [(remap[d], tf, off) for d, tf, off in
+                    zip(self._doc_ids[term_id], self._tfs[term_id], self._offsets[term_id]) if d in remap]
+            if not kept:
+                continue
+            terms[term] = len(doc_id_lists)
+            doc_id_lists.append(array('I', (d for d, _, _ in kept)))
+            tf_lists.append(array('I', (tf for _, tf, _ in kept)))
+            offset_lists.append(array('I', (off for _, _, off in kept)))
+
+        self._terms, self._doc_ids, self._tfs, self._offsets = terms, doc_id_lists, tf_lists, offset_lists
+        self._keys, self._lengths = keys, lengths
+        self._live = bytearray([1]) * len(keys)
+        self._doc_by_key = {key: doc_id for doc_id, key in enumerate(keys)}
+
+
+def _encode(values: array) -> str:
+    return base64.b64encode(values.tobytes()).decode('ascii')
+
+def _decode(text: str, swap: bool) -> array:
+    values = array('I')
+    values.frombytes(base64.b64decode(text))
+    if swap:
+        values.byteswap()
+    return values
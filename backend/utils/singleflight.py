@@ -0,0 +1,233 @@
+"""
+Request coalescing ("single-flight") for expensive idempotent work
+
+Concurrent callers asking for the same key share one execution: the first
+caller runs the function, the others wait on its future and receive the same
+result (or exception). Modes, selected by SINGLEFLIGHT_MODE:
+
+    thread - coalesce across threads of one worker process (default)
+    file   - additionally hold an fcntl lock file per key, so workers on one
+             host run the function one at a time. A worker that had to wait
+             for the lock calls `recheck` first, which normally finds the
+             result the other worker just cached. do_async takes the same
+             lock, polling with asyncio.sleep so the event loop keeps running.
+
+Database advisory locks are not offered: PostgREST runs each RPC in its own
+transaction, so a lock taken there is released before the work it should guard.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+SINGLEFLIGHT_MODE = os.getenv('SINGLEFLIGHT_MODE', 'thread').lower()
+SINGLEFLIGHT_LOCK_DIR = os.getenv('SINGLEFLIGHT_LOCK_DIR') or os.path.join(tempfile.gettempdir(), 'consistency-lab-locks')
+SINGLEFLIGHT_LOCK_TIMEOUT_SECONDS = float(os.getenv('SINGLEFLIGHT_LOCK_TIMEOUT_SECONDS', '60'))
+LOCK_POLL_SECONDS = 0.05
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key"""
+
+    def __init__(self, name: str, mode: str = SINGLEFLIGHT_MODE,
+                 lock_dir: str = SINGLEFLIGHT_LOCK_DIR,
+                 lock_timeout: float = SINGLEFLIGHT_LOCK_TIMEOUT_SECONDS):
+        if mode == 'file' and fcntl is None:
+            print(f"DEBUG: SingleFlight '{name}': file locks unavailable on this platform, using thread mode")
+            mode = 'thread'
+        if mode not in ('thread', 'file'):
+            raise ValueError(f"Unknown single-flight mode: {mode}")
+
+        self.name = name
+        self.mode = mode
+        self.lock_dir = lock_dir
+        self.lock_timeout = lock_timeout
+        self._inflight = {}  # key -> Future
+        self._tasks = {}     # key -> asyncio.Task (touched only on the event loop thread)
+        self._lock = threading.Lock()
+
+        self.executed = 0    # Calls that ran the function
+        self.coalesced = 0   # Calls that waited on another caller's execution
+        self.lock_waits = 0  # File mode: executions that waited for another worker
+        self.rechecked = 0   # ...and were then served by recheck
+
+    def do(self, key, fn, *args, recheck=None, **kwargs):
+        """
+        Run fn(*args, **kwargs) once for all concurrent callers with this key
+
+        Args:
+            key: Hashable key identifying the work
+            fn: Function to run
+            recheck: Optional callable returning a cached result (or None);
+                     used in file mode after waiting for another worker's lock
+
+        Returns:
+            fn's result, shared by every caller in the flight
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = self._execute(key, fn, args, kwargs, recheck)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def do_async(self, key, coro_fn, *args, recheck=None, **kwargs):
+        """
+        Async counterpart of do, coalescing within the event loop
+
+        Args:
+            key: Hashable key identifying the work
+            coro_fn: Coroutine function to run
+            recheck: As for do; a blocking callable, run in a thread
+
+        Returns:
+            The coroutine's result, shared by every caller in the flight
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._execute_async(key, coro_fn, args, kwargs, recheck))
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+            with self._lock:
+                self.executed += 1
+        else:
+            with self._lock:
+                self.coalesced += 1
+        # Shielded so one caller's cancellation does not cancel the others
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'in_flight': len(self._inflight) + len(self._tasks),
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'lock_waits': self.lock_waits,
+                'rechecked': self.rechecked
+            }
+
+    def _execute(self, key, fn, args, kwargs, recheck):
+        if self.mode != 'file':
+            return fn(*args, **kwargs)
+
+        with self._file_lock(key) as waited:
+            if waited and recheck is not None:
+                cached = recheck()
+                if cached is not None:
+                    with self._lock:
+                        self.rechecked += 1
+                    return cached
+            return fn(*args, **kwargs)
+
+    async def _execute_async(self, key, coro_fn, args, kwargs, recheck):
+        if self.mode != 'file':
+            return await coro_fn(*args, **kwargs)
+
+        async with self._file_lock_async(key) as waited:
+            if waited and recheck is not None:
+                cached = await asyncio.to_thread(recheck)
+                if cached is not None:
+                    with self._lock:
+                        self.rechecked += 1
+                    return cached
+            return await coro_fn(*args, **kwargs)
+
+    @contextmanager
+    def _file_lock(self, key):
+        """Hold an exclusive lock file for key; yields True if another worker held it first"""
+        fd = self._open_lock_file(key)
+        try:
+            waited = False
+            locked = False
+            deadline = time.monotonic() + self.lock_timeout
+            while True:
+                if self._try_lock(fd):
+                    locked = True
+                    break
+                if not waited:
+                    waited = True
+                    with self._lock:
+                        self.lock_waits += 1
+                if time.monotonic() >= deadline:
+                    # Holder is stuck: duplicate work beats hanging the request
+                    print(f"DEBUG: SingleFlight '{self.name}': lock wait timed out, running anyway")
+                    break
+                time.sleep(LOCK_POLL_SECONDS)
+            try:
+                yield waited
+            finally:
+                if locked:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    @asynccontextmanager
+    async def _file_lock_async(self, key):
+        """_file_lock for coroutines: waits with asyncio.sleep instead of blocking the loop"""
+        fd = await asyncio.to_thread(self._open_lock_file, key)
+        try:
+            waited = False
+            locked = False
+            deadline = time.monotonic() + self.lock_timeout
+            while True:
+                if self._try_lock(fd):
+                    locked = True
+                    break
+                if not waited:
+                    waited = True
+                    with self._lock:
+                        self.lock_waits += 1
+                if time.monotonic() >= deadline:
+                    # Holder is stuck: duplicate work beats hanging the request
+                    print(f"DEBUG: SingleFlight '{self.name}': lock wait timed out, running anyway")
+                    break
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+            try:
+                yield waited
+            finally:
+                if locked:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _open_lock_file(self, key) -> int:
+        os.makedirs(self.lock_dir, exist_ok=True)
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.open(os.path.join(self.lock_dir, f"{self.name}-{digest}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+
+    @staticmethod
+    def _try_lock(fd: int) -> bool:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
@@ -0,0 +1,122 @@
+"""
+Timestamped transcript
+
+One text buffer plus three parallel columns: segment start time, duration and
+the character offset where the segment's text begins. `text` is exactly the
+plain transcript the rest of the app uses (segments joined with spaces), so
+prompts and cache keys are unchanged, while chapters, resume points and
+citations can map any text position or time to real seconds with a bisect.
+"""
+
+from array import array
+from bisect import bisect_right
+
+
+class TimedTranscript:
+    """Transcript text with per-segment timing, stored column-wise"""
+
+    __slots__ = ('text', 'starts', 'durations', 'offsets')
+
+    def __init__(self, text: str, starts, durations, offsets):
+        if not (len(starts) == len(durations) == len(offsets)):
+            raise ValueError("Segment columns must have the same length")
+        self.text = text
+        self.starts = array('d', starts)
+        self.durations = array('d', durations)
+        self.offsets = array('q', offsets)
+
+    @classmethod
+    def from_entries(cls, entries) -> 'TimedTranscript':
+        """
+        Build from youtube_transcript_api entries ({'text', 'start', 'duration'})
+
+        Args:
+            entries: Iterable of transcript entries in time order
+
+        Returns:
+            TimedTranscript whose text matches ' '.join(entry['text'] ...)
+        """
+        parts, starts, durations, offsets = [], [], [], []
+        position = 0
+        for entry in entries:
+            if parts:
+                position += 1  # Joining space
+            parts.append(entry['text'])
+            starts.append(float(entry.get('start', 0.0)))
+            durations.append(float(entry.get('duration', 0.0)))
+            offsets.append(position)
+            position += len(entry['text'])
+        return cls(' '.join(parts), starts, durations, offsets)
+
+    @classmethod
+    def from_dict(cls, text: str, columns: dict) -> 'TimedTranscript':
+        """Rebuild from to_dict() columns and the stored text"""
+        return cls(text, columns['starts'], columns['durations'], columns['offsets'])
+
+    def to_dict(self) -> dict:
+        """Columns as JSON-friendly lists (times rounded to milliseconds)"""
+        return {
+            'starts': [round(s, 3) for s in self.starts],
+            'durations': [round(d, 3) for d in self.durations],
+            'offsets': list(self.offsets)
+        }
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def end_time(self) -> float:
+        """Seconds at which the last segment ends"""
+        if not self.starts:
+            return 0.0
+        return self.starts[-1] + self.durations[-1]
+
+    def segment(self, index: int) -> dict:
+        """Return segment `index` as {'index', 'start', 'duration', 'offset', 'text'}"""
+        return {
+            'index': index,
+            'start': self.starts[index],
+            'duration': self.durations[index],
+            'offset': self.offsets[index],
+            'text': self.segment_text(index)
+        }
+
+    def segment_text(self, index: int) -> str:
+        end = self.offsets[index + 1] - 1 if index + 1 < len(self.offsets) else len(self.text)
+        return self.text[self.offsets[index]:end]
+
+    def index_at_time(self, seconds: float) -> int:
+        """Index of the segment playing at `seconds` (the last one starting at or before it)"""
+        if not self.starts:
+            raise IndexError("Transcript has no segments")
+        return max(bisect_right(self.starts, seconds) - 1, 0)
+
+    def index_at_offset(self, offset: int) -> int:
+        """Index of the segment containing character `offset` of text"""
+        if not self.offsets:
+            raise IndexError("Transcript has no segments")
+        return max(bisect_right(self.offsets, offset) - 1, 0)
+
+    def time_at_offset(self, offset: int) -> float:
+        """Start time (seconds) of the segment containing character `offset`"""
+        return self.starts[self.index_at_offset(offset)]
+
+    def offset_at_time(self, seconds: float) -> int:
+        """Character offset where the segment playing at `seconds` begins"""
+        return self.offsets[self.index_at_time(seconds)]
+
+    def snap_time(self, seconds: float) -> float:
+        """Nearest segment start to `seconds` (e.g. for model-suggested chapter times)"""
+        index = self.index_at_time(seconds)
+        if index + 1 < len(self.starts) and self.starts[index + 1] - seconds < seconds - self.starts[index]:
+            index += 1
+        return self.starts[index]
+
+    def text_between(self, start_seconds: float, end_seconds: float) -> str:
+        """Text of the segments overlapping [start_seconds, end_seconds)"""
+        if not self.starts or end_seconds <= start_seconds:
+            return ''
+        first = self.index_at_time(start_seconds)
+        last = bisect_right(self.starts, end_seconds - 1e-9)
+        end = self.offsets[last] - 1 if last < len(self.offsets) else len(self.text)
+        return self.text[self.offsets[first]:end]
@@ -0,0 +1,204 @@
+"""
+In-process vector index (NumPy)
+
+Vectors are L2-normalized and stored as one float32 matrix, so cosine
+similarity is a single matrix-vector product. Small indexes are searched
+exhaustively; once an index has at least ivf_min_size vectors, search() builds
+an inverted-file (IVF) layout on first use: rows are clustered with a few
+k-means iterations, and a query only scores the rows of its n_probe nearest
+clusters.
+
+SparseVectorIndex does the same for sparse rows (hashed n-gram vectors), kept
+as CSR arrays so a row costs only its non-zero entries.
+"""
+
+import threading
+from collections import namedtuple
+import numpy as np
+
+# Sparse rows in compressed-sparse-row form: row i is data/indices[indptr[i]:indptr[i + 1]]
+CSRMatrix = namedtuple('CSRMatrix', ['data', 'indices', 'indptr', 'dim'])
+
+
+def normalize(vectors) -> np.ndarray:
+    """Return float32 rows scaled to unit length (zero rows stay zero)"""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class VectorIndex:
+    """Cosine-similarity top-k over a normalized float32 matrix"""
+
+    def __init__(self, dim: int, ivf_min_size: int = 4096, n_probe: int = 8):
+        self.dim = dim
+        self.ivf_min_size = ivf_min_size
+        self.n_probe = n_probe
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._payloads = []
+        self._ivf = None  # (centroids, list of row-index arrays), built lazily
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def add(self, vectors, payloads: list):
+        """
+        Append vectors with their payloads (e.g. chunk dicts)
+
+        Args:
+            vectors: (n, dim) array-like
+            payloads: n objects returned by search()
+        """
+        matrix = normalize(vectors)
+        if matrix.shape != (len(payloads), self.dim):
+            raise ValueError(f"Expected {len(payloads)} vectors of dim {self.dim}, got {matrix.shape}")
+        with self._lock:
+            self._matrix = np.vstack([self._matrix, matrix])
+            self._payloads.extend(payloads)
+            self._ivf = None
+
+    def search(self, query, k: int = 4) -> list:
+        """
+        Find the k most similar vectors
+
+        Args:
+            query: (dim,) array-like
+            k: Number of results
+
+        Returns:
+            List of (score, payload), best first
+        """
+        q = normalize(query)[0]
+        with self._lock:
+            matrix, payloads = self._matrix, self._payloads
+            if not payloads:
+                return []
+            if len(payloads) >= self.ivf_min_size:
+                if self._ivf is None:
+                    self._ivf = _build_ivf(matrix)
+                rows = _probe(self._ivf, q, self.n_probe)
+            else:
+                rows = None
+
+        if rows is None or not len(rows):
+            scores = matrix @ q
+            candidates = np.arange(len(payloads))
+        else:
+            scores = matrix[rows] @ q
+            candidates = rows
+
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), payloads[int(candidates[i])]) for i in top]
+
+
+def _build_ivf(matrix: np.ndarray, iterations: int = 8, seed: int = 0):
+    """Spherical k-means with about sqrt(n) clusters; returns (centroids, rows per cluster)"""
+    n = len(matrix)
+    n_lists = max(int(np.sqrt(n)), 1)
+    rng = np.random.default_rng(seed)
+    centroids = matrix[rng.choice(n, n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(matrix @ centroids.T, axis=1)
+        for c in range(n_lists):
+            members = matrix[assignment == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        centroids = normalize(centroids)
+    assignment = np.argmax(matrix @ centroids.T, axis=1)
+    lists = [np.flatnonzero(assignment == c) for c in range(n_lists)]
+    return centroids, lists
+
+
+def _probe(ivf, q: np.ndarray, n_probe: int) -> np.ndarray:
+    centroids, lists = ivf
+    nearest = np.argsort(-(centroids @ q))[:n_probe]
+    return np.concatenate([lists[c] for c in nearest])
+
+
+class SparseVectorIndex:
+    """
+    Cosine top-k over sparse rows, with optional query-side idf
+
+    Rows are added with the weights they should be scored with (e.g. log tf);
+    they are L2-normalized here. With query_idf, each query term is also
+    weighted by its smoothed idf (ln((1 + N) / (1 + df)) + 1) over the indexed
+    rows before normalization
+    (SMART lnc.ltc), so document vectors never depend on corpus statistics
+    and rows can be added without re-weighting the index.
+    """
+
+    def __init__(self, dim: int, query_idf: bool = True):
+        self.dim = dim
+        self.query_idf = query_idf
+        self._data = np.zeros(0, dtype=np.float32)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._rows = np.zeros(0, dtype=np.int32)  # Row of each stored entry
+        self._payloads = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def add(self, rows: CSRMatrix, payloads: list):
+        """
+        Append sparse rows with their payloads
+
+        Args:
+            rows: CSRMatrix with len(payloads) rows
+            payloads: Objects returned by search()
+        """
+        if rows.dim != self.dim or len(rows.indptr) != len(payloads) + 1:
+            raise ValueError(f"Expected {len(payloads)} rows of dim {self.dim}")
+        data = np.asarray(rows.data, dtype=np.float32)
+        lengths = np.diff(rows.indptr)
+        row_ids = np.repeat(np.arange(len(payloads), dtype=np.int32), lengths)
+        norms = np.sqrt(np.bincount(row_ids, weights=data * data, minlength=len(payloads)))
+        norms[norms == 0] = 1.0
+        with self._lock:
+            self._data = np.concatenate([self._data, data / norms[row_ids].astype(np.float32)])
+            self._indices = np.concatenate([self._indices, np.asarray(rows.indices, dtype=np.int32)])
+            self._rows = np.concatenate([self._rows, row_ids + len(self._payloads)])
+            self._payloads.extend(payloads)
+
+    def search(self, query: CSRMatrix, k: int = 4) -> list:
+        """
+        Find the k most similar rows
+
+        Args:
+            query: CSRMatrix with one row
+            k: Number of results
+
+        Returns:
+            List of (score, payload), best first
+        """
+        with self._lock:
+            data, indices, rows, payloads = self._data, self._indices, self._rows, self._payloads
+        if not payloads:
+            return []
+
+        terms = np.asarray(query.indices, dtype=np.int64)
+        weights = np.asarray(query.data, dtype=np.float32)
+        if self.query_idf and len(terms):
+            # Document frequency of just the query's terms (rows hold each term once)
+            present, df = np.unique(indices[np.isin(indices, terms)], return_counts=True)
+            df_by_term = dict(zip(present.tolist(), df.tolist()))
+            counts = np.array([df_by_term.get(term, 0) for term in terms.tolist()], dtype=np.float64)
+            idf = np.log((1 + len(payloads)) / (1 + counts)) + 1
+            weights = weights * idf.astype(np.float32)
+        norm = np.linalg.norm(weights)
+        if norm == 0:
+            return []
+
+        q = np.zeros(self.dim, dtype=np.float32)
+        q[terms] = weights / norm
+        scores = np.bincount(rows, weights=data * q[indices], minlength=len(payloads))
+        k = min(k, len(payloads))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), payloads[int(i)]) for i in top]
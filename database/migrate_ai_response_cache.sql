@@ -0,0 +1,12 @@
+-- Migration: shared cache for Gemini responses (AI_CACHE_BACKEND=supabase)
+-- Run this in your Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS ai_response_cache (
+    cache_key TEXT PRIMARY KEY, -- SHA-256 of (model, prompt, temperature, config)
+    model TEXT,
+    response TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_ai_response_cache_expires_at ON ai_response_cache(expires_at);
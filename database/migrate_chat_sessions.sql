@@ -0,0 +1,24 @@
+-- Migration: server-side chat sessions for /api/ai/chat and /api/ai/chat/stream
+-- Run this in your Supabase SQL Editor
+
+-- One row per conversation; older turns are folded into summary by the backend
+CREATE TABLE IF NOT EXISTS ai_chat_sessions (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    summary TEXT NOT NULL DEFAULT '', -- Rolling summary of the folded turns
+    summarized_turns INTEGER NOT NULL DEFAULT 0, -- How many of the oldest turns summary covers
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Turns are logged in ai_chat_history, linked to their session
+ALTER TABLE ai_chat_history ADD COLUMN IF NOT EXISTS session_id UUID REFERENCES ai_chat_sessions(id) ON DELETE CASCADE;
+
+CREATE INDEX IF NOT EXISTS idx_ai_chat_sessions_user_id ON ai_chat_sessions(user_id);
+CREATE INDEX IF NOT EXISTS idx_ai_chat_history_session ON ai_chat_history(session_id, created_at);
+
+-- Enable RLS
+ALTER TABLE ai_chat_sessions ENABLE ROW LEVEL SECURITY;
+
+-- Add policies (writes go through the backend service key)
+CREATE POLICY "Users can view own chat sessions" ON ai_chat_sessions FOR SELECT USING (auth.uid() = user_id);
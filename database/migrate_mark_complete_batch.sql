@@ -0,0 +1,140 @@
+-- Migration: bulk mark-complete (/api/progress/mark-complete/batch)
+-- Run this in your Supabase SQL Editor (after migrate_mark_complete_rpc.sql)
+
+-- Mark several videos in one transaction: one bulk upsert into video_progress,
+-- one insert into consistency_logs, one stats update.
+-- p_items: [{"video_id", "playlist_id", "video_title", "duration_seconds", "completed"}, ...]
+-- with no video_id repeated (the backend keeps the last entry per video).
+CREATE OR REPLACE FUNCTION mark_videos_complete(
+    p_user_id UUID,
+    p_items JSONB,
+    p_activity_date DATE
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_stats user_stats%ROWTYPE;
+    v_has_stats BOOLEAN;
+    v_results JSONB;
+    v_completed_delta INTEGER;
+    v_logged INTEGER;
+BEGIN
+    -- Lock the user's stats row first so concurrent completions for the same user serialize
+    SELECT * INTO v_stats FROM user_stats WHERE user_id = p_user_id FOR UPDATE;
+    v_has_stats := FOUND;
+
+    -- All CTEs see the table state from before this statement, so prior holds the old flags
+    WITH items AS (
+        SELECT video_id, playlist_id,
+               COALESCE(video_title, 'Untitled Video') AS video_title,
+               COALESCE(duration_seconds, 0) AS duration_seconds,
+               COALESCE(completed, TRUE) AS completed
+        FROM jsonb_to_recordset(p_items) AS i(video_id TEXT, playlist_id UUID, video_title TEXT,
+                                              duration_seconds INTEGER, completed BOOLEAN)
+    ),
+    prior AS (
+        SELECT youtube_video_id, completed
+        FROM video_progress
+        WHERE user_id = p_user_id AND youtube_video_id IN (SELECT video_id FROM items)
+        FOR UPDATE
+    ),
+    upserted AS (
+        INSERT INTO video_progress (user_id, youtube_video_id, playlist_id, video_title, duration_seconds,
+                                    completed, current_position, last_watched)
+        SELECT p_user_id, video_id, playlist_id, video_title, duration_seconds,
+               completed, CASE WHEN completed THEN duration_seconds ELSE 0 END, NOW()
+        FROM items
+        ON CONFLICT (user_id, youtube_video_id) DO UPDATE SET
+            playlist_id = EXCLUDED.playlist_id,
+            video_title = EXCLUDED.video_title,
+            duration_seconds = EXCLUDED.duration_seconds,
+            completed = EXCLUDED.completed,
+            current_position = EXCLUDED.current_position,
+            last_watched = EXCLUDED.last_watched
+        RETURNING youtube_video_id
+    ),
+    logged AS (
+        INSERT INTO consistency_logs (user_id, activity_type, video_id, playlist_id, date, duration_minutes)
+        SELECT p_user_id, 'video_completed', video_id, playlist_id, p_activity_date, duration_seconds / 60
+        FROM items
+        WHERE completed
+        ON CONFLICT (user_id, video_id, date) DO NOTHING
+        RETURNING video_id
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+        'video_id', items.video_id,
+        'completed', items.completed,
+        'was_completed', COALESCE(prior.completed, FALSE),
+        'logged', logged.video_id IS NOT NULL
+    )), '[]'::JSONB)
+    INTO v_results
+    FROM items
+    LEFT JOIN prior ON prior.youtube_video_id = items.video_id
+    LEFT JOIN logged ON logged.video_id = items.video_id;
+
+    SELECT COALESCE(SUM((r->>'completed')::BOOLEAN::INT - (r->>'was_completed')::BOOLEAN::INT), 0),
+           COUNT(*) FILTER (WHERE (r->>'logged')::BOOLEAN)
+    INTO v_completed_delta, v_logged
+    FROM jsonb_array_elements(v_results) AS r;
+
+    -- Same rules as stats_service.apply_activity; a missing row is rebuilt by the backend
+    IF v_has_stats THEN
+        IF v_logged > 0 THEN
+            IF v_stats.last_active_date IS NULL OR p_activity_date > v_stats.last_active_date + 1 THEN
+                v_stats.current_streak := 1;
+            ELSIF p_activity_date = v_stats.last_active_date + 1 THEN
+                v_stats.current_streak := v_stats.current_streak + 1;
+            END IF;
+            IF v_stats.last_active_date IS NULL OR p_activity_date > v_stats.last_active_date THEN
+                v_stats.last_active_date := p_activity_date;
+            END IF;
+            v_stats.longest_streak := GREATEST(v_stats.longest_streak, v_stats.current_streak);
+            v_stats.total_sessions := v_stats.total_sessions + v_logged;
+        END IF;
+
+        v_stats.completed_videos := GREATEST(0, v_stats.completed_videos + v_completed_delta);
+        v_stats.xp := v_stats.completed_videos * 100;
+        v_stats.updated_at := NOW();
+
+        UPDATE user_stats SET
+            current_streak = v_stats.current_streak,
+            longest_streak = v_stats.longest_streak,
+            last_active_date = v_stats.last_active_date,
+            completed_videos = v_stats.completed_videos,
+            total_sessions = v_stats.total_sessions,
+            xp = v_stats.xp,
+            updated_at = v_stats.updated_at
+        WHERE user_id = p_user_id;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'results', v_results,
+        'stats', CASE WHEN v_has_stats THEN to_jsonb(v_stats) END
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- The single-video function becomes a one-item batch
+CREATE OR REPLACE FUNCTION mark_video_complete(
+    p_user_id UUID,
+    p_video_id TEXT,
+    p_playlist_id UUID,
+    p_video_title TEXT,
+    p_duration_seconds INTEGER,
+    p_completed BOOLEAN,
+    p_activity_date DATE
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_batch JSONB;
+BEGIN
+    v_batch := mark_videos_complete(p_user_id, jsonb_build_array(jsonb_build_object(
+        'video_id', p_video_id,
+        'playlist_id', p_playlist_id,
+        'video_title', p_video_title,
+        'duration_seconds', p_duration_seconds,
+        'completed', p_completed
+    )), p_activity_date);
+
+    RETURN (v_batch->'results'->0) || jsonb_build_object('stats', v_batch->'stats');
+END;
+$$ LANGUAGE plpgsql;
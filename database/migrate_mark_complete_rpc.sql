@@ -0,0 +1,120 @@
+-- Migration: single-round-trip mark-complete (/api/progress/mark-complete)
+-- Run this in your Supabase SQL Editor
+
+-- 1. Remove duplicate completion logs left by concurrent requests (keep the earliest)
+CREATE TEMP TABLE affected_users AS
+SELECT DISTINCT user_id
+FROM (
+    SELECT user_id,
+           ROW_NUMBER() OVER (PARTITION BY user_id, video_id, date ORDER BY created_at, id) AS rn
+    FROM consistency_logs
+    WHERE video_id IS NOT NULL
+) d
+WHERE rn > 1;
+
+DELETE FROM consistency_logs
+WHERE id IN (
+    SELECT id FROM (
+        SELECT id,
+               ROW_NUMBER() OVER (PARTITION BY user_id, video_id, date ORDER BY created_at, id) AS rn
+        FROM consistency_logs
+        WHERE video_id IS NOT NULL
+    ) d
+    WHERE rn > 1
+);
+
+-- Their maintained stats counted the duplicates; drop them so they are rebuilt on the next /stats call
+DELETE FROM user_stats WHERE user_id IN (SELECT user_id FROM affected_users);
+DROP TABLE affected_users;
+
+-- 2. One completion log per (user, video, day); study sessions (video_id NULL) are unaffected
+ALTER TABLE consistency_logs
+    ADD CONSTRAINT consistency_logs_user_video_date_key UNIQUE (user_id, video_id, date);
+
+-- 3. The whole completion as one transaction
+CREATE OR REPLACE FUNCTION mark_video_complete(
+    p_user_id UUID,
+    p_video_id TEXT,
+    p_playlist_id UUID,
+    p_video_title TEXT,
+    p_duration_seconds INTEGER,
+    p_completed BOOLEAN,
+    p_activity_date DATE
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_stats user_stats%ROWTYPE;
+    v_has_stats BOOLEAN;
+    v_was_completed BOOLEAN;
+    v_logged BOOLEAN := FALSE;
+    v_rows INTEGER;
+BEGIN
+    -- Lock the user's stats row first so concurrent completions for the same user serialize
+    SELECT * INTO v_stats FROM user_stats WHERE user_id = p_user_id FOR UPDATE;
+    v_has_stats := FOUND;
+
+    SELECT completed INTO v_was_completed
+    FROM video_progress
+    WHERE user_id = p_user_id AND youtube_video_id = p_video_id
+    FOR UPDATE;
+    v_was_completed := COALESCE(v_was_completed, FALSE);
+
+    INSERT INTO video_progress (user_id, youtube_video_id, playlist_id, video_title, duration_seconds,
+                                completed, current_position, last_watched)
+    VALUES (p_user_id, p_video_id, p_playlist_id, p_video_title, p_duration_seconds,
+            p_completed, CASE WHEN p_completed THEN p_duration_seconds ELSE 0 END, NOW())
+    ON CONFLICT (user_id, youtube_video_id) DO UPDATE SET
+        playlist_id = EXCLUDED.playlist_id,
+        video_title = EXCLUDED.video_title,
+        duration_seconds = EXCLUDED.duration_seconds,
+        completed = EXCLUDED.completed,
+        current_position = EXCLUDED.current_position,
+        last_watched = EXCLUDED.last_watched;
+
+    IF p_completed THEN
+        INSERT INTO consistency_logs (user_id, activity_type, video_id, playlist_id, date, duration_minutes)
+        VALUES (p_user_id, 'video_completed', p_video_id, p_playlist_id, p_activity_date,
+                COALESCE(p_duration_seconds, 0) / 60)
+        ON CONFLICT (user_id, video_id, date) DO NOTHING;
+        GET DIAGNOSTICS v_rows = ROW_COUNT;
+        v_logged := v_rows > 0;
+    END IF;
+
+    -- Same rules as stats_service.apply_activity; a missing row is rebuilt by the backend
+    IF v_has_stats THEN
+        IF v_logged THEN
+            IF v_stats.last_active_date IS NULL OR p_activity_date > v_stats.last_active_date + 1 THEN
+                v_stats.current_streak := 1;
+            ELSIF p_activity_date = v_stats.last_active_date + 1 THEN
+                v_stats.current_streak := v_stats.current_streak + 1;
+            END IF;
+            IF v_stats.last_active_date IS NULL OR p_activity_date > v_stats.last_active_date THEN
+                v_stats.last_active_date := p_activity_date;
+            END IF;
+            v_stats.longest_streak := GREATEST(v_stats.longest_streak, v_stats.current_streak);
+            v_stats.total_sessions := v_stats.total_sessions + 1;
+        END IF;
+
+        v_stats.completed_videos := GREATEST(0, v_stats.completed_videos + p_completed::INT - v_was_completed::INT);
+        v_stats.xp := v_stats.completed_videos * 100;
+        v_stats.updated_at := NOW();
+
+        UPDATE user_stats SET
+            current_streak = v_stats.current_streak,
+            longest_streak = v_stats.longest_streak,
+            last_active_date = v_stats.last_active_date,
+            completed_videos = v_stats.completed_videos,
+            total_sessions = v_stats.total_sessions,
+            xp = v_stats.xp,
+            updated_at = v_stats.updated_at
+        WHERE user_id = p_user_id;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'completed', p_completed,
+        'was_completed', v_was_completed,
+        'logged', v_logged,
+        'stats', CASE WHEN v_has_stats THEN to_jsonb(v_stats) END
+    );
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,10 @@
+-- Migration: playlist snapshot cache used by /api/progress/course/<goal_id>
+-- Run this in your Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS playlist_snapshots (
+    youtube_playlist_id TEXT PRIMARY KEY,
+    videos JSONB NOT NULL, -- Items from fetch_playlist_items with duration fields
+    etag TEXT, -- ETag of the first playlistItems page
+    fetched_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(), -- Last full fetch
+    validated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() -- Last successful revalidation
+);
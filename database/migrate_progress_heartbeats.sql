@@ -0,0 +1,56 @@
+-- Migration: bulk heartbeat flush for /api/progress/save-timestamp
+-- Run this in your Supabase SQL Editor
+
+-- Flush buffered position heartbeats (backend progress_writer). Existing rows are
+-- updated in place: position, last_watched and whichever optional columns the
+-- heartbeat carries. A missing row is created only when the heartbeat has every
+-- column video_progress requires (playlist_id, video_title, duration_seconds);
+-- the rest are returned as skipped instead of failing the whole batch.
+-- p_rows: [{"user_id", "youtube_video_id", "current_position", "last_watched",
+--           "duration_seconds", "playlist_id", "video_title"}, ...] (optional ones may be null),
+-- with no (user_id, youtube_video_id) repeated.
+CREATE OR REPLACE FUNCTION save_progress_heartbeats(p_rows JSONB)
+RETURNS JSONB AS $$
+DECLARE
+    v_updated INTEGER;
+    v_inserted INTEGER;
+    v_skipped JSONB;
+BEGIN
+    UPDATE video_progress vp SET
+        current_position = r.current_position,
+        last_watched = r.last_watched,
+        duration_seconds = COALESCE(r.duration_seconds, vp.duration_seconds),
+        playlist_id = COALESCE(r.playlist_id, vp.playlist_id),
+        video_title = COALESCE(r.video_title, vp.video_title)
+    FROM jsonb_to_recordset(p_rows) AS r(user_id UUID, youtube_video_id TEXT, current_position INTEGER,
+                                         last_watched TIMESTAMP WITH TIME ZONE, duration_seconds INTEGER,
+                                         playlist_id UUID, video_title TEXT)
+    WHERE vp.user_id = r.user_id AND vp.youtube_video_id = r.youtube_video_id;
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+
+    -- ON CONFLICT covers a row created concurrently since the UPDATE
+    INSERT INTO video_progress (user_id, youtube_video_id, playlist_id, video_title, duration_seconds,
+                                current_position, last_watched)
+    SELECT r.user_id, r.youtube_video_id, r.playlist_id, r.video_title, r.duration_seconds,
+           r.current_position, r.last_watched
+    FROM jsonb_to_recordset(p_rows) AS r(user_id UUID, youtube_video_id TEXT, current_position INTEGER,
+                                         last_watched TIMESTAMP WITH TIME ZONE, duration_seconds INTEGER,
+                                         playlist_id UUID, video_title TEXT)
+    WHERE r.playlist_id IS NOT NULL AND r.video_title IS NOT NULL AND r.duration_seconds IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM video_progress vp
+                      WHERE vp.user_id = r.user_id AND vp.youtube_video_id = r.youtube_video_id)
+    ON CONFLICT (user_id, youtube_video_id) DO UPDATE SET
+        current_position = EXCLUDED.current_position,
+        last_watched = EXCLUDED.last_watched;
+    GET DIAGNOSTICS v_inserted = ROW_COUNT;
+
+    SELECT COALESCE(jsonb_agg(jsonb_build_object('user_id', r.user_id, 'youtube_video_id', r.youtube_video_id)),
+                    '[]'::JSONB)
+    INTO v_skipped
+    FROM jsonb_to_recordset(p_rows) AS r(user_id UUID, youtube_video_id TEXT)
+    WHERE NOT EXISTS (SELECT 1 FROM video_progress vp
+                      WHERE vp.user_id = r.user_id AND vp.youtube_video_id = r.youtube_video_id);
+
+    RETURN jsonb_build_object('updated', v_updated, 'inserted', v_inserted, 'skipped', v_skipped);
+END;
+$$ LANGUAGE plpgsql;
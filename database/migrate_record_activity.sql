@@ -0,0 +1,52 @@
+-- Migration: atomic stats update for /api/progress/log-session
+-- Run this in your Supabase SQL Editor (after migrate_user_stats.sql)
+
+-- Fold one log-session / activity into the user's stats under the row lock that
+-- mark_videos_complete takes, so concurrent updates never overwrite each other.
+-- Same rules as stats_service.apply_activity. Returns the updated row, or NULL
+-- if the user has no stats row yet (the backend rebuilds it from the source tables).
+CREATE OR REPLACE FUNCTION record_activity(
+    p_user_id UUID,
+    p_activity_date DATE,
+    p_completed_delta INTEGER,
+    p_sessions_delta INTEGER
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_stats user_stats%ROWTYPE;
+BEGIN
+    SELECT * INTO v_stats FROM user_stats WHERE user_id = p_user_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    IF p_sessions_delta > 0 THEN
+        IF v_stats.last_active_date IS NULL OR p_activity_date > v_stats.last_active_date + 1 THEN
+            v_stats.current_streak := 1;
+        ELSIF p_activity_date = v_stats.last_active_date + 1 THEN
+            v_stats.current_streak := v_stats.current_streak + 1;
+        END IF;
+        IF v_stats.last_active_date IS NULL OR p_activity_date > v_stats.last_active_date THEN
+            v_stats.last_active_date := p_activity_date;
+        END IF;
+        v_stats.longest_streak := GREATEST(v_stats.longest_streak, v_stats.current_streak);
+    END IF;
+
+    v_stats.completed_videos := GREATEST(0, v_stats.completed_videos + p_completed_delta);
+    v_stats.total_sessions := v_stats.total_sessions + p_sessions_delta;
+    v_stats.xp := v_stats.completed_videos * 100;
+    v_stats.updated_at := NOW();
+
+    UPDATE user_stats SET
+        current_streak = v_stats.current_streak,
+        longest_streak = v_stats.longest_streak,
+        last_active_date = v_stats.last_active_date,
+        completed_videos = v_stats.completed_videos,
+        total_sessions = v_stats.total_sessions,
+        xp = v_stats.xp,
+        updated_at = v_stats.updated_at
+    WHERE user_id = p_user_id;
+
+    RETURN to_jsonb(v_stats);
+END;
+$$ LANGUAGE plpgsql;
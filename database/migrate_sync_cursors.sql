@@ -0,0 +1,42 @@
+-- Migration: change tracking for delta sync (/api/progress/sync-progress)
+-- Run this in your Supabase SQL Editor
+
+-- Shared trigger function: bump updated_at on every UPDATE.
+-- clock_timestamp() is the time of the write itself; NOW() is the transaction
+-- start, which can be well before the row becomes visible to a sync. The sync
+-- endpoint only serves rows older than SYNC_SAFETY_LAG_SECONDS, so a row is
+-- never stamped below a cursor that was handed out before it committed.
+-- (Re-running this migration updates existing installs.)
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- video_progress
+ALTER TABLE video_progress ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
+UPDATE video_progress SET updated_at = COALESCE(last_watched, NOW()) WHERE updated_at IS NULL;
+ALTER TABLE video_progress ALTER COLUMN updated_at SET DEFAULT clock_timestamp();
+ALTER TABLE video_progress ALTER COLUMN updated_at SET NOT NULL;
+
+DROP TRIGGER IF EXISTS trg_video_progress_updated_at ON video_progress;
+CREATE TRIGGER trg_video_progress_updated_at
+    BEFORE UPDATE ON video_progress
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+-- consistency_logs
+ALTER TABLE consistency_logs ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
+UPDATE consistency_logs SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+ALTER TABLE consistency_logs ALTER COLUMN updated_at SET DEFAULT clock_timestamp();
+ALTER TABLE consistency_logs ALTER COLUMN updated_at SET NOT NULL;
+
+DROP TRIGGER IF EXISTS trg_consistency_logs_updated_at ON consistency_logs;
+CREATE TRIGGER trg_consistency_logs_updated_at
+    BEFORE UPDATE ON consistency_logs
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+-- Keyset pagination on (updated_at, id) per user
+CREATE INDEX IF NOT EXISTS idx_video_progress_user_updated ON video_progress(user_id, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_consistency_logs_user_updated ON consistency_logs(user_id, updated_at, id);
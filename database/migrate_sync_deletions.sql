@@ -0,0 +1,40 @@
+-- Migration: tombstones for delta sync (/api/progress/sync-progress)
+-- Run this in your Supabase SQL Editor after migrate_sync_cursors.sql
+
+-- One row per deleted video_progress / consistency_logs row, so clients that
+-- synced the row learn it is gone. Deletes through ON DELETE CASCADE (e.g. a
+-- playlist's progress rows) fire the trigger too. No foreign key on user_id:
+-- deleting a user cascades into the tracked tables while the user row goes away.
+CREATE TABLE IF NOT EXISTS sync_deletions (
+    id BIGSERIAL PRIMARY KEY,
+    user_id UUID NOT NULL,
+    table_name TEXT NOT NULL, -- 'video_progress' | 'consistency_logs'
+    row_id UUID NOT NULL,
+    deleted_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT clock_timestamp() -- Delta sync cursor
+);
+
+-- Keyset pagination on (deleted_at, id) per user
+CREATE INDEX IF NOT EXISTS idx_sync_deletions_user_deleted ON sync_deletions(user_id, deleted_at, id);
+
+CREATE OR REPLACE FUNCTION record_sync_deletion()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO sync_deletions (user_id, table_name, row_id)
+    VALUES (OLD.user_id, TG_TABLE_NAME, OLD.id);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER; -- Users delete their own logs under RLS
+
+DROP TRIGGER IF EXISTS trg_video_progress_deleted ON video_progress;
+CREATE TRIGGER trg_video_progress_deleted
+    AFTER DELETE ON video_progress
+    FOR EACH ROW EXECUTE FUNCTION record_sync_deletion();
+
+DROP TRIGGER IF EXISTS trg_consistency_logs_deleted ON consistency_logs;
+CREATE TRIGGER trg_consistency_logs_deleted
+    AFTER DELETE ON consistency_logs
+    FOR EACH ROW EXECUTE FUNCTION record_sync_deletion();
+
+-- Enable RLS (rows are written by the trigger, read through the backend)
+ALTER TABLE sync_deletions ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Users can view own sync deletions" ON sync_deletions FOR SELECT USING (auth.uid() = user_id);
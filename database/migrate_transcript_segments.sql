@@ -0,0 +1,6 @@
+-- Migration: keep transcript segment timings next to the cached text
+-- Run this in your Supabase SQL Editor
+
+-- Columns of the timed transcript: {"starts": [...], "durations": [...], "offsets": [...]}
+-- offsets index into transcript_text. NULL for rows cached before timings were kept.
+ALTER TABLE video_transcripts ADD COLUMN IF NOT EXISTS segments JSONB;
@@ -0,0 +1,21 @@
+-- Migration: maintained per-user stats for /api/progress/stats
+-- Run this in your Supabase SQL Editor
+-- Existing users get their row built from consistency_logs on their first /stats call
+-- (or explicitly via POST /api/progress/stats/rebuild)
+
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id UUID PRIMARY KEY REFERENCES auth.users(id) ON DELETE CASCADE,
+    current_streak INTEGER NOT NULL DEFAULT 0, -- Consecutive active days ending on last_active_date
+    longest_streak INTEGER NOT NULL DEFAULT 0,
+    last_active_date DATE,
+    completed_videos INTEGER NOT NULL DEFAULT 0,
+    total_sessions INTEGER NOT NULL DEFAULT 0, -- Number of consistency_logs rows
+    xp INTEGER NOT NULL DEFAULT 0, -- 100 per completed video
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Enable RLS
+ALTER TABLE user_stats ENABLE ROW LEVEL SECURITY;
+
+-- Add policies (writes go through the backend service key)
+CREATE POLICY "Users can view own stats" ON user_stats FOR SELECT USING (auth.uid() = user_id);
@@ -0,0 +1,23 @@
+-- Migration: transcript chunk search for the chat assistant (VECTOR_BACKEND=pgvector)
+-- Run this in your Supabase SQL Editor
+
+-- Top-k chunks of one video by cosine similarity.
+-- A video has at most a few hundred chunks, so they are scored exactly: the
+-- MATERIALIZED filter keeps the planner off the table-wide ivfflat index, whose
+-- probed lists would rarely contain the requested video's rows.
+CREATE OR REPLACE FUNCTION match_video_chunks(
+    query_embedding vector(768),
+    p_video_id TEXT,
+    match_count INTEGER DEFAULT 4
+)
+RETURNS TABLE (chunk_index INTEGER, chunk_text TEXT, metadata JSONB, similarity FLOAT) AS $$
+    WITH video_chunks AS MATERIALIZED (
+        SELECT e.chunk_index, e.chunk_text, e.metadata, e.embedding
+        FROM video_embeddings e
+        WHERE e.video_id = p_video_id
+    )
+    SELECT c.chunk_index, c.chunk_text, c.metadata, 1 - (c.embedding <=> query_embedding) AS similarity
+    FROM video_chunks c
+    ORDER BY c.embedding <=> query_embedding
+    LIMIT match_count;
+$$ LANGUAGE sql STABLE;
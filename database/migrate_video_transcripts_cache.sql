@@ -0,0 +1,13 @@
+-- Migration: turn video_transcripts into the durable tier of the transcript cache
+-- Run this in your Supabase SQL Editor
+
+-- Cache key is (video, requested language)
+ALTER TABLE video_transcripts DROP CONSTRAINT IF EXISTS video_transcripts_youtube_video_id_key;
+ALTER TABLE video_transcripts ALTER COLUMN language SET NOT NULL;
+ALTER TABLE video_transcripts ADD CONSTRAINT video_transcripts_youtube_video_id_language_key UNIQUE (youtube_video_id, language);
+
+-- Language actually served after fallback (e.g. 'en' requested, 'en-GB' found)
+ALTER TABLE video_transcripts ADD COLUMN IF NOT EXISTS transcript_language TEXT;
+
+-- Negative cache entries: captions disabled or not found
+ALTER TABLE video_transcripts ADD COLUMN IF NOT EXISTS available BOOLEAN NOT NULL DEFAULT TRUE;
@@ -39,6 +39,7 @@ CREATE TABLE video_progress (
     current_position INTEGER DEFAULT 0,
     completed BOOLEAN DEFAULT FALSE,
     last_watched TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT clock_timestamp(), -- Bumped by trigger; delta sync cursor
     UNIQUE(user_id, youtube_video_id)
 );
 
@@ -52,17 +53,54 @@ CREATE TABLE consistency_logs (
     date DATE NOT NULL, -- The date of activity (YYYY-MM-DD)
     duration_minutes INTEGER DEFAULT 0,
     notes TEXT,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT clock_timestamp(), -- Bumped by trigger; delta sync cursor
+    UNIQUE(user_id, video_id, date) -- One completion log per video per day (NULL video_id = study session)
+);
+
+-- Delta sync tombstones: one row per deleted video_progress / consistency_logs row
+-- (filled by trigger; no FK on user_id so deleting a user can cascade)
+CREATE TABLE sync_deletions (
+    id BIGSERIAL PRIMARY KEY,
+    user_id UUID NOT NULL,
+    table_name TEXT NOT NULL, -- 'video_progress' | 'consistency_logs'
+    row_id UUID NOT NULL,
+    deleted_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT clock_timestamp() -- Delta sync cursor
+);
+
+-- Maintained gamification stats (updated incrementally, rebuilt from consistency_logs on demand)
+CREATE TABLE user_stats (
+    user_id UUID PRIMARY KEY REFERENCES auth.users(id) ON DELETE CASCADE,
+    current_streak INTEGER NOT NULL DEFAULT 0, -- Consecutive active days ending on last_active_date
+    longest_streak INTEGER NOT NULL DEFAULT 0,
+    last_active_date DATE,
+    completed_videos INTEGER NOT NULL DEFAULT 0,
+    total_sessions INTEGER NOT NULL DEFAULT 0, -- Number of consistency_logs rows
+    xp INTEGER NOT NULL DEFAULT 0, -- 100 per completed video
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
 -- AI Cache: Video transcripts
 CREATE TABLE video_transcripts (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    youtube_video_id TEXT UNIQUE NOT NULL,
-    transcript_text TEXT NOT NULL,
-    language TEXT DEFAULT 'en',
+    youtube_video_id TEXT NOT NULL,
+    transcript_text TEXT NOT NULL, -- Empty when available = FALSE
+    segments JSONB, -- Timed transcript columns (starts, durations, text offsets); NULL on older rows
+    language TEXT NOT NULL DEFAULT 'en', -- Requested language (cache key)
+    transcript_language TEXT, -- Language actually served after fallback
     auto_generated BOOLEAN DEFAULT TRUE,
-    fetched_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    available BOOLEAN NOT NULL DEFAULT TRUE, -- FALSE = negative cache entry (captions disabled / not found)
+    fetched_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    UNIQUE(youtube_video_id, language)
+);
+
+-- Cache: YouTube playlist items + durations, revalidated with ETags
+CREATE TABLE playlist_snapshots (
+    youtube_playlist_id TEXT PRIMARY KEY,
+    videos JSONB NOT NULL, -- Items from fetch_playlist_items with duration fields
+    etag TEXT, -- ETag of the first playlistItems page
+    fetched_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(), -- Last full fetch
+    validated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() -- Last successful revalidation
 );
 
 -- AI Cache: Course insights
@@ -78,6 +116,15 @@ CREATE TABLE ai_course_insights (
     UNIQUE(playlist_id)
 );
 
+-- AI Cache: Raw Gemini responses keyed by SHA-256 of (model, prompt, temperature, config)
+CREATE TABLE ai_response_cache (
+    cache_key TEXT PRIMARY KEY,
+    model TEXT,
+    response TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
 -- AI Cache: Quiz questions
 CREATE TABLE ai_quiz_questions (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -91,10 +138,21 @@ CREATE TABLE ai_quiz_questions (
     generated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- AI Chat sessions (rolling summary of older turns)
+CREATE TABLE ai_chat_sessions (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    summary TEXT NOT NULL DEFAULT '', -- Rolling summary of the folded turns
+    summarized_turns INTEGER NOT NULL DEFAULT 0, -- How many of the oldest turns summary covers
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- AI Chat history
 CREATE TABLE ai_chat_history (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+    session_id UUID REFERENCES ai_chat_sessions(id) ON DELETE CASCADE,
     playlist_id UUID REFERENCES playlists(id) ON DELETE SET NULL,
     user_message TEXT NOT NULL,
     ai_response TEXT NOT NULL,
@@ -134,18 +192,327 @@ CREATE INDEX idx_goals_user_id ON goals(user_id);
 CREATE INDEX idx_video_progress_user_id ON video_progress(user_id);
 CREATE INDEX idx_consistency_logs_user_id ON consistency_logs(user_id);
 CREATE INDEX idx_consistency_logs_user_date ON consistency_logs(user_id, date);
+CREATE INDEX idx_video_progress_user_updated ON video_progress(user_id, updated_at, id);
+CREATE INDEX idx_consistency_logs_user_updated ON consistency_logs(user_id, updated_at, id);
+CREATE INDEX idx_sync_deletions_user_deleted ON sync_deletions(user_id, deleted_at, id);
 CREATE INDEX idx_ai_chat_history_user_id ON ai_chat_history(user_id);
+CREATE INDEX idx_ai_chat_history_session ON ai_chat_history(session_id, created_at);
+CREATE INDEX idx_ai_chat_sessions_user_id ON ai_chat_sessions(user_id);
+CREATE INDEX idx_ai_response_cache_expires_at ON ai_response_cache(expires_at);
 
 -- Vector similarity search index
 CREATE INDEX ON video_embeddings USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
 
+-- Keep updated_at current for delta sync. clock_timestamp() (the time of the
+-- write, not of the transaction start) plus the sync endpoint's safety lag keep
+-- rows from committing below a cursor already handed out.
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_video_progress_updated_at
+    BEFORE UPDATE ON video_progress
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+CREATE TRIGGER trg_consistency_logs_updated_at
+    BEFORE UPDATE ON consistency_logs
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+-- Record deletes (including cascades) as tombstones for delta sync
+CREATE OR REPLACE FUNCTION record_sync_deletion()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO sync_deletions (user_id, table_name, row_id)
+    VALUES (OLD.user_id, TG_TABLE_NAME, OLD.id);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER; -- Users delete their own logs under RLS
+
+CREATE TRIGGER trg_video_progress_deleted
+    AFTER DELETE ON video_progress
+    FOR EACH ROW EXECUTE FUNCTION record_sync_deletion();
+
+CREATE TRIGGER trg_consistency_logs_deleted
+    AFTER DELETE ON consistency_logs
+    FOR EACH ROW EXECUTE FUNCTION record_sync_deletion();
+
+-- Mark several videos in one transaction: one bulk upsert into video_progress,
+-- one insert into consistency_logs, one stats update.
+-- p_items: [{"video_id", "playlist_id", "video_title", "duration_seconds", "completed"}, ...]
+-- with no video_id repeated (the backend keeps the last entry per video).
+CREATE OR REPLACE FUNCTION mark_videos_complete(
+    p_user_id UUID,
+    p_items JSONB,
+    p_activity_date DATE
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_stats user_stats%ROWTYPE;
+    v_has_stats BOOLEAN;
+    v_results JSONB;
+    v_completed_delta INTEGER;
+    v_logged INTEGER;
+BEGIN
+    -- Lock the user's stats row first so concurrent completions for the same user serialize
+    SELECT * INTO v_stats FROM user_stats WHERE user_id = p_user_id FOR UPDATE;
+    v_has_stats := FOUND;
+
+    -- All CTEs see the table state from before this statement, so prior holds the old flags
+    WITH items AS (
+        SELECT video_id, playlist_id,
+               COALESCE(video_title, 'Untitled Video') AS video_title,
+               COALESCE(duration_seconds, 0) AS duration_seconds,
+               COALESCE(completed, TRUE) AS completed
+        FROM jsonb_to_recordset(p_items) AS i(video_id TEXT, playlist_id UUID, video_title TEXT,
+                                              duration_seconds INTEGER, completed BOOLEAN)
+    ),
+    prior AS (
+        SELECT youtube_video_id, completed
+        FROM video_progress
+        WHERE user_id = p_user_id AND youtube_video_id IN (SELECT video_id FROM items)
+        FOR UPDATE
+    ),
+    upserted AS (
+        INSERT INTO video_progress (user_id, youtube_video_id, playlist_id, video_title, duration_seconds,
+                                    completed, current_position, last_watched)
+        SELECT p_user_id, video_id, playlist_id, video_title, duration_seconds,
+               completed, CASE WHEN completed THEN duration_seconds ELSE 0 END, NOW()
+        FROM items
+        ON CONFLICT (user_id, youtube_video_id) DO UPDATE SET
+            playlist_id = EXCLUDED.playlist_id,
+            video_title = EXCLUDED.video_title,
+            duration_seconds = EXCLUDED.duration_seconds,
+            completed = EXCLUDED.completed,
+            current_position = EXCLUDED.current_position,
+            last_watched = EXCLUDED.last_watched
+        RETURNING youtube_video_id
+    ),
+    logged AS (
+        INSERT INTO consistency_logs (user_id, activity_type, video_id, playlist_id, date, duration_minutes)
+        SELECT p_user_id, 'video_completed', video_id, playlist_id, p_activity_date, duration_seconds / 60
+        FROM items
+        WHERE completed
+        ON CONFLICT (user_id, video_id, date) DO NOTHING
+        RETURNING video_id
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+        'video_id', items.video_id,
+        'completed', items.completed,
+        'was_completed', COALESCE(prior.completed, FALSE),
+        'logged', logged.video_id IS NOT NULL
+    )), '[]'::JSONB)
+    INTO v_results
+    FROM items
+    LEFT JOIN prior ON prior.youtube_video_id = items.video_id
+    LEFT JOIN logged ON logged.video_id = items.video_id;
+
+    SELECT COALESCE(SUM((r->>'completed')::BOOLEAN::INT - (r->>'was_completed')::BOOLEAN::INT), 0),
+           COUNT(*) FILTER (WHERE (r->>'logged')::BOOLEAN)
+    INTO v_completed_delta, v_logged
+    FROM jsonb_array_elements(v_results) AS r;
+
+    -- Same rules as stats_service.apply_activity; a missing row is rebuilt by the backend
+    IF v_has_stats THEN
+        IF v_logged > 0 THEN
+            IF v_stats.last_active_date IS NULL OR p_activity_date > v_stats.last_active_date + 1 THEN
+                v_stats.current_streak := 1;
+            ELSIF p_activity_date = v_stats.last_active_date + 1 THEN
+                v_stats.current_streak := v_stats.current_streak + 1;
+            END IF;
+            IF v_stats.last_active_date IS NULL OR p_activity_date > v_stats.last_active_date THEN
+                v_stats.last_active_date := p_activity_date;
+            END IF;
+            v_stats.longest_streak := GREATEST(v_stats.longest_streak, v_stats.current_streak);
+            v_stats.total_sessions := v_stats.total_sessions + v_logged;
+        END IF;
+
+        v_stats.completed_videos := GREATEST(0, v_stats.completed_videos + v_completed_delta);
+        v_stats.xp := v_stats.completed_videos * 100;
+        v_stats.updated_at := NOW();
+
+        UPDATE user_stats SET
+            current_streak = v_stats.current_streak,
+            longest_streak = v_stats.longest_streak,
+            last_active_date = v_stats.last_active_date,
+            completed_videos = v_stats.completed_videos,
+            total_sessions = v_stats.total_sessions,
+            xp = v_stats.xp,
+            updated_at = v_stats.updated_at
+        WHERE user_id = p_user_id;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'results', v_results,
+        'stats', CASE WHEN v_has_stats THEN to_jsonb(v_stats) END
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- The single-video function becomes a one-item batch
+CREATE OR REPLACE FUNCTION mark_video_complete(
+    p_user_id UUID,
+    p_video_id TEXT,
+    p_playlist_id UUID,
+    p_video_title TEXT,
+    p_duration_seconds INTEGER,
+    p_completed BOOLEAN,
+    p_activity_date DATE
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_batch JSONB;
+BEGIN
+    v_batch := mark_videos_complete(p_user_id, jsonb_build_array(jsonb_build_object(
+        'video_id', p_video_id,
+        'playlist_id', p_playlist_id,
+        'video_title', p_video_title,
+        'duration_seconds', p_duration_seconds,
+        'completed', p_completed
+    )), p_activity_date);
+
+    RETURN (v_batch->'results'->0) || jsonb_build_object('stats', v_batch->'stats');
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fold one log-session / activity into the user's stats under the row lock that
+-- mark_videos_complete takes, so concurrent updates never overwrite each other.
+-- Same rules as stats_service.apply_activity. Returns the updated row, or NULL
+-- if the user has no stats row yet (the backend rebuilds it from the source tables).
+CREATE OR REPLACE FUNCTION record_activity(
+    p_user_id UUID,
+    p_activity_date DATE,
+    p_completed_delta INTEGER,
+    p_sessions_delta INTEGER
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_stats user_stats%ROWTYPE;
+BEGIN
+    SELECT * INTO v_stats FROM user_stats WHERE user_id = p_user_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    IF p_sessions_delta > 0 THEN
+        IF v_stats.last_active_date IS NULL OR p_activity_date > v_stats.last_active_date + 1 THEN
+            v_stats.current_streak := 1;
+        ELSIF p_activity_date = v_stats.last_active_date + 1 THEN
+            v_stats.current_streak := v_stats.current_streak + 1;
+        END IF;
+        IF v_stats.last_active_date IS NULL OR p_activity_date > v_stats.last_active_date THEN
+            v_stats.last_active_date := p_activity_date;
+        END IF;
+        v_stats.longest_streak := GREATEST(v_stats.longest_streak, v_stats.current_streak);
+    END IF;
+
+    v_stats.completed_videos := GREATEST(0, v_stats.completed_videos + p_completed_delta);
+    v_stats.total_sessions := v_stats.total_sessions + p_sessions_delta;
+    v_stats.xp := v_stats.completed_videos * 100;
+    v_stats.updated_at := NOW();
+
+    UPDATE user_stats SET
+        current_streak = v_stats.current_streak,
+        longest_streak = v_stats.longest_streak,
+        last_active_date = v_stats.last_active_date,
+        completed_videos = v_stats.completed_videos,
+        total_sessions = v_stats.total_sessions,
+        xp = v_stats.xp,
+        updated_at = v_stats.updated_at
+    WHERE user_id = p_user_id;
+
+    RETURN to_jsonb(v_stats);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Flush buffered position heartbeats (backend progress_writer). Existing rows are
+-- updated in place: position, last_watched and whichever optional columns the
+-- heartbeat carries. A missing row is created only when the heartbeat has every
+-- column video_progress requires (playlist_id, video_title, duration_seconds);
+-- the rest are returned as skipped instead of failing the whole batch.
+-- p_rows: [{"user_id", "youtube_video_id", "current_position", "last_watched",
+--           "duration_seconds", "playlist_id", "video_title"}, ...] (optional ones may be null),
+-- with no (user_id, youtube_video_id) repeated.
+CREATE OR REPLACE FUNCTION save_progress_heartbeats(p_rows JSONB)
+RETURNS JSONB AS $$
+DECLARE
+    v_updated INTEGER;
+    v_inserted INTEGER;
+    v_skipped JSONB;
+BEGIN
+    UPDATE video_progress vp SET
+        current_position = r.current_position,
+        last_watched = r.last_watched,
+        duration_seconds = COALESCE(r.duration_seconds, vp.duration_seconds),
+        playlist_id = COALESCE(r.playlist_id, vp.playlist_id),
+        video_title = COALESCE(r.video_title, vp.video_title)
+    FROM jsonb_to_recordset(p_rows) AS r(user_id UUID, youtube_video_id TEXT, current_position INTEGER,
+                                         last_watched TIMESTAMP WITH TIME ZONE, duration_seconds INTEGER,
+                                         playlist_id UUID, video_title TEXT)
+    WHERE vp.user_id = r.user_id AND vp.youtube_video_id = r.youtube_video_id;
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+
+    -- ON CONFLICT covers a row created concurrently since the UPDATE
+    INSERT INTO video_progress (user_id, youtube_video_id, playlist_id, video_title, duration_seconds,
+                                current_position, last_watched)
+    SELECT r.user_id, r.youtube_video_id, r.playlist_id, r.video_title, r.duration_seconds,
+           r.current_position, r.last_watched
+    FROM jsonb_to_recordset(p_rows) AS r(user_id UUID, youtube_video_id TEXT, current_position INTEGER,
+                                         last_watched TIMESTAMP WITH TIME ZONE, duration_seconds INTEGER,
+                                         playlist_id UUID, video_title TEXT)
+    WHERE r.playlist_id IS NOT NULL AND r.video_title IS NOT NULL AND r.duration_seconds IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM video_progress vp
+                      WHERE vp.user_id = r.user_id AND vp.youtube_video_id = r.youtube_video_id)
+    ON CONFLICT (user_id, youtube_video_id) DO UPDATE SET
+        current_position = EXCLUDED.current_position,
+        last_watched = EXCLUDED.last_watched;
+    GET DIAGNOSTICS v_inserted = ROW_COUNT;
+
+    SELECT COALESCE(jsonb_agg(jsonb_build_object('user_id', r.user_id, 'youtube_video_id', r.youtube_video_id)),
+                    '[]'::JSONB)
+    INTO v_skipped
+    FROM jsonb_to_recordset(p_rows) AS r(user_id UUID, youtube_video_id TEXT)
+    WHERE NOT EXISTS (SELECT 1 FROM video_progress vp
+                      WHERE vp.user_id = r.user_id AND vp.youtube_video_id = r.youtube_video_id);
+
+    RETURN jsonb_build_object('updated', v_updated, 'inserted', v_inserted, 'skipped', v_skipped);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transcript chunk search for the chat assistant: top-k chunks of one video by cosine similarity.
+-- A video has at most a few hundred chunks, so they are scored exactly: the
+-- MATERIALIZED filter keeps the planner off the table-wide ivfflat index, whose
+-- probed lists would rarely contain the requested video's rows.
+CREATE OR REPLACE FUNCTION match_video_chunks(
+    query_embedding vector(768),
+    p_video_id TEXT,
+    match_count INTEGER DEFAULT 4
+)
+RETURNS TABLE (chunk_index INTEGER, chunk_text TEXT, metadata JSONB, similarity FLOAT) AS $$
+    WITH video_chunks AS MATERIALIZED (
+        SELECT e.chunk_index, e.chunk_text, e.metadata, e.embedding
+        FROM video_embeddings e
+        WHERE e.video_id = p_video_id
+    )
+    SELECT c.chunk_index, c.chunk_text, c.metadata, 1 - (c.embedding <=> query_embedding) AS similarity
+    FROM video_chunks c
+    ORDER BY c.embedding <=> query_embedding
+    LIMIT match_count;
+$$ LANGUAGE sql STABLE;
+
 -- Row Level Security (RLS) Policies
 ALTER TABLE playlists ENABLE ROW LEVEL SECURITY;
 ALTER TABLE goals ENABLE ROW LEVEL SECURITY;
 ALTER TABLE video_progress ENABLE ROW LEVEL SECURITY;
 ALTER TABLE consistency_logs ENABLE ROW LEVEL SECURITY;
 ALTER TABLE ai_chat_history ENABLE ROW LEVEL SECURITY;
+ALTER TABLE ai_chat_sessions ENABLE ROW LEVEL SECURITY;
 ALTER TABLE ai_learning_insights ENABLE ROW LEVEL SECURITY;
+ALTER TABLE user_stats ENABLE ROW LEVEL SECURITY;
+ALTER TABLE sync_deletions ENABLE ROW LEVEL SECURITY;
 
 -- Playlists policies
 CREATE POLICY "Users can view own playlists" ON playlists FOR SELECT USING (auth.uid() = user_id);
@@ -173,8 +540,15 @@ CREATE POLICY "Users can delete own logs" ON consistency_logs FOR DELETE USING (
 -- Chat history policies
 CREATE POLICY "Users can view own chat" ON ai_chat_history FOR SELECT USING (auth.uid() = user_id);
 CREATE POLICY "Users can insert own chat" ON ai_chat_history FOR INSERT WITH CHECK (auth.uid() = user_id);
+CREATE POLICY "Users can view own chat sessions" ON ai_chat_sessions FOR SELECT USING (auth.uid() = user_id);
 
 -- Learning insights policies
 CREATE POLICY "Users can view own insights" ON ai_learning_insights FOR SELECT USING (auth.uid() = user_id);
 CREATE POLICY "Users can insert own insights" ON ai_learning_insights FOR INSERT WITH CHECK (auth.uid() = user_id);
 CREATE POLICY "Users can update own insights" ON ai_learning_insights FOR UPDATE USING (auth.uid() = user_id);
+
+-- User stats policies (writes go through the backend service key)
+CREATE POLICY "Users can view own stats" ON user_stats FOR SELECT USING (auth.uid() = user_id);
+
+-- Sync tombstones policies (written by trigger)
+CREATE POLICY "Users can view own sync deletions" ON sync_deletions FOR SELECT USING (auth.uid() = user_id);
@@ -0,0 +1,66 @@
+"""
+Tests for utils.bm25
+
+Run: python test_bm25.py   (or: python -m pytest test_bm25.py)
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from utils.bm25 import BM25Index
+
+DOCS = {
+    'v1': 'Intro to Python. Variables and loops in Python.',
+    'v2': 'Recursion: every recursive function needs a base case.',
+    'v3': 'Sorting algorithms: merge sort uses recursion, quick sort uses partitions.',
+}
+
+
+def build():
+    index = BM25Index()
+    for key, text in DOCS.items():
+        index.add(key, text)
+    return index
+
+
+def test_ranks_by_relevance_and_reports_offsets():
+    results = build().search('recursion base case')
+    assert [r['key'] for r in results] == ['v2', 'v3']
+    assert results[0]['offsets']['base'] == DOCS['v2'].index('base')
+    assert results[1]['offsets']['recursion'] == DOCS['v3'].index('recursion')
+    assert build().search('the') == []
+
+
+def test_incremental_add_replace_and_remove():
+    index = build()
+    index.add('v1', 'Now this video is about recursion trees')
+    assert index.search('python') == []
+    assert 'v1' in [r['key'] for r in index.search('recursion')]
+
+    assert index.remove('v2') and not index.remove('v2')
+    assert index.remove('v3')  # Crosses the compaction threshold
+    assert index.keys() == ['v1']
+    assert [r['key'] for r in index.search('recursion')] == ['v1']
+
+
+def test_save_and_load_round_trip():
+    index = build()
+    index.remove('v1')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'index.json')
+        index.save(path)
+        loaded = BM25Index.load(path)
+    assert sorted(loaded.keys()) == ['v2', 'v3']
+    assert loaded.search('merge sort') == index.search('merge sort')
+    loaded.add('v4', 'merge sort again')
+    assert loaded.search('merge')[0]['key'] == 'v4'
+
+
+if __name__ == '__main__':
+    for test in (test_ranks_by_relevance_and_reports_offsets, test_incremental_add_replace_and_remove,
+                 test_save_and_load_round_trip):
+        test()
+        print(f"✅ {test.__name__}")
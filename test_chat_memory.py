@@ -0,0 +1,130 @@
+"""
+Tests for the chat session window in services.chat_memory_service
+
+Run: python test_chat_memory.py   (or: python -m pytest test_chat_memory.py)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from services import chat_memory_service
+from services.chat_memory_service import ChatSession, get_session, recent_turns, turns_to_fold, _turn_tokens
+
+
+class FakeClient:
+    """Stands in for the Supabase client: inserts can fail, history reads return stored_turns"""
+
+    def __init__(self, stored_turns=(), fail_inserts=False):
+        self.stored_turns = list(stored_turns)
+        self.fail_inserts = fail_inserts
+        self.updates = []
+
+    def table(self, name):
+        client = self
+
+        class Query:
+            def __getattr__(self, _):
+                return lambda *args, **kwargs: self
+
+            def insert(self, row):
+                if client.fail_inserts:
+                    raise ConnectionError('insert failed')
+                return self
+
+            def update(self, values):
+                client.updates.append(values)
+                return self
+
+            def execute(self):
+                rows = [{'user_message': q, 'ai_response': a} for q, a in client.stored_turns]
+                return type('Result', (), {'data': rows})()
+
+        return Query()
+
+
+def with_client(client, fn):
+    original = chat_memory_service.get_supabase
+    chat_memory_service.get_supabase = lambda: client
+    try:
+        return fn()
+    finally:
+        chat_memory_service.get_supabase = original
+
+
+def conversation(n):
+    return [(f"question {i} " * 10, f"answer {i} " * 30) for i in range(n)]
+
+
+def test_window_keeps_the_newest_turns_within_budget():
+    turns = conversation(30)
+    size = _turn_tokens(turns[-1])
+    window = recent_turns(turns, size * 5)
+    assert window == turns[-len(window):]
+    assert 3 <= len(window) <= 5
+    assert sum(_turn_tokens(t) for t in window) <= size * 5
+    assert recent_turns(turns, 0) == []
+
+
+def test_fold_waits_for_budget_then_leaves_headroom():
+    turns = conversation(10)
+    total = sum(_turn_tokens(t) for t in turns)
+    assert turns_to_fold(turns, max_tokens=total) == 0
+
+    budget = total - 1
+    count = turns_to_fold(turns, max_tokens=budget)
+    assert sum(_turn_tokens(t) for t in turns[count:]) <= budget // 2
+    assert sum(_turn_tokens(t) for t in turns[count - 1:]) > budget // 2
+
+
+def test_fold_counts_turns_older_than_the_loaded_window():
+    window = conversation(3)  # Newest turns, well under budget
+    budget = sum(_turn_tokens(t) for t in window) * 4
+    assert turns_to_fold(window, max_tokens=budget) == 0
+    # 60 unsummarized turns, only the newest 3 loaded: everything but the kept tail is folded
+    count = turns_to_fold(window, max_tokens=budget, unsummarized=60)
+    assert count == 60 - len(recent_turns(window, budget // 2))
+
+
+def test_sessions_need_their_owner():
+    try:
+        get_session('3f0c1b8e-0000-4000-8000-000000000000')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('session_id without user_id was accepted')
+
+
+def test_turn_is_not_counted_when_its_history_write_fails():
+    session = ChatSession('s1', 'u1')
+    with_client(FakeClient(fail_inserts=True), lambda: chat_memory_service.record_turn(session, 'q', 'a'))
+    assert session.turns == [] and session.unsummarized == 0
+
+
+def test_fold_advances_by_the_turns_it_read():
+    turns = conversation(10)
+    session = ChatSession('s1', 'u1', summarized_turns=4, turns=turns[-3:], unsummarized=40)
+    client = FakeClient(stored_turns=turns[:6])  # Fewer rows than the fold asked for
+    original = chat_memory_service._summarize
+    chat_memory_service._summarize = lambda summary, folded: f"{len(folded)} turns"
+    try:
+        chat_memory_service._folding.add(session.id)
+        with_client(client, lambda: chat_memory_service._fold(session))
+    finally:
+        chat_memory_service._summarize = original
+
+    assert session.summary == '6 turns'
+    assert session.summarized_turns == 10 and session.unsummarized == 34
+    assert client.updates[0]['summarized_turns'] == 10
+
+
+if __name__ == '__main__':
+    for test in (test_window_keeps_the_newest_turns_within_budget,
+                 test_fold_waits_for_budget_then_leaves_headroom,
+                 test_fold_counts_turns_older_than_the_loaded_window,
+                 test_sessions_need_their_owner,
+                 test_turn_is_not_counted_when_its_history_write_fails,
+                 test_fold_advances_by_the_turns_it_read):
+        test()
+        print(f"✅ {test.__name__}")
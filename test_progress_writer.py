@@ -0,0 +1,81 @@
+"""
+Tests for the heartbeat write-behind buffer in services.progress_writer
+
+Run: python test_progress_writer.py   (or: python -m pytest test_progress_writer.py)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from services.progress_writer import ProgressWriteBuffer, save_heartbeats, HEARTBEAT_COLUMNS
+
+
+class RecordingClient:
+    """Stands in for the Supabase client: records RPC calls, answers like save_progress_heartbeats"""
+
+    def __init__(self, existing=()):
+        self.existing = set(existing)
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append((name, params))
+        required = ('playlist_id', 'video_title', 'duration_seconds')
+        skipped = [{'user_id': r['user_id'], 'youtube_video_id': r['youtube_video_id']}
+                   for r in params['p_rows']
+                   if (r['user_id'], r['youtube_video_id']) not in self.existing
+                   and any(r[column] is None for column in required)]
+        return type('Query', (), {'execute': lambda _: type('Result', (), {'data': {'skipped': skipped}})()})()
+
+
+def heartbeat(video_id, position, **extra):
+    return dict(user_id='u1', youtube_video_id=video_id, current_position=position,
+                last_watched='2026-10-18T10:00:00', **extra)
+
+
+def test_bare_heartbeat_is_sent_as_an_update_with_null_optional_columns():
+    client = RecordingClient(existing={('u1', 'v1')})
+    skipped = save_heartbeats([heartbeat('v1', 42)], supabase=client)
+
+    assert skipped == 0
+    name, params = client.calls[0]
+    assert name == 'save_progress_heartbeats'
+    row = params['p_rows'][0]
+    assert set(row) == set(HEARTBEAT_COLUMNS)
+    assert row['current_position'] == 42
+    assert row['playlist_id'] is None and row['video_title'] is None and row['duration_seconds'] is None
+
+
+def test_heartbeat_for_a_missing_row_without_required_columns_is_skipped_not_retried():
+    client = RecordingClient(existing={('u1', 'v1')})
+    buffer = ProgressWriteBuffer(flush_interval=3600, writer=lambda rows: save_heartbeats(rows, supabase=client))
+    buffer.submit(heartbeat('v1', 10))
+    buffer.submit(heartbeat('v2', 20))
+    try:
+        assert buffer.flush() == 1
+        stats = buffer.stats()
+        assert stats['skipped'] == 1 and stats['written'] == 1 and stats['pending'] == 0
+        assert stats['failed_flushes'] == 0
+    finally:
+        buffer.stop()
+
+
+def test_coalesced_heartbeats_keep_columns_from_earlier_ones():
+    written = []
+    buffer = ProgressWriteBuffer(flush_interval=3600, writer=written.extend)
+    buffer.submit(heartbeat('v3', 5, playlist_id='p1', video_title='Intro', duration_seconds=600))
+    buffer.submit(heartbeat('v3', 15))
+    try:
+        buffer.flush()
+    finally:
+        buffer.stop()
+    assert written == [heartbeat('v3', 15, playlist_id='p1', video_title='Intro', duration_seconds=600)]
+
+
+if __name__ == '__main__':
+    for test in (test_bare_heartbeat_is_sent_as_an_update_with_null_optional_columns,
+                 test_heartbeat_for_a_missing_row_without_required_columns_is_skipped_not_retried,
+                 test_coalesced_heartbeats_keep_columns_from_earlier_ones):
+        test()
+        print(f"✅ {test.__name__}")
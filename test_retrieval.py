@@ -0,0 +1,45 @@
+"""
+Tests for the rank fusion and passage merging in services.retrieval_service
+
+Run: python test_retrieval.py   (or: python -m pytest test_retrieval.py)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from services.retrieval_service import fuse_rankings, merge_overlapping
+
+
+def chunk(index, text=''):
+    return {'chunk_index': index, 'text': text, 'score': 0.0}
+
+
+def test_rrf_rewards_chunks_ranked_by_both_retrievers():
+    vector = [chunk(5), chunk(2), chunk(9)]
+    keyword = [chunk(7), chunk(2), chunk(5)]
+    fused = fuse_rankings([vector, keyword], rrf_k=60)
+    assert [c['chunk_index'] for c in fused] == [5, 2, 7, 9]
+    assert abs(fused[0]['score'] - (1 / 61 + 1 / 63)) < 1e-12
+    assert fuse_rankings([[], []]) == []
+
+
+def test_adjacent_chunks_merge_without_repeating_the_overlap():
+    chunks = [
+        dict(chunk(3, 'e f g h'), score=0.9),
+        dict(chunk(1, 'a b c d'), score=0.2),
+        dict(chunk(2, 'c d e f'), score=0.5),
+        dict(chunk(7, 'x y z w'), score=0.4),
+    ]
+    passages = merge_overlapping(chunks, overlap_words=2)
+    assert [p['chunk_indexes'] for p in passages] == [[1, 2, 3], [7]]
+    assert passages[0]['text'] == 'a b c d e f g h'
+    assert passages[0]['score'] == 0.9
+
+
+if __name__ == '__main__':
+    for test in (test_rrf_rewards_chunks_ranked_by_both_retrievers,
+                 test_adjacent_chunks_merge_without_repeating_the_overlap):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,105 @@
+"""
+Property-based equivalence test for calculate_completion_date
+
+Generates random schedules and checks the closed-form implementation against
+the original day-by-day loop (and a blackout-aware version of it).
+
+Run: python test_scheduler.py   (or: python -m pytest test_scheduler.py)
+"""
+
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from services.scheduler_service import calculate_completion_date, iter_video_schedule
+
+SEED = 20240101
+CASES = 5000
+
+
+def loop_completion_date(total_duration_minutes, study_days, hours_per_day, start_date, blackout_dates=(), max_days=365):
+    """The original day-by-day implementation, with optional blackouts"""
+    minutes_per_session = hours_per_day * 60
+    total_sessions_needed = total_duration_minutes / minutes_per_session if minutes_per_session > 0 else 0
+
+    current_date = start_date
+    sessions_completed = 0
+    days_elapsed = 0
+
+    while sessions_completed < total_sessions_needed:
+        if current_date.weekday() in study_days and current_date not in blackout_dates:
+            sessions_completed += 1
+
+        current_date += timedelta(days=1)
+        days_elapsed += 1
+
+        if days_elapsed > max_days:
+            return None  # The original loop gave up here
+
+    completion_date = current_date - timedelta(days=1)
+    return completion_date, days_elapsed, int(total_sessions_needed)
+
+
+def random_case(rng):
+    study_days = rng.sample(range(7), rng.randint(1, 7))
+    hours_per_day = rng.choice([0.25, 0.5, 1, 1.5, 2, 3, rng.uniform(0.1, 4)])
+    total_duration_minutes = rng.choice([0, rng.randint(1, 120), rng.randint(1, 20000), rng.uniform(0, 5000)])
+    start_date = date(2024, 1, 1) + timedelta(days=rng.randint(0, 1000))
+    return total_duration_minutes, study_days, hours_per_day, start_date
+
+
+def test_matches_original_loop():
+    rng = random.Random(SEED)
+    checked = 0
+    for _ in range(CASES):
+        args = random_case(rng)
+        expected = loop_completion_date(*args)
+        if expected is None:
+            continue
+        assert calculate_completion_date(*args) == expected, args
+        checked += 1
+    assert checked > CASES // 2
+
+
+def test_matches_loop_with_blackouts():
+    rng = random.Random(SEED + 1)
+    for _ in range(CASES):
+        total, study_days, hours, start = random_case(rng)
+        blackouts = {start + timedelta(days=rng.randint(-10, 400)) for _ in range(rng.randint(0, 40))}
+        expected = loop_completion_date(total, study_days, hours, start, blackouts, max_days=5000)
+        if expected is None:
+            continue
+        assert calculate_completion_date(total, study_days, hours, start, list(blackouts)) == expected
+
+
+def test_long_horizon_single_study_day():
+    # 300 weekly sessions: the original loop stopped after 365 days
+    start = date(2024, 1, 1)  # Monday
+    completion, total_days, sessions = calculate_completion_date(300 * 60, [0], 1, start)
+    assert sessions == 300
+    assert completion == start + timedelta(weeks=299)
+    assert total_days == 299 * 7 + 1
+
+
+def test_compact_schedule_matches_full():
+    rng = random.Random(SEED + 2)
+    for _ in range(500):
+        videos = [{'video_id': str(i), 'duration_seconds': rng.randint(10, 5000)} for i in range(rng.randint(0, 60))]
+        args = (rng.sample(range(7), rng.randint(1, 7)), rng.choice([15, 30, 60, 90]), date(2024, 1, 1))
+        full = list(iter_video_schedule(videos, *args))
+        compact = list(iter_video_schedule(videos, *args, compact=True))
+        assert len(full) == len(compact)
+        for day, compact_day in zip(full, compact):
+            assert day['videos'] == videos[compact_day['video_start']:compact_day['video_end']]
+            assert compact_day['video_count'] == len(day['videos'])
+            assert (day['date'], day['total_minutes']) == (compact_day['date'], compact_day['total_minutes'])
+
+
+if __name__ == '__main__':
+    for test in (test_matches_original_loop, test_matches_loop_with_blackouts, test_long_horizon_single_study_day,
+                 test_compact_schedule_matches_full):
+        test()
+        print(f"✅ {test.__name__}")
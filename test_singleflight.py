@@ -0,0 +1,167 @@
+"""
+Tests for utils.singleflight
+
+Run: python test_singleflight.py   (or: python -m pytest test_singleflight.py)
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Process, Queue
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from utils.singleflight import SingleFlight
+
+CALLERS = 16
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight('test', mode='thread')
+    calls = []
+    barrier = threading.Barrier(CALLERS)
+
+    def work(x):
+        calls.append(x)
+        time.sleep(0.2)
+        return x * 2
+
+    def caller(_):
+        barrier.wait()
+        return flight.do('key', work, 21)
+
+    with ThreadPoolExecutor(max_workers=CALLERS) as pool:
+        results = list(pool.map(caller, range(CALLERS)))
+
+    assert results == [42] * CALLERS
+    assert len(calls) == 1
+    stats = flight.stats()
+    assert stats['executed'] == 1 and stats['coalesced'] == CALLERS - 1 and stats['in_flight'] == 0
+
+
+def test_exception_reaches_every_waiter_and_is_not_cached():
+    flight = SingleFlight('test', mode='thread')
+    barrier = threading.Barrier(4)
+
+    def fail():
+        time.sleep(0.1)
+        raise RuntimeError('boom')
+
+    def caller(_):
+        barrier.wait()
+        try:
+            flight.do('key', fail)
+        except RuntimeError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert list(pool.map(caller, range(4))) == ['boom'] * 4
+    assert flight.do('key', lambda: 'ok') == 'ok'
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight('test', mode='thread')
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda k: flight.do(k, lambda: k), ['a', 'b', 'c', 'd']))
+    assert results == ['a', 'b', 'c', 'd']
+    assert flight.stats()['executed'] == 4
+
+
+def test_async_callers_share_one_call():
+    flight = SingleFlight('test', mode='thread')
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return 'done'
+
+    async def main():
+        return await asyncio.gather(*[flight.do_async('key', work) for _ in range(CALLERS)])
+
+    assert asyncio.run(main()) == ['done'] * CALLERS
+    assert len(calls) == 1
+
+
+def _file_mode_worker(lock_dir, cache_path, queue):
+    flight = SingleFlight('test', mode='file', lock_dir=lock_dir)
+
+    def recheck():
+        return open(cache_path).read() if os.path.exists(cache_path) else None
+
+    def work():
+        time.sleep(1.5)  # Long enough for the other processes to start and hit the lock
+        with open(cache_path, 'w') as f:
+            f.write('computed')
+        return 'computed'
+
+    queue.put((flight.do('key', work, recheck=recheck), flight.stats()['rechecked']))
+
+
+def _async_file_mode_worker(lock_dir, cache_path, queue):
+    flight = SingleFlight('test', mode='file', lock_dir=lock_dir)
+
+    def recheck():
+        return open(cache_path).read() if os.path.exists(cache_path) else None
+
+    async def work():
+        await asyncio.sleep(1.5)
+        with open(cache_path, 'w') as f:
+            f.write('computed')
+        return 'computed'
+
+    async def main():
+        # The loop keeps serving other coroutines while waiting for the lock
+        ticks = 0
+        flight_task = asyncio.ensure_future(flight.do_async('key', work, recheck=recheck))
+        while not flight_task.done():
+            ticks += 1
+            await asyncio.sleep(0.05)
+        return flight_task.result(), ticks
+
+    value, ticks = asyncio.run(main())
+    queue.put((value, flight.stats()['rechecked'], ticks))
+
+
+def test_async_file_mode_coalesces_across_processes():
+    with tempfile.TemporaryDirectory() as lock_dir:
+        cache_path = os.path.join(lock_dir, 'cache.txt')
+        queue = Queue()
+        workers = [Process(target=_async_file_mode_worker, args=(lock_dir, cache_path, queue)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        results = [queue.get(timeout=30) for _ in workers]
+        for worker in workers:
+            worker.join()
+
+    assert [value for value, _, _ in results] == ['computed'] * 3
+    assert sorted(rechecked for _, rechecked, _ in results) == [0, 1, 1]
+    assert all(ticks > 5 for _, _, ticks in results)
+
+
+def test_file_mode_coalesces_across_processes():
+    with tempfile.TemporaryDirectory() as lock_dir:
+        cache_path = os.path.join(lock_dir, 'cache.txt')
+        queue = Queue()
+        workers = [Process(target=_file_mode_worker, args=(lock_dir, cache_path, queue)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        results = [queue.get(timeout=30) for _ in workers]
+        for worker in workers:
+            worker.join()
+
+    assert [value for value, _ in results] == ['computed'] * 3
+    # One process computed, the others waited for its lock and were served by recheck
+    assert sorted(rechecked for _, rechecked in results) == [0, 1, 1]
+
+
+if __name__ == '__main__':
+    for test in (test_concurrent_callers_share_one_call, test_exception_reaches_every_waiter_and_is_not_cached,
+                 test_different_keys_run_independently, test_async_callers_share_one_call,
+                 test_file_mode_coalesces_across_processes, test_async_file_mode_coalesces_across_processes):
+        test()
+        print(f"✅ {test.__name__}")
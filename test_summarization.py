@@ -0,0 +1,61 @@
+"""
+Tests for the chunking in services.summarization_service
+
+Run: python test_summarization.py   (or: python -m pytest test_summarization.py)
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from services.summarization_service import split_by_token_budget, _time_windows
+from utils.timed_transcript import TimedTranscript
+
+
+def lecture(words, seed=3):
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(2, 9)))
+                  for _ in range(3000)]
+    return [rng.choice(vocabulary) for _ in range(words)]
+
+
+def changed(before, after):
+    return len(set(after) - set(before))
+
+
+def test_a_local_edit_only_changes_the_chunks_around_it():
+    words = lecture(40000)
+    before = split_by_token_budget(' '.join(words), max_tokens=1000)
+    assert len(before) > 20
+    assert ' '.join(before[0].split()[:5]) == ' '.join(words[:5])
+    assert before[-1].split()[-1] == words[-1]
+
+    prepended = split_by_token_budget(' '.join(['welcome'] + words), max_tokens=1000)
+    assert changed(before, prepended) <= 2
+
+    edited = list(words)
+    edited[len(words) // 2] = 'photosynthesis'
+    middle = split_by_token_budget(' '.join(edited), max_tokens=1000)
+    assert changed(before, middle) <= 2
+
+
+def test_timed_windows_cut_at_segments_and_survive_an_edit():
+    words = lecture(20000, seed=5)
+    entries = [{'text': ' '.join(words[i:i + 10]), 'start': i * 0.4, 'duration': 4.0}
+               for i in range(0, len(words), 10)]
+    before = _time_windows(TimedTranscript.from_entries(entries), 1000)
+    assert len(before) > 10
+    assert before[0][1] == 0.0 and before[-1][2] == entries[-1]['start'] + 4.0
+
+    entries[len(entries) // 3] = dict(entries[len(entries) // 3], text='an edited caption line')
+    after = _time_windows(TimedTranscript.from_entries(entries), 1000)
+    assert changed(before, after) <= 2
+
+
+if __name__ == '__main__':
+    for test in (test_a_local_edit_only_changes_the_chunks_around_it,
+                 test_timed_windows_cut_at_segments_and_survive_an_edit):
+        test()
+        print(f"✅ {test.__name__}")
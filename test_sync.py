@@ -0,0 +1,82 @@
+"""
+Tests for delta sync in services.sync_service
+
+Run: python test_sync.py   (or: python -m pytest test_sync.py)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from services import sync_service
+
+
+class Query:
+    """Chainable stand-in for a PostgREST query: records filters, returns the table's canned rows"""
+
+    def __init__(self, client, table):
+        self.client, self.table = client, table
+
+    def __getattr__(self, name):
+        def method(*args, **kwargs):
+            self.client.calls.append((self.table, name, args))
+            return self
+        return method
+
+    def execute(self):
+        return type('Result', (), {'data': self.client.rows.get(self.table, [])})()
+
+
+class RecordingClient:
+    def __init__(self, rows=None):
+        self.rows = rows or {}
+        self.calls = []
+
+    def table(self, name):
+        return Query(self, name)
+
+    def filters(self, table, name):
+        return [args for t, n, args in self.calls if t == table and n == name]
+
+
+def fetch(client, cursor=None, limit=500):
+    original = sync_service.require_supabase
+    sync_service.require_supabase = lambda: client
+    try:
+        return sync_service.fetch_changes('u1', cursor, limit)
+    finally:
+        sync_service.require_supabase = original
+
+
+def test_full_sync_starts_tombstones_at_the_settled_time():
+    client = RecordingClient()
+    result = fetch(client)
+
+    assert result['deleted'] == {'video_progress': [], 'consistency_logs': []}
+    settled = client.filters('sync_deletions', 'lt')[0][1]
+    position = sync_service.decode_cursor(result['cursor'])['sync_deletions']
+    assert position == [settled, 0]
+
+
+def test_tombstones_are_reported_per_table_and_advance_the_cursor():
+    tombstones = [
+        {'id': 3, 'table_name': 'consistency_logs', 'row_id': 'log-1', 'deleted_at': '2026-10-18T10:00:00+00:00'},
+        {'id': 4, 'table_name': 'video_progress', 'row_id': 'vp-1', 'deleted_at': '2026-10-18T10:00:01+00:00'}
+    ]
+    client = RecordingClient({'sync_deletions': tombstones})
+    cursor = sync_service.encode_cursor({'sync_deletions': ['2026-10-18T09:00:00+00:00', 2]})
+    result = fetch(client, cursor, limit=2)
+
+    assert result['deleted'] == {'video_progress': ['vp-1'], 'consistency_logs': ['log-1']}
+    assert result['has_more']
+    assert sync_service.decode_cursor(result['cursor'])['sync_deletions'] == ['2026-10-18T10:00:01+00:00', 4]
+    keyset = client.filters('sync_deletions', 'or_')[0][0]
+    assert keyset == 'deleted_at.gt."2026-10-18T09:00:00+00:00",and(deleted_at.eq."2026-10-18T09:00:00+00:00",id.gt.2)'
+
+
+if __name__ == '__main__':
+    for test in (test_full_sync_starts_tombstones_at_the_settled_time,
+                 test_tombstones_are_reported_per_table_and_advance_the_cursor):
+        test()
+        print(f"✅ {test.__name__}")
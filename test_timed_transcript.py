@@ -0,0 +1,63 @@
+"""
+Tests for utils.timed_transcript
+
+Run: python test_timed_transcript.py   (or: python -m pytest test_timed_transcript.py)
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from utils.timed_transcript import TimedTranscript
+
+ENTRIES = [
+    {'text': 'welcome to the course', 'start': 0.0, 'duration': 2.5},
+    {'text': 'today we cover\nrecursion', 'start': 2.5, 'duration': 3.0},
+    {'text': 'first the base case', 'start': 6.0, 'duration': 4.0},
+    {'text': 'then the recursive step', 'start': 10.0, 'duration': 3.5},
+]
+
+
+def test_text_matches_joined_entries():
+    timed = TimedTranscript.from_entries(ENTRIES)
+    assert timed.text == ' '.join(entry['text'] for entry in ENTRIES)
+    assert [timed.segment_text(i) for i in range(len(timed))] == [entry['text'] for entry in ENTRIES]
+    assert timed.end_time == 13.5
+
+
+def test_time_and_offset_lookups():
+    timed = TimedTranscript.from_entries(ENTRIES)
+    assert timed.index_at_time(-1) == 0
+    assert timed.index_at_time(2.5) == 1
+    assert timed.index_at_time(9.99) == 2
+    assert timed.index_at_time(500) == 3
+
+    offset = timed.text.index('base case')
+    assert timed.index_at_offset(offset) == 2
+    assert timed.time_at_offset(offset) == 6.0
+    assert timed.offset_at_time(11) == timed.text.index('then')
+
+
+def test_snap_and_text_between():
+    timed = TimedTranscript.from_entries(ENTRIES)
+    assert timed.snap_time(5.0) == 6.0
+    assert timed.snap_time(3.0) == 2.5
+    assert timed.text_between(3.0, 7.0) == 'today we cover\nrecursion first the base case'
+    assert timed.text_between(7.0, 7.0) == ''
+
+
+def test_round_trip_through_columns():
+    timed = TimedTranscript.from_entries(ENTRIES)
+    restored = TimedTranscript.from_dict(timed.text, timed.to_dict())
+    assert restored.text == timed.text
+    assert list(restored.starts) == list(timed.starts)
+    assert list(restored.offsets) == list(timed.offsets)
+    assert restored.segment(3) == timed.segment(3)
+
+
+if __name__ == '__main__':
+    for test in (test_text_matches_joined_entries, test_time_and_offset_lookups,
+                 test_snap_and_text_between, test_round_trip_through_columns):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,81 @@
+"""
+Tests for utils.vector_index
+
+Run: python test_vector_index.py   (or: python -m pytest test_vector_index.py)
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from utils.vector_index import VectorIndex, SparseVectorIndex, CSRMatrix, normalize
+from services.embedding_service import HashedNgramProvider
+
+
+def test_normalize_scales_rows_and_keeps_zero_rows():
+    matrix = normalize([[3.0, 4.0], [0.0, 0.0]])
+    assert matrix.dtype == np.float32
+    assert np.allclose(matrix, [[0.6, 0.8], [0.0, 0.0]])
+
+
+def test_brute_force_returns_best_first():
+    index = VectorIndex(dim=3)
+    index.add([[1, 0, 0], [0, 1, 0], [1, 1, 0]], ['x', 'y', 'xy'])
+    results = index.search([1, 0.1, 0], k=2)
+    assert [payload for _, payload in results] == ['x', 'xy']
+    assert results[0][0] > results[1][0]
+    assert VectorIndex(dim=3).search([1, 0, 0]) == []
+
+
+def test_ivf_matches_brute_force_on_clustered_data():
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(20, 32))
+    vectors = np.repeat(centers, 100, axis=0) + 0.05 * rng.normal(size=(2000, 32))
+    exact = VectorIndex(dim=32, ivf_min_size=10 ** 9)
+    ivf = VectorIndex(dim=32, ivf_min_size=1000, n_probe=4)
+    for index in (exact, ivf):
+        index.add(vectors, list(range(len(vectors))))
+
+    hits = 0
+    for query in centers + 0.05 * rng.normal(size=centers.shape):
+        expected = {payload for _, payload in exact.search(query, k=10)}
+        hits += len(expected & {payload for _, payload in ivf.search(query, k=10)})
+    assert hits / (10 * len(centers)) >= 0.9
+
+
+
+def test_sparse_index_weights_rare_query_terms_higher():
+    # Term 0 is in every row, term 1 only in row 'b', term 2 only in row 'c'
+    rows = CSRMatrix(np.ones(5), np.array([0, 0, 1, 0, 2]), np.array([0, 1, 3, 5]), dim=8)
+    index = SparseVectorIndex(dim=8)
+    index.add(rows, ['a', 'b', 'c'])
+    query = CSRMatrix(np.array([1.0, 1.0]), np.array([0, 1]), np.array([0, 2]), dim=8)
+    assert [payload for _, payload in index.search(query, k=3)][0] == 'b'
+    assert SparseVectorIndex(dim=8).search(query) == []
+
+
+def test_hashed_provider_is_deterministic_and_retrieves_matching_chunk():
+    provider = HashedNgramProvider(bits=16)
+    chunks = [
+        'photosynthesis converts light energy into chemical energy in chloroplasts',
+        'the mitochondria produce atp through cellular respiration',
+        'recursion needs a base case and a recursive step',
+    ]
+    first, second = provider.embed_documents(chunks), provider.embed_documents(chunks)
+    assert np.array_equal(first.indices, second.indices) and np.array_equal(first.data, second.data)
+
+    index = SparseVectorIndex(provider.dim)
+    index.add(first, list(range(len(chunks))))
+    assert index.search(provider.embed_query('what is the base case of a recursive function?'), k=1)[0][1] == 2
+    assert index.search(provider.embed_query('Mitochondrion and ATP'), k=1)[0][1] == 1
+
+
+if __name__ == '__main__':
+    for test in (test_normalize_scales_rows_and_keeps_zero_rows, test_brute_force_returns_best_first,
+                 test_ivf_matches_brute_force_on_clustered_data, test_sparse_index_weights_rare_query_terms_higher,
+                 test_hashed_provider_is_deterministic_and_retrieves_matching_chunk):
+        test()
+        print(f"✅ {test.__name__}")